@@ -0,0 +1,6 @@
+from app.server import main
+
+# uvicorn запускает воркеры через spawn, и они импортируют этот модуль
+# как __mp_main__: сервер стартует только в родительском процессе.
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,60 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from app.core.config import auth_config
 from app.core.repository import UserRepo
 from app.core.db import db_manager
+from app.core.keys import key_ring
+from app.core.revocation import revocation_list
+from app.core.tokens import TokenError, token_codec, verified_tokens
 import datetime as dt
-from jose import jwt, JWTError
+import uuid
 from app.schemas.token import TokenData
 from app.schemas.user import GetUser
-from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.uow import UnitOfWork
 from app.utils.hasher import Hasher
+from app.utils.tracing import tracer
+from app.utils.cache import token_cache
+from app.utils.metrics import jwt_duration_seconds
 
 
 class AuthService:
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
-    SECRET_KEY: str = auth_config.SECRET_KEY
-    ALGORITHM: str = auth_config.ALGORITHM
 
-    async def authenticate_user(self, session: AsyncSession, email: str, password: str):
-        async with session.begin():
-            user_repo = UserRepo(session)
-            user = await user_repo.get_user_by_email(email=email)
-            if user is None:
-                return
-            if not Hasher.verify_password(password, user.password):
-                return
-            return user
+    # Настройки читаются при обращении, а не при импорте модуля
+    @property
+    def SECRET_KEY(self) -> str:
+        return auth_config.SECRET_KEY
+
+    @property
+    def ALGORITHM(self) -> str:
+        return auth_config.ALGORITHM
 
+    @tracer.traced()
+    async def authenticate_user(self, uow: UnitOfWork, email: str, password: str):
+        async with uow.read() as session:
+            user_repo = UserRepo(session)
+            user = await user_repo.get_credentials_by_email(email=email)
+        if user is None:
+            return
+        if not await Hasher.verify_password_async(password, user.password):
+            return
+        return user
+
+    @tracer.traced()
+    async def rehash_password(self, id: int, password: str, old_hash: str) -> None:
+        """Перехеширует пароль текущей схемой и стоимостью.
+        Вызывается фоном после ответа на успешный вход, поэтому
+        открывает свою сессию."""
+        new_hash = await Hasher.hash_password_async(password)
+        async with db_manager.async_session.begin() as session:
+            await UserRepo(session).replace_password_hash(id, old_hash, new_hash)
+
+    @tracer.traced()
     def create_access_token(
-        self, data: dict, expires_delta: dt.timedelta | None = None
+        self,
+        data: dict,
+        expires_delta: dt.timedelta | None = None,
+        token_type: str = "access",
     ):
         to_encode = data.copy()
         if expires_delta:
@@ -36,50 +62,153 @@ class AuthService:
         else:
             expire = dt.datetime.now(dt.timezone.utc) + dt.timedelta(minutes=15)
 
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": token_type})
+        signing_key = key_ring.signing_key()
+        headers = {"kid": signing_key.kid} if signing_key.kid else None
+        with jwt_duration_seconds.time(operation="encode"):
+            encoded_jwt = token_codec.encode(
+                to_encode,
+                signing_key.private_key,
+                algorithm=self.ALGORITHM,
+                headers=headers,
+            )
         return encoded_jwt
 
-    async def verify_access_token(self, token: str, form_data_exception=None) -> TokenData:
+    def create_verify_token(self, id: int) -> str:
+        """Токен для ссылки подтверждения почты"""
+        return self.create_access_token(
+            data={"id": str(id)},
+            expires_delta=dt.timedelta(
+                minutes=auth_config.VERIFY_TOKEN_EXPIRE_MINUTES
+            ),
+        )
+
+    def create_token_pair(self, id: int, role: str) -> dict:
+        """Короткий access-токен и долгий refresh-токен для его обновления"""
+        data = {"id": str(id), "role": role}
+        return {
+            "access_token": self.create_access_token(
+                data=data,
+                expires_delta=dt.timedelta(
+                    minutes=auth_config.ACCESS_TOKEN_EXPIRE_MINUTES
+                ),
+            ),
+            "refresh_token": self.create_access_token(
+                data=data,
+                expires_delta=dt.timedelta(days=auth_config.REFRESH_TOKEN_EXPIRE_DAYS),
+                token_type="refresh",
+            ),
+            "token_type": "bearer",
+        }
+
+    @tracer.traced()
+    async def verify_access_token(
+        self, token: str, form_data_exception=None, token_type: str = "access"
+    ) -> TokenData:
 
         try:
-            payload = jwt.decode(
-                token, auth_config.SECRET_KEY, algorithms=self.ALGORITHM
-            )
+            payload = verified_tokens.get(token)
+            if payload is None:
+                kid = token_codec.unverified_header(token).get("kid")
+                key = key_ring.verification_key(kid)
+                if key is None:
+                    raise form_data_exception
+                with jwt_duration_seconds.time(operation="decode"):
+                    payload = token_codec.decode(token, key, algorithm=self.ALGORITHM)
+                verified_tokens.set(token, payload)
             id: str = payload.get("id")
-            if id is None:
+            if id is None or payload.get("type", "access") != token_type:
                 raise form_data_exception
 
-            token_data = TokenData(id=id)
+            token_data = TokenData(
+                id=id, exp=payload.get("exp"), jti=payload.get("jti")
+            )
 
-        except JWTError:
+        except TokenError:
             raise form_data_exception
 
         return token_data
-    
 
+    @tracer.traced()
+    async def refresh_tokens(self, uow: UnitOfWork, refresh_token: str) -> dict:
+        """Обменивает refresh-токен на новую пару токенов.
+        Старый refresh-токен отзывается, повторное его предъявление
+        (например, украденной копии) отклоняется.
+        """
+        form_data_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not valid credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        token_data = await self.verify_access_token(
+            refresh_token, form_data_exception, token_type="refresh"
+        )
+        if token_data.jti is None:
+            raise form_data_exception
+        async with uow.write() as session:
+            revoked = await revocation_list.revoke(
+                session, token_data.jti, token_data.exp
+            )
+            if not revoked:
+                raise form_data_exception
+            user = await UserRepo(session).get_user_snapshot(token_data.id)
+            if user is None:
+                raise form_data_exception
+        return self.create_token_pair(id=user.id, role=user.role)
+
+    @tracer.traced()
+    async def logout(
+        self,
+        uow: UnitOfWork,
+        token: str,
+        refresh_token: str | None = None,
+    ) -> None:
+        """Отзывает access-токен и, если передан, refresh-токен"""
+        form_data_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not valid credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        tokens = [await self.verify_access_token(token, form_data_exception)]
+        if refresh_token is not None:
+            tokens.append(
+                await self.verify_access_token(
+                    refresh_token, form_data_exception, token_type="refresh"
+                )
+            )
+        async with uow.write() as session:
+            for token_data in tokens:
+                if token_data.jti is not None and token_data.id == tokens[0].id:
+                    await revocation_list.revoke(
+                        session, token_data.jti, token_data.exp
+                    )
+        token_cache.invalidate(token)
+
+
+    @tracer.traced()
     async def activate_user(
             self,
             id: int,
-            session: AsyncSession
+            uow: UnitOfWork
     ) -> None:
-        async with session.begin():
+        async with uow.write() as session:
             user_repo = UserRepo(session=session)
             await user_repo.activate_user(id=id)
 
 
 
+    @tracer.traced()
     async def get_current_user(
         self,
         token: str = Depends(oauth2_scheme),
-        session: AsyncSession = Depends(db_manager.get_async_session),
+        uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
     ) -> GetUser:
         """
         Call this method allows you to get current user by verifying the token,
         and as dependency makes endpoint protected.\n
         Args:\n
         token (str): auth token. example "eyJhbGciOiJIUzI1Ni....AsdEWQ"\n
-        session (AsyncSession): Database session.\n
+        uow (UnitOfWork): request unit of work.\n
         Raises:\n
         HTTPException: HTTP_401_UNAUTHORIZED.\n
         Returns:\n
@@ -87,15 +216,34 @@ class AuthService:
 
         """
 
-        async with session.begin():
+        form_data_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not valid credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+        cached = token_cache.get(token)
+        if cached is not None:
+            user, jti = cached
+            if await revocation_list.is_revoked(jti):
+                token_cache.invalidate(token)
+                raise form_data_exception
+            return user
 
-            form_data_exception = HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not valid credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        token_data = await self.verify_access_token(token, form_data_exception)
+        if await revocation_list.is_revoked(token_data.jti):
+            raise form_data_exception
 
-            token = await self.verify_access_token(token, form_data_exception)
+        async with uow.read() as session:
             user_repo = UserRepo(session)
-            user = await user_repo.get_user(token.id)
-            return GetUser.model_validate(user, from_attributes=True)
+            user = await user_repo.get_user_snapshot(token_data.id)
+            if user is None:
+                raise form_data_exception
+
+        token_cache.set(
+            token,
+            (user, token_data.jti),
+            expires_at=token_data.exp.timestamp() if token_data.exp else None,
+            tag=user.id,
+        )
+        return user
@@ -0,0 +1,155 @@
+import asyncio
+import datetime as dt
+from typing import Awaitable, Callable
+from app.core.config import lazy, outbox_config
+from app.core.db import db_manager
+from app.core.repository import OutboxRepo
+from app.utils.metrics import outbox_messages_total
+from .auth import AuthService
+
+
+Deliver = Callable[[list[dict]], Awaitable[None]]
+
+
+def _publish(messages: list[dict]) -> None:
+    # Celery импортируется при первой отправке и в потоке, а не при
+    # импорте API: больше он процессу API ни для чего не нужен.
+    from app.bg_tasks.email_tasks import send_verify_tokens
+
+    send_verify_tokens.delay(messages)
+
+
+async def deliver_with_celery(messages: list[dict]) -> None:
+    """Отдает пачку писем задаче send_verify_tokens одной публикацией.
+    Клиент брокера синхронный, поэтому публикация идет в потоке."""
+    await asyncio.to_thread(_publish, messages)
+
+
+class OutboxDispatcher:
+    """Фоновая задача, которая разбирает outbox писем подтверждения.
+    Регистрация только пишет строку в verify_outbox в своей транзакции
+    и будит диспетчер после коммита, так что ни задержка, ни отказ
+    брокера на нее не влияют. Диспетчер забирает письма пачками
+    через FOR UPDATE SKIP LOCKED, поэтому его можно запускать в каждом
+    инстансе: пачки не пересекаются. Токен ссылки выпускается в момент
+    отправки, чтобы не истечь, пока письмо ждет в outbox. Если отправка
+    не удалась, пачка откладывается с экспоненциальной задержкой.
+    Доставка "хотя бы один раз": при сбое между отправкой и коммитом
+    письмо уйдет повторно.
+    """
+
+    def __init__(
+        self,
+        auth_service: AuthService,
+        batch_size: int,
+        poll_interval: float,
+        retry_delay: float,
+        max_retry_delay: float,
+        deliver: Deliver = deliver_with_celery,
+    ) -> None:
+        self.auth_service = auth_service
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.deliver = deliver
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.retried = 0
+        self.batches = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def notify(self) -> None:
+        """Будит диспетчер. Вызывается через on_commit транзакции,
+        которая добавила письма."""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if not self.running:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Дожидается отправки текущей пачки и останавливает диспетчер.
+        Неотправленные письма остаются в outbox."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def dispatch_once(self) -> int:
+        """Отправляет одну пачку писем. Возвращает число отправленных."""
+        async with db_manager.async_session.begin() as session:
+            repo = OutboxRepo(session)
+            rows = await repo.claim(self.batch_size)
+            if not rows:
+                return 0
+            ids = [row.id for row in rows]
+            messages = [
+                {
+                    "email": row.email,
+                    "token": self.auth_service.create_verify_token(row.user_id),
+                }
+                for row in rows
+            ]
+            try:
+                await self.deliver(messages)
+            except Exception:
+                attempts = max(row.attempts for row in rows)
+                delay = min(self.retry_delay * 2**attempts, self.max_retry_delay)
+                await repo.postpone(
+                    ids, dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=delay)
+                )
+                sent = 0
+            else:
+                await repo.delete(ids)
+                sent = len(rows)
+        self.batches += 1
+        self.sent += sent
+        self.retried += len(rows) - sent
+        outbox_messages_total.inc(sent, result="sent")
+        outbox_messages_total.inc(len(rows) - sent, result="retry")
+        return sent
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "sent": self.sent,
+            "retried": self.retried,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                sent = await self.dispatch_once()
+            except Exception:
+                # БД недоступна: повторим на следующем опросе
+                self.errors += 1
+                sent = 0
+            if sent < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+outbox_dispatcher = lazy(
+    lambda: OutboxDispatcher(
+        auth_service=AuthService(),
+        batch_size=outbox_config.OUTBOX_BATCH_SIZE,
+        poll_interval=outbox_config.OUTBOX_POLL_INTERVAL,
+        retry_delay=outbox_config.OUTBOX_RETRY_DELAY,
+        max_retry_delay=outbox_config.OUTBOX_MAX_RETRY_DELAY,
+    )
+)
@@ -1,25 +1,63 @@
-from pydantic import EmailStr
-from app.core.repository import UserRepo
-from app.schemas.user import GetUser, CreateUser, UpdateUser, LoginUser
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+from typing import AsyncIterator
+from pydantic import EmailStr, ValidationError
+from app.core.db import db_manager
+from app.core.repository import OutboxRepo, UserRepo
+from app.models.user import Role
+from app.schemas.user import (
+    GetUser,
+    CreateUser,
+    UpdateUser,
+    LoginUser,
+    UserFilter,
+    UserRow,
+    ImportResult,
+    ImportRowError,
+    BatchUpdateUsers,
+    BatchDeleteUsers,
+    BatchDeleteResult,
+)
+from sqlalchemy.exc import IntegrityError
+from app.core.uow import UnitOfWork, on_commit
+from app.utils.bulk import Row
 from app.utils.hasher import Hasher
+from app.utils.tracing import tracer
+from app.utils.single_flight import user_lookups
+from app.utils.user_cache import user_cache
 from fastapi import HTTPException
+from .outbox import outbox_dispatcher
+
+
+IMPORT_BATCH_SIZE = 1000
 
 
 class UserService:
 
-    async def create_user(self, data: CreateUser, session: AsyncSession) -> GetUser:
-        async with session.begin():
-            data = data.model_dump()
-            data["password"] = Hasher.hash_password(data["password"])
+    @tracer.traced()
+    async def create_user(self, data: CreateUser, uow: UnitOfWork) -> GetUser:
+        data = data.model_dump()
+        data["password"] = await Hasher.hash_password_async(data["password"])
+        async with uow.write() as session:
             user_repo = UserRepo(session)
             user = await user_repo.create_user(user_data=data)
+            # Письмо подтверждения уходит через outbox в той же транзакции
+            await OutboxRepo(session).add(user_id=user.id, email=user.email)
+            on_commit(session, outbox_dispatcher.notify)
             return GetUser.model_validate(user, from_attributes=True)
 
-    async def get_users(self, session: AsyncSession) -> list[GetUser]:
-        async with session.begin():
+    @tracer.traced()
+    async def get_users(
+        self,
+        uow: UnitOfWork,
+        filters: UserFilter,
+        limit: int,
+        after: int | None = None,
+    ) -> list[GetUser]:
+        async with uow.read() as session:
             user_repo = UserRepo(session)
-            users_data = await user_repo.get_users()
+            users_data = await user_repo.get_users(
+                filters=filters, limit=limit, after=after
+            )
             if users_data is None:
                 return []
             return [
@@ -27,34 +65,83 @@ class UserService:
                 for user in users_data
             ]
 
-    async def get_user_by_id(self, id: int, session: AsyncSession) -> GetUser:
-        async with session.begin():
-            user_repo = UserRepo(session=session)
-            user_data = await user_repo.get_user(user_id=id)
-            if user_data is None:
-                raise HTTPException(
-                    status_code=404, detail=f"User with id: {id} has not found"
-                )
-            user = GetUser.model_validate(user_data, from_attributes=True)
-            return user
+    @tracer.traced()
+    async def get_user_rows(
+        self,
+        uow: UnitOfWork,
+        filters: UserFilter,
+        limit: int,
+        after: int | None = None,
+    ) -> list[UserRow]:
+        async with uow.read() as session:
+            return await UserRepo(session).get_user_rows(
+                filters=filters, limit=limit, after=after
+            )
 
+    async def stream_users(
+        self, filters: UserFilter, after: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """Отдает пользователей построчно в формате NDJSON.
+        Открывает собственную сессию: сессия из зависимости
+        закрывается раньше, чем начинается отправка ответа.
+        """
+        async with db_manager.async_stream_session() as session:
+            async with session.begin():
+                user_repo = UserRepo(session)
+                async for user in user_repo.stream_users(filters=filters, after=after):
+                    user = GetUser.model_validate(user, from_attributes=True)
+                    yield user.model_dump_json().encode() + b"\n"
+
+    @tracer.traced()
+    async def get_user_by_id(self, id: int, uow: UnitOfWork) -> GetUser:
+        async def load_user() -> GetUser | None:
+            async with uow.read() as session:
+                user_repo = UserRepo(session=session)
+                return await user_repo.get_user_snapshot(user_id=id)
+
+        user = await self._lookup(
+            ("id", id), uow, lambda: user_cache.get_by_id(id, load_user)
+        )
+        if user is None:
+            raise HTTPException(
+                status_code=404, detail=f"User with id: {id} has not found"
+            )
+        return user
+
+    @tracer.traced()
     async def get_user_by_email(
-        self, email: EmailStr, session: AsyncSession
+        self, email: EmailStr, uow: UnitOfWork
     ) -> GetUser:
-        async with session.begin():
-            user_repo = UserRepo(session)
-            user_data = await user_repo.get_user_by_email(email=email)
-            if user_data is None:
-                raise HTTPException(
-                    status_code=404, detail=f"User with id: {email} has not found"
-                )
-            user = GetUser.model_validate(user_data, from_attributes=True)
-            return user
+        async def load_user() -> GetUser | None:
+            async with uow.read() as session:
+                user_repo = UserRepo(session)
+                return await user_repo.get_user_snapshot_by_email(email=email)
+
+        user = await self._lookup(
+            ("email", email.lower()),
+            uow,
+            lambda: user_cache.get_by_email(email, load_user),
+        )
+        if user is None:
+            raise HTTPException(
+                status_code=404, detail=f"User with id: {email} has not found"
+            )
+        return user
+
+    @staticmethod
+    async def _lookup(key, uow: UnitOfWork, load) -> GetUser | None:
+        """Одновременные поиски одного пользователя делят один запрос.
+        Запрос, который уже писал, читает свои незакоммиченные данные,
+        поэтому ищет сам."""
+        if uow.writing:
+            return await load()
+        return await user_lookups.do(key, load)
 
+    @tracer.traced()
     async def update_user(
-        self, id: int, data_to_update: UpdateUser, session: AsyncSession
+        self, id: int, data_to_update: UpdateUser, uow: UnitOfWork
     ) -> GetUser:
-        async with session.begin():
+        async with uow.write() as session:
             user_repo = UserRepo(session)
             data_to_update = data_to_update.model_dump()
             updated_data = await user_repo.update_user(id=id, user_data=data_to_update)
@@ -62,7 +149,176 @@ class UserService:
             user = GetUser.model_validate(updated_data, from_attributes=True)
             return user
 
-    async def delete_user(self, id: int, session: AsyncSession) -> None:
-        async with session.begin():
+    @tracer.traced()
+    async def delete_user(self, id: int, uow: UnitOfWork) -> None:
+        async with uow.write() as session:
             user_repo = UserRepo(session)
             await user_repo.delete_user(id=id)
+
+    @tracer.traced()
+    async def update_users(
+        self, data: BatchUpdateUsers, uow: UnitOfWork
+    ) -> list[GetUser]:
+        async with uow.write() as session:
+            user_repo = UserRepo(session)
+            updated_users = await user_repo.update_users(
+                ids=data.ids, user_data=data.data.model_dump()
+            )
+            return [
+                GetUser.model_validate(user, from_attributes=True)
+                for user in updated_users
+            ]
+
+    @tracer.traced()
+    async def delete_users(
+        self, data: BatchDeleteUsers, uow: UnitOfWork
+    ) -> BatchDeleteResult:
+        async with uow.write() as session:
+            user_repo = UserRepo(session)
+            deleted_ids = await user_repo.delete_users(ids=data.ids)
+        not_found = sorted(set(data.ids) - set(deleted_ids))
+        return BatchDeleteResult(deleted=sorted(deleted_ids), not_found=not_found)
+
+    @tracer.traced()
+    async def import_users(
+        self,
+        rows: AsyncIterator[Row],
+        uow: UnitOfWork,
+        activate: bool = False,
+    ) -> ImportResult:
+        """Массово создает пользователей из потока записей.
+        Записи проверяются валидаторами CreateUser, пароли хешируются
+        параллельно, а новые пользователи загружаются пачками через COPY.
+        Без activate каждому новому пользователю в той же транзакции
+        ставится письмо подтверждения в outbox.
+        Ошибочные записи пропускаются и попадают в отчет.
+        """
+        result = ImportResult()
+        seen_emails: set[str] = set()
+        batch: list[tuple[int, CreateUser]] = []
+
+        async for line, row, error in rows:
+            user = None
+            if error is None:
+                try:
+                    user = CreateUser.model_validate(row)
+                except ValidationError as e:
+                    error = "; ".join(err["msg"] for err in e.errors())
+                except HTTPException as e:
+                    error = str(e.detail)
+            if user is not None and user.email.lower() in seen_emails:
+                error = "Адрес уже встречался в файле"
+            if error is not None:
+                email = row.get("email") if row else None
+                result.errors.append(
+                    ImportRowError(line=line, email=email, detail=error)
+                )
+                continue
+
+            seen_emails.add(user.email.lower())
+            batch.append((line, user))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await self._import_batch(batch, uow, activate, result)
+                batch = []
+
+        if batch:
+            await self._import_batch(batch, uow, activate, result)
+        result.errors.sort(key=lambda error: error.line)
+        result.failed = len(result.errors)
+        return result
+
+    async def _import_batch(
+        self,
+        batch: list[tuple[int, CreateUser]],
+        uow: UnitOfWork,
+        activate: bool,
+        result: ImportResult,
+    ) -> None:
+        async with uow.read() as session:
+            existing = await UserRepo(session).get_existing_emails(
+                [user.email for _, user in batch]
+            )
+        new_users = [
+            user for _, user in batch if user.email.lower() not in existing
+        ]
+        passwords = await asyncio.gather(
+            *(Hasher.hash_password_async(user.password) for user in new_users)
+        )
+        records = [
+            (
+                user.email,
+                password,
+                user.name,
+                user.surname,
+                user.date_of_birth,
+                Role.USER.name,
+                activate,
+            )
+            for user, password in zip(new_users, passwords)
+        ]
+
+        # Между проверкой и COPY адрес мог занять параллельный запрос:
+        # тогда проверяем адреса заново и повторяем пачку один раз.
+        for attempt in range(2):
+            try:
+                async with uow.write() as session:
+                    user_repo = UserRepo(session)
+                    if attempt:
+                        existing = await user_repo.get_existing_emails(
+                            [record[0] for record in records]
+                        )
+                        records = [
+                            r for r in records if r[0].lower() not in existing
+                        ]
+                    if records:
+                        await user_repo.copy_users(records)
+                    if records and not activate:
+                        # Неподтвержденным нужно письмо: outbox в той же транзакции
+                        await OutboxRepo(session).add_by_emails(
+                            [record[0] for record in records]
+                        )
+                        on_commit(session, outbox_dispatcher.notify)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+
+        imported = {record[0] for record in records}
+        for line, user in batch:
+            if user.email not in imported:
+                result.errors.append(
+                    ImportRowError(
+                        line=line,
+                        email=user.email,
+                        detail="Пользователь с таким адресом уже существует",
+                    )
+                )
+        result.imported += len(records)
+
+    async def export_users(self) -> AsyncIterator[bytes]:
+        """Отдает пользователей в CSV, читая вывод COPY TO по частям.
+        Очередь ограничена, поэтому COPY не обгоняет медленного клиента.
+        """
+        queue: asyncio.Queue[bytes | Exception | None] = asyncio.Queue(maxsize=16)
+
+        async def copy_users() -> None:
+            try:
+                async with db_manager.async_stream_session() as session:
+                    async with session.begin():
+                        await UserRepo(session).export_users_csv(queue.put)
+            except Exception as e:
+                await queue.put(e)
+            else:
+                await queue.put(None)
+
+        task = asyncio.create_task(copy_users())
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            task.cancel()
@@ -1,16 +1,44 @@
-from datetime import timedelta
+import math
 from typing import Annotated
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from pydantic import EmailStr
-from app.schemas.user import GetUser, CreateUser, UpdateUser
-from app.schemas.token import Token
-from sqlalchemy.ext.asyncio import AsyncSession
-from .deps import get_auth_service, get_user_service, auth_service
+from app.schemas.user import (
+    GetUser,
+    CreateUser,
+    UpdateUser,
+    UserFilter,
+    ImportResult,
+    BatchUpdateUsers,
+    BatchDeleteUsers,
+    BatchDeleteResult,
+)
+from app.schemas.token import LogoutRequest, RefreshRequest, Token
+from app.core.uow import UnitOfWork
+from .deps import (
+    get_auth_service,
+    get_user_service,
+    get_current_admin,
+    auth_service,
+)
 from .actions.auth import AuthService
 from .actions.user import UserService
 from app.core.db import db_manager
-from app.bg_tasks.conf import send_verify_token
+from app.utils.bulk import iter_csv_rows, iter_ndjson_rows
+from app.utils.hasher import Hasher
+from app.utils.login_limiter import login_limiter
+from app.utils.serialization import dump_user_rows, etag_matches, rows_etag
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -18,47 +46,112 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.get("", response_model=list[GetUser])
 async def get_users(
-    session: AsyncSession = Depends(db_manager.get_async_session),
+    filters: UserFilter = Depends(),
+    limit: int = Query(default=100, ge=1, le=1000),
+    after: int | None = Query(
+        default=None, description="id последнего пользователя предыдущей страницы"
+    ),
+    stream: bool = Query(
+        default=False, description="Отдать всех пользователей потоком NDJSON"
+    ),
+    if_none_match: str | None = Header(default=None),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
     user_service: UserService = Depends(get_user_service),
     current_user: GetUser = Depends(auth_service.get_current_user),
 ) -> list[GetUser]:
-    """Возвращает список всех пользователей"""
-    users = await user_service.get_users(session)
-    return users
+    """Возвращает страницу пользователей, отсортированных по id.
+    Если есть следующая страница, ее курсор передается в заголовке X-Next-After.
+    Страница сериализуется из строк БД без моделей GetUser и отдается с ETag:
+    если страница не изменилась, на If-None-Match ответ 304 без тела.
+    С параметром stream=true возвращает всех подходящих пользователей в NDJSON.
+    """
+    if stream:
+        return StreamingResponse(
+            user_service.stream_users(filters=filters, after=after),
+            media_type="application/x-ndjson",
+        )
+    rows = await user_service.get_user_rows(
+        uow, filters=filters, limit=limit + 1, after=after
+    )
+    # ETag считается и по лишней строке: от нее зависит X-Next-After
+    headers = {"ETag": rows_etag(rows), "Cache-Control": "private, no-cache"}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-After"] = str(rows[-1]["id"])
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=dump_user_rows(rows), media_type="application/json", headers=headers
+    )
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: CreateUser,
-    session: AsyncSession = Depends(db_manager.get_async_session),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
     user_service: UserService = Depends(get_user_service),
-    auth_service: AuthService = Depends(get_auth_service)
 ) -> None:
-    """Создает нового пользователя в базе данных"""
-    user = await user_service.create_user(data=user_data, session=session)
-    token = auth_service.create_access_token(
-        data=({"id": str(user.id), "role": user.role}),
-        expires_delta=timedelta(minutes=10),
-    )
-    send_verify_token.delay(
-        email=user.email,
-        token=token
-    )
+    """Создает нового пользователя в базе данных.
+    Письмо подтверждения отправляется фоном через outbox."""
+    user = await user_service.create_user(data=user_data, uow=uow)
     return {
         "msg": f"Confirm message sent to {user.email}"
     }
 
 
+@router.post("/import", response_model=ImportResult)
+async def import_users(
+    request: Request,
+    activate: bool = Query(
+        default=False, description="Создать пользователей уже подтвержденными"
+    ),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
+    user_service: UserService = Depends(get_user_service),
+    current_user: GetUser = Depends(get_current_admin),
+) -> ImportResult:
+    """Массово создает пользователей из тела запроса.
+    Принимает text/csv с заголовком или application/x-ndjson,
+    поля записи такие же, как у CreateUser.
+    Возвращает отчет с ошибками по строкам.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == "text/csv":
+        rows = iter_csv_rows(request.stream())
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        rows = iter_ndjson_rows(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Ожидается text/csv или application/x-ndjson",
+        )
+    return await user_service.import_users(
+        rows=rows, uow=uow, activate=activate
+    )
+
+
+@router.get("/export")
+async def export_users(
+    user_service: UserService = Depends(get_user_service),
+    current_user: GetUser = Depends(get_current_admin),
+):
+    """Выгружает всех пользователей в CSV (без паролей)"""
+    return StreamingResponse(
+        user_service.export_users(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="users.csv"'},
+    )
+
+
 @router.get("/verify")
 async def verify_email(
     token: str,
-    session: AsyncSession = Depends(db_manager.get_async_session),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
     auth_service: AuthService = Depends(get_auth_service)
 ):
     token_data = await auth_service.verify_access_token(token=token)
     await auth_service.activate_user(
         id=token_data.id,
-        session=session
+        uow=uow
     )
     return {
         "msg": "Email successfully confirmed!"
@@ -67,37 +160,91 @@ async def verify_email(
 
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
+    request: Request,
+    background_tasks: BackgroundTasks,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     auth_service: AuthService = Depends(get_auth_service),
-    session: AsyncSession = Depends(db_manager.get_async_session),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
 ):
-    user = await auth_service.authenticate_user(
-        email=form_data.username, password=form_data.password, session=session
+    ip = login_limiter.client_ip(
+        peer=request.client.host if request.client else None,
+        forwarded_for=request.headers.get("x-forwarded-for"),
     )
-    if user.is_active == False:
+    retry_after = await login_limiter.check(ip=ip, email=form_data.username)
+    if retry_after:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You should verificate your email address"
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
         )
+    user = await auth_service.authenticate_user(
+        email=form_data.username, password=form_data.password, uow=uow
+    )
     if not user:
+        await login_limiter.failure(ip=ip, email=form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="invalid username or password",
         )
-    token = auth_service.create_access_token(
-        data=({"id": str(user.id), "role": user.role}),
-        expires_delta=timedelta(minutes=60 * 8),
+    await login_limiter.success(email=form_data.username)
+    if Hasher.needs_update(user.password):
+        background_tasks.add_task(
+            auth_service.rehash_password,
+            id=user.id,
+            password=form_data.password,
+            old_hash=user.password,
+        )
+    if user.is_active == False:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You should verificate your email address"
+        )
+    return auth_service.create_token_pair(id=user.id, role=user.role)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_tokens(
+    data: RefreshRequest,
+    auth_service: AuthService = Depends(get_auth_service),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
+):
+    """Выдает новую пару токенов по refresh-токену.
+    Использованный refresh-токен отзывается."""
+    return await auth_service.refresh_tokens(
+        uow=uow, refresh_token=data.refresh_token
+    )
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    data: LogoutRequest | None = None,
+    token: str = Depends(AuthService.oauth2_scheme),
+    auth_service: AuthService = Depends(get_auth_service),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
+) -> None:
+    """Отзывает текущий access-токен и переданный refresh-токен"""
+    await auth_service.logout(
+        uow=uow,
+        token=token,
+        refresh_token=data.refresh_token if data else None,
     )
-    return {"access_token": token, "token_type": "bearer"}
+
+
+@router.get("/me", response_model=GetUser)
+async def get_me(
+    current_user: GetUser = Depends(auth_service.get_current_user),
+):
+    """Возвращает пользователя, которому выдан токен"""
+    return current_user
 
 
 @router.get("/get_user_by_id/{id}", response_model=GetUser, status_code=200)
 async def get_user_by_id(
     id: int,
     user_service: UserService = Depends(get_user_service),
-    session: AsyncSession = Depends(db_manager.get_async_session),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
 ):
-    user = await user_service.get_user_by_id(id=id, session=session)
+    user = await user_service.get_user_by_id(id=id, uow=uow)
     return user
 
 
@@ -105,23 +252,46 @@ async def get_user_by_id(
 async def get_user_by_email(
     email: EmailStr,
     user_service: UserService = Depends(get_user_service),
-    session: AsyncSession = Depends(db_manager.get_async_session),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
 ):
-    user = await user_service.get_user_by_email(email=email, session=session)
+    user = await user_service.get_user_by_email(email=email, uow=uow)
     return user
 
 
+@router.put("/batch", response_model=list[GetUser])
+async def update_users(
+    data: BatchUpdateUsers,
+    user_service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
+    current_user: GetUser = Depends(get_current_admin),
+) -> list[GetUser]:
+    """Обновляет нескольких пользователей одним запросом,
+    возвращает только найденных"""
+    return await user_service.update_users(data=data, uow=uow)
+
+
+@router.post("/batch_delete", response_model=BatchDeleteResult)
+async def delete_users(
+    data: BatchDeleteUsers,
+    user_service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
+    current_user: GetUser = Depends(get_current_admin),
+) -> BatchDeleteResult:
+    """Удаляет нескольких пользователей одним запросом"""
+    return await user_service.delete_users(data=data, uow=uow)
+
+
 @router.put("/{id}", response_model=GetUser, status_code=status.HTTP_201_CREATED)
 async def update_user(
     data_to_update: UpdateUser,
     id: int,
     user_service: UserService = Depends(get_user_service),
-    session: AsyncSession = Depends(db_manager.get_async_session),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
     current_user: GetUser = Depends(auth_service.get_current_user),
 ) -> GetUser:
 
     updated_user = await user_service.update_user(
-        id=id, data_to_update=data_to_update, session=session
+        id=id, data_to_update=data_to_update, uow=uow
     )
 
     return updated_user
@@ -131,7 +301,7 @@ async def update_user(
 async def delete_user(
     id: int,
     user_service: UserService = Depends(get_user_service),
-    session: AsyncSession = Depends(db_manager.get_async_session),
+    uow: UnitOfWork = Depends(db_manager.get_unit_of_work),
     current_user: GetUser = Depends(auth_service.get_current_user),
 ) -> None:
-    return await user_service.delete_user(id=id, session=session)
+    return await user_service.delete_user(id=id, uow=uow)
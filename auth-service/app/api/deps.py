@@ -1,5 +1,8 @@
+from fastapi import Depends, HTTPException, status
 from app.api.actions.auth import AuthService
 from app.api.actions.user import UserService
+from app.models.user import Role
+from app.schemas.user import GetUser
 
 
 user_service = UserService()
@@ -12,3 +15,14 @@ def get_user_service():
 
 def get_auth_service():
     return auth_service
+
+
+async def get_current_admin(
+    current_user: GetUser = Depends(auth_service.get_current_user),
+) -> GetUser:
+    if current_user.role not in (Role.ADMIN, Role.SUPER_USER):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для выполнения операции",
+        )
+    return current_user
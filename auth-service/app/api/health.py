@@ -0,0 +1,227 @@
+import asyncio
+import contextlib
+import functools
+import signal
+import threading
+import time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.api.actions.outbox import outbox_dispatcher
+from app.api.deps import auth_service
+from app.core.config import lazy, lifecycle_config, outbox_config
+from app.core.db import db_manager
+from app.core.keys import key_ring
+from app.core.repository import WARM_UP_QUERIES
+from app.core.revocation import revocation_list
+from app.utils.hasher import hasher_pool
+from app.utils.tracing import tracer
+
+
+class Lifecycle:
+    """Запуск и остановка процесса API.
+    startup запускает фоновые воркеры и прогрев: соединения пула
+    с подготовленными горячими запросами, ключи подписи и JWT, фильтр
+    отозванных токенов, воркеры пула хеширования. Прогрев идет в фоне
+    и повторяется при ошибке, процесс тем временем отвечает на
+    /health/live, а /health/ready становится 200 только после прогрева.
+    Остановка начинается с SIGTERM (см. handle_signals): ready сразу
+    становится 503, но сервер еще shutdown_delay секунд принимает запросы,
+    пока балансировщик не перестанет их слать, затем ждет завершения
+    запросов в работе (не дольше drain_timeout) и только после этого
+    передает сигнал uvicorn. uvicorn закрывает порт и вызывает shutdown,
+    который останавливает воркеры и закрывает пулы.
+    params: warm_up_connections: сколько соединений пула открыть,
+    None - весь пул, warm_up_hasher: прогревать ли пул хеширования,
+    retry_delay: пауза перед повтором упавшего шага прогрева,
+    shutdown_delay: сколько принимать запросы после SIGTERM,
+    drain_timeout: сколько ждать запросы в работе.
+    """
+
+    def __init__(
+        self,
+        warm_up_connections: int | None,
+        warm_up_hasher: bool,
+        retry_delay: float,
+        shutdown_delay: float,
+        drain_timeout: float,
+    ) -> None:
+        self.warm_up_connections = warm_up_connections
+        self.warm_up_hasher = warm_up_hasher
+        self.retry_delay = retry_delay
+        self.shutdown_delay = shutdown_delay
+        self.drain_timeout = drain_timeout
+        self.ready = False
+        self.draining = False
+        self.in_flight = 0
+        self.warm_up_ms: dict[str, float] = {}
+        self.last_error: str | None = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._warm_up_task: asyncio.Task | None = None
+        self._drain_task: asyncio.Task | None = None
+
+    def request_started(self) -> None:
+        self.in_flight += 1
+        self._idle.clear()
+
+    def request_finished(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    async def startup(self) -> None:
+        self.ready = False
+        self.draining = False
+        self.warm_up_ms = {}
+        if outbox_config.OUTBOX_ENABLED:
+            outbox_dispatcher.start()
+        self._warm_up_task = asyncio.create_task(self.warm_up())
+
+    async def warm_up(self) -> None:
+        steps = [
+            ("db", self._warm_up_db),
+            ("keys", self._warm_up_keys),
+            ("revocation", revocation_list.load),
+        ]
+        if self.warm_up_hasher:
+            steps.append(("hasher", hasher_pool.warm_up))
+        for name, step in steps:
+            while True:
+                start = time.perf_counter()
+                try:
+                    await step()
+                    break
+                except Exception as exc:
+                    self.last_error = f"{name}: {type(exc).__name__}: {exc}"
+                    await asyncio.sleep(self.retry_delay)
+            self.warm_up_ms[name] = (time.perf_counter() - start) * 1000
+        revocation_list.start()
+        self.last_error = None
+        self.ready = not self.draining
+
+    async def wait_ready(self) -> None:
+        """Ждет окончания прогрева, запущенного startup"""
+        if self._warm_up_task is not None:
+            await asyncio.shield(self._warm_up_task)
+
+    def handle_signals(self) -> None:
+        """Оборачивает обработчик SIGTERM, который поставил uvicorn (сам
+        или в UvicornWorker gunicorn): первый сигнал запускает drain, а
+        uvicorn получает его после drain. Повторный сигнал передается
+        сразу. Вызывается из lifespan: к этому моменту обработчик уже
+        стоит. Без него (процесс запущен не uvicorn) ничего не делает."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGTERM)
+        if not callable(previous):
+            return
+        loop = asyncio.get_running_loop()
+
+        def on_sigterm(signum, frame) -> None:
+            if self._drain_task is not None:
+                previous(signum, frame)
+                return
+            exit = functools.partial(previous, signum, frame)
+            loop.call_soon_threadsafe(self._start_drain, exit)
+
+        signal.signal(signal.SIGTERM, on_sigterm)
+
+    def _start_drain(self, exit) -> None:
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain(exit))
+
+    async def _drain(self, exit) -> None:
+        self.ready = False
+        self.draining = True
+        await asyncio.sleep(self.shutdown_delay)
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+        exit()
+
+    async def shutdown(self) -> None:
+        self.ready = False
+        self.draining = True
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._warm_up_task
+            self._warm_up_task = None
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+        await outbox_dispatcher.stop()
+        await revocation_list.stop()
+        await asyncio.to_thread(hasher_pool.shutdown)
+        tracer.shutdown()
+        await db_manager.dispose()
+
+    def stats(self) -> dict:
+        if self.ready:
+            status = "ready"
+        elif self.draining:
+            status = "draining"
+        else:
+            status = "starting"
+        return {
+            "status": status,
+            "in_flight": self.in_flight,
+            "warm_up_ms": self.warm_up_ms,
+            "last_error": self.last_error,
+        }
+
+    async def _warm_up_db(self) -> None:
+        await db_manager.warm_up(self.warm_up_connections, WARM_UP_QUERIES)
+
+    async def _warm_up_keys(self) -> None:
+        # Загрузка ключей и бэкенда подписи, кеш JWKS
+        key_ring.jwks()
+        token = auth_service.create_verify_token(0)
+        await auth_service.verify_access_token(
+            token, form_data_exception=RuntimeError("warm-up token rejected")
+        )
+
+
+lifecycle = lazy(
+    lambda: Lifecycle(
+        warm_up_connections=lifecycle_config.WARMUP_DB_CONNECTIONS,
+        warm_up_hasher=lifecycle_config.WARMUP_HASHER,
+        retry_delay=lifecycle_config.WARMUP_RETRY_DELAY,
+        shutdown_delay=lifecycle_config.SHUTDOWN_DELAY,
+        drain_timeout=lifecycle_config.SHUTDOWN_DRAIN_TIMEOUT,
+    )
+)
+
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live", include_in_schema=False)
+async def live() -> dict:
+    """Процесс жив и обслуживает event loop"""
+    return {"status": "ok"}
+
+
+@router.get("/ready", include_in_schema=False)
+async def ready() -> JSONResponse:
+    """200, когда процесс прогрет и не останавливается, иначе 503"""
+    return JSONResponse(
+        lifecycle.stats(), status_code=200 if lifecycle.ready else 503
+    )
+
+
+class InFlightMiddleware:
+    """ASGI middleware: считает запросы в работе, чтобы остановка
+    дождалась их завершения."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        lifecycle.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lifecycle.request_finished()
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+from app.core.config import auth_config
+from app.core.keys import key_ring
+
+
+router = APIRouter(prefix="/.well-known", tags=["JWKS"])
+
+
+@router.get("/jwks.json")
+async def get_jwks() -> Response:
+    """Публичные ключи для локальной проверки токенов другими сервисами"""
+    return Response(
+        content=key_ring.jwks(),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={auth_config.JWKS_MAX_AGE}"},
+    )
@@ -0,0 +1,59 @@
+import time
+from fastapi import APIRouter, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import metrics_config
+from app.utils.metrics import (
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+    registry,
+)
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """Метрики процесса и воркеров Celery в текстовом формате Prometheus"""
+    return Response(
+        content=registry.render(metrics_config.METRICS_DIR),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware: число запросов, задержка и запросы в работе.
+    Метка route - шаблон пути из роутера (/users/{id}), а не сам путь,
+    чтобы число рядов не росло с числом пользователей.
+    METRICS_ENABLED проверяется на запросе, а не при сборке приложения,
+    чтобы импорт app.main не читал настройки.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not metrics_config.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "<unmatched>")
+            method = scope["method"]
+            http_request_duration_seconds.observe(elapsed, method=method, route=path)
+            http_requests_total.inc(method=method, route=path, status=status_code)
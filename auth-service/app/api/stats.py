@@ -0,0 +1,69 @@
+from fastapi import APIRouter
+from app.api.actions.outbox import outbox_dispatcher
+from app.core.db import db_manager
+from app.core.revocation import revocation_list
+from app.core.tokens import verified_tokens
+from app.utils.hasher import hasher_pool
+from app.utils.cache import token_cache
+from app.utils.login_limiter import login_limiter
+from app.utils.single_flight import user_lookups
+from app.utils.user_cache import user_cache
+
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/hasher")
+async def get_hasher_stats() -> dict:
+    """Возвращает состояние пула хеширования паролей"""
+    return hasher_pool.stats()
+
+
+@router.get("/token_cache")
+async def get_token_cache_stats() -> dict:
+    """Возвращает счетчики кеша проверенных токенов"""
+    return token_cache.stats()
+
+
+@router.get("/user_cache")
+async def get_user_cache_stats() -> dict:
+    """Возвращает счетчики кеша пользователей в Redis"""
+    return user_cache.stats()
+
+
+@router.get("/user_lookups")
+async def get_user_lookups_stats() -> dict:
+    """Возвращает счетчики объединения одновременных поисков пользователя.
+    coalesced - сколько поисков обошлись без своего запроса в БД."""
+    return user_lookups.stats()
+
+
+@router.get("/db")
+async def get_db_stats() -> dict:
+    """Возвращает состояние пулов соединений с БД"""
+    return db_manager.pool_stats()
+
+
+@router.get("/token_memo")
+async def get_token_memo_stats() -> dict:
+    """Возвращает счетчики кеша проверенных подписей JWT"""
+    return verified_tokens.stats()
+
+
+@router.get("/revocation")
+async def get_revocation_stats() -> dict:
+    """Возвращает состояние фильтра отозванных токенов"""
+    return revocation_list.stats()
+
+
+@router.get("/login_limiter")
+async def get_login_limiter_stats() -> dict:
+    """Возвращает счетчики ограничителя попыток входа.
+    rejected - сколько входов отклонено без запроса в БД и bcrypt."""
+    return login_limiter.stats()
+
+
+@router.get("/outbox")
+async def get_outbox_stats() -> dict:
+    """Возвращает счетчики диспетчера писем подтверждения"""
+    return outbox_dispatcher.stats()
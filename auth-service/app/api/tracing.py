@@ -0,0 +1,44 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.tracing import tracer
+
+
+class TracingMiddleware:
+    """ASGI middleware: корневой span запроса (kind SERVER).
+    Продолжает трассу из заголовка traceparent, если он пришел,
+    и возвращает traceparent в ответе.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        parent = tracer.extract(Headers(scope=scope))
+        with tracer.span(
+            scope["method"],
+            kind="SERVER",
+            attributes={"http.method": scope["method"], "url.path": scope["path"]},
+            parent=parent,
+        ) as span:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "ERROR"
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"traceparent", span.context.traceparent().encode())
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{scope['method']} {route.path}"
+                    span.set_attribute("http.route", route.path)
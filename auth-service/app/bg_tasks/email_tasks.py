@@ -0,0 +1,27 @@
+from celery.signals import worker_process_shutdown
+from pydantic import EmailStr
+from .conf import celery_app
+from .mailer import build_verify_message, get_mailer
+
+
+@celery_app.task
+def send_verify_token(email: EmailStr, token):
+    get_mailer().send(build_verify_message(email, token))
+
+
+@celery_app.task
+def send_verify_tokens(messages: list[dict]) -> list[str]:
+    """Отправляет пачку писем подтверждения по одному SMTP-соединению.
+    messages: [{"email": ..., "token": ...}, ...]
+    Возвращает адреса, на которые письмо отправить не удалось.
+    """
+    failed = get_mailer().send_many(
+        [build_verify_message(item["email"], item["token"]) for item in messages]
+    )
+    return [email for email, _ in failed]
+
+
+@worker_process_shutdown.connect
+def close_mailer(**kwargs) -> None:
+    if get_mailer.cache_info().currsize:
+        get_mailer().close()
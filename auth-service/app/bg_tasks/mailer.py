@@ -0,0 +1,194 @@
+import functools
+import pathlib
+import smtplib
+import string
+import threading
+import time
+from email.message import EmailMessage
+from app.core.config import email_config
+
+
+TEMPLATES_DIR = pathlib.Path(__file__).parent / "templates"
+
+
+@functools.lru_cache
+def load_template(name: str) -> string.Template:
+    """Читает и разбирает шаблон письма один раз на процесс"""
+    return string.Template((TEMPLATES_DIR / name).read_text(encoding="utf-8"))
+
+
+def build_verify_message(email: str, token: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = "Подтвердите электронную почту"
+    msg["From"] = email_config.APP_EMAIL
+    msg["To"] = email
+    msg.set_content(
+        load_template("verify_email.html").substitute(
+            verify_url=f"{email_config.VERIFY_URL}?token={token}"
+        ),
+        subtype="html",
+    )
+    return msg
+
+
+class RateLimiter:
+    """Token bucket: не больше rate сообщений в секунду, с запасом burst"""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            time.sleep((1 - self._tokens) / self.rate)
+
+
+class SMTPMailer:
+    """Отправляет письма через долгоживущее авторизованное SMTP-соединение.
+    Соединение открывается при первой отправке и переиспользуется,
+    пока не отправит max_messages_per_connection писем или не простоит
+    дольше idle_timeout. Временные ошибки повторяются с экспоненциальной
+    задержкой, постоянные (коды 5xx) сразу пробрасываются.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        use_ssl: bool = True,
+        username: str | None = None,
+        password: str | None = None,
+        timeout: float = 10,
+        rate_limit: float = 0,
+        max_retries: int = 3,
+        retry_backoff: float = 1,
+        max_messages_per_connection: int = 100,
+        idle_timeout: float = 60,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self.rate_limiter = RateLimiter(rate_limit, burst=max(1, int(rate_limit)))
+        self._connection: smtplib.SMTP | None = None
+        self._sent_on_connection = 0
+        self._last_used_at = 0.0
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.sent = 0
+        self.retries = 0
+
+    def send(self, message: EmailMessage) -> None:
+        with self._lock:
+            self.rate_limiter.acquire()
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self._get_connection().send_message(message)
+                    break
+                except smtplib.SMTPServerDisconnected:
+                    self.close()
+                    if attempt == self.max_retries:
+                        raise
+                    if attempt == 0:
+                        # Сервер мог закрыть простаивающее соединение,
+                        # переподключаемся без задержки.
+                        self.retries += 1
+                        continue
+                except smtplib.SMTPResponseException as e:
+                    self.close()
+                    if e.smtp_code >= 500 or attempt == self.max_retries:
+                        raise
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Сервер отказал адресату, соединение при этом живо
+                    codes = [code for code, _ in e.recipients.values()]
+                    if min(codes) >= 500 or attempt == self.max_retries:
+                        raise
+                except OSError:
+                    self.close()
+                    if attempt == self.max_retries:
+                        raise
+                self.retries += 1
+                time.sleep(self.retry_backoff * 2**attempt)
+            self.sent += 1
+            self._sent_on_connection += 1
+            self._last_used_at = time.monotonic()
+
+    def send_many(
+        self, messages: list[EmailMessage]
+    ) -> list[tuple[str, Exception]]:
+        """Отправляет письма подряд по одному соединению.
+        Возвращает адресатов, которым письмо отправить не удалось."""
+        failed = []
+        for message in messages:
+            try:
+                self.send(message)
+            except (smtplib.SMTPException, OSError) as e:
+                failed.append((message["To"], e))
+        return failed
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.quit()
+        except (smtplib.SMTPException, OSError):
+            self._connection.close()
+        self._connection = None
+
+    def _get_connection(self) -> smtplib.SMTP:
+        if self._connection is not None and (
+            self._sent_on_connection >= self.max_messages_per_connection
+            or time.monotonic() - self._last_used_at > self.idle_timeout
+        ):
+            self.close()
+        if self._connection is None:
+            self._connection = self._connect()
+            self._sent_on_connection = 0
+        return self._connection
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.username:
+            connection.login(self.username, self.password)
+        self.connections_opened += 1
+        return connection
+
+
+@functools.lru_cache
+def get_mailer() -> SMTPMailer:
+    """Mailer процесса воркера. Создается лениво, чтобы соединение
+    открывалось уже в дочернем процессе после fork."""
+    return SMTPMailer(
+        host=email_config.SMTP_HOST,
+        port=email_config.SMTP_PORT,
+        use_ssl=email_config.SMTP_USE_SSL,
+        username=email_config.APP_EMAIL if email_config.SMTP_LOGIN else None,
+        password=email_config.SECRET_EMAIL,
+        timeout=email_config.SMTP_TIMEOUT,
+        rate_limit=email_config.SMTP_RATE_LIMIT,
+        max_retries=email_config.SMTP_MAX_RETRIES,
+        retry_backoff=email_config.SMTP_RETRY_BACKOFF,
+        max_messages_per_connection=email_config.SMTP_MAX_MESSAGES_PER_CONNECTION,
+        idle_timeout=email_config.SMTP_IDLE_TIMEOUT,
+    )
@@ -0,0 +1,45 @@
+import os
+import time
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown
+from app.core.config import metrics_config
+from app.utils.metrics import celery_task_duration_seconds, registry
+
+
+_started_at: dict[str, float] = {}
+_flushed_at = 0.0
+
+
+def flush(force: bool = False) -> None:
+    """Сбрасывает метрики процесса воркера в METRICS_DIR, откуда их
+    забирает /metrics API. Не чаще раза в METRICS_FLUSH_INTERVAL."""
+    global _flushed_at
+    if not metrics_config.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _flushed_at < metrics_config.METRICS_FLUSH_INTERVAL:
+        return
+    _flushed_at = now
+    registry.write_state(
+        os.path.join(metrics_config.METRICS_DIR, f"celery-{os.getpid()}.json")
+    )
+
+
+@task_prerun.connect
+def start_timer(task_id: str, **kwargs) -> None:
+    _started_at[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def stop_timer(task_id: str, task, state: str | None = None, **kwargs) -> None:
+    start = _started_at.pop(task_id, None)
+    if start is None:
+        return
+    celery_task_duration_seconds.observe(
+        time.perf_counter() - start, task=task.name, state=state or "UNKNOWN"
+    )
+    flush()
+
+
+@worker_process_shutdown.connect
+def flush_on_shutdown(**kwargs) -> None:
+    flush(force=True)
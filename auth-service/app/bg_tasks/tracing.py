@@ -0,0 +1,90 @@
+from celery import Celery
+from celery.signals import (
+    after_task_publish,
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_process_shutdown,
+)
+from kombu.utils.uuid import uuid
+from app.utils.tracing import Span, parse_traceparent, tracer
+
+
+# Span'ы между парными сигналами, по id задачи
+_publish_spans: dict[str, Span] = {}
+_run_spans: dict[str, Span] = {}
+
+
+@before_task_publish.connect
+def start_publish_span(sender: str, headers: dict, **kwargs) -> None:
+    """Span отправки задачи (kind PRODUCER) в трассе запроса.
+    Его контекст уходит воркеру в заголовке задачи traceparent."""
+    if not tracer.enabled:
+        return
+    span = tracer.start(
+        f"{sender} publish",
+        kind="PRODUCER",
+        attributes={
+            "messaging.system": "celery",
+            "messaging.message.id": headers["id"],
+        },
+    )
+    tracer.inject(headers, span)
+    _publish_spans[headers["id"]] = span
+
+
+@after_task_publish.connect
+def end_publish_span(headers: dict, **kwargs) -> None:
+    span = _publish_spans.pop(headers.get("id"), None)
+    if span is not None:
+        tracer.end(span)
+
+
+class TracedCelery(Celery):
+    """Celery, который завершает span отправки, если публикация упала:
+    after_task_publish тогда не приходит, и span остался бы в
+    _publish_spans навсегда."""
+
+    def send_task(self, name: str, args=None, kwargs=None, **options):
+        options["task_id"] = options.get("task_id") or uuid()
+        try:
+            return super().send_task(name, args, kwargs, **options)
+        except BaseException as e:
+            span = _publish_spans.pop(options["task_id"], None)
+            if span is not None:
+                span.record_exception(e)
+                tracer.end(span)
+            raise
+
+
+@task_prerun.connect
+def start_run_span(task_id: str, task, **kwargs) -> None:
+    if not tracer.enabled:
+        return
+    # Воркер кладет заголовки сообщения в атрибуты request,
+    # task.apply(headers=...) - в request.headers.
+    traceparent = getattr(task.request, "traceparent", None) or (
+        task.request.headers or {}
+    ).get("traceparent")
+    _run_spans[task_id] = tracer.start(
+        f"{task.name} process",
+        kind="CONSUMER",
+        attributes={"messaging.system": "celery", "messaging.message.id": task_id},
+        parent=parse_traceparent(traceparent),
+    )
+
+
+@task_postrun.connect
+def end_run_span(task_id: str, state: str | None = None, **kwargs) -> None:
+    span = _run_spans.pop(task_id, None)
+    if span is None:
+        return
+    if state not in (None, "SUCCESS"):
+        span.status = "ERROR"
+        span.status_message = state
+    tracer.end(span)
+
+
+@worker_process_shutdown.connect
+def shutdown_tracer(**kwargs) -> None:
+    tracer.shutdown()
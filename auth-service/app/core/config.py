@@ -1,8 +1,48 @@
 import os
+from typing import Callable, TypeVar
 from pydantic_settings import SettingsConfigDict, BaseSettings
 
 ENV_FILE = os.path.join(os.path.dirname(__file__), ".env")
 
+T = TypeVar("T")
+
+
+class Lazy:
+    """Объект, который создается factory() при первом обращении
+    к атрибуту, а дальше все обращения идут к нему. Так создаются
+    настройки (читаются из окружения и .env) и синглтоны, которые
+    из них собираются: процесс не разбирает настройки, которые ему
+    не нужны (API - почту, воркер Celery - БД), и ошибка в них не ломает
+    импорт. Запись атрибута тоже уходит в созданный объект, поэтому
+    monkeypatch.setattr в тестах работает как с обычным объектом.
+    """
+
+    def __init__(self, factory: Callable[[], object]) -> None:
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def _get(self):
+        if self._instance is None:
+            object.__setattr__(self, "_instance", self._factory())
+        return self._instance
+
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._get(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._get(), name)
+
+    def reset(self) -> None:
+        """Создать объект заново при следующем обращении"""
+        object.__setattr__(self, "_instance", None)
+
+
+def lazy(factory: Callable[[], T]) -> T:
+    return Lazy(factory)  # type: ignore[return-value]
+
 
 class DBConfig(BaseSettings):
     DB_HOST: str
@@ -11,6 +51,21 @@ class DBConfig(BaseSettings):
     DB_PASS: str
     DB_NAME: str
     TEST_DB_NAME: str
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: str | None = None
+
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_QUERY_CACHE_SIZE: int = 500
+    # Сколько соединений могут держать все воркеры API вместе: часть
+    # max_connections Postgres за вычетом Celery, миграций и резерва.
+    # Лаунчер (python -m app) делит ее между воркерами и урезает пул.
+    DB_MAX_CONNECTIONS: int | None = None
 
     @property
     def TEST_DB_URL(self) -> str:
@@ -20,16 +75,39 @@ class DBConfig(BaseSettings):
     def DB_URL(self) -> str:
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def DB_REPLICA_URL(self) -> str | None:
+        if not self.DB_REPLICA_HOST:
+            return None
+        port = self.DB_REPLICA_PORT or self.DB_PORT
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_REPLICA_HOST}:{port}/{self.DB_NAME}"
+
     model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
 
 
-db_config = DBConfig()
+db_config = lazy(DBConfig)
 
 
 class AuthConfig(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL: int = 60
+    JWT_KEYS_DIR: str = os.path.join(os.path.dirname(__file__), "jwt_keys")
+    JWT_KEY_ROTATION_HOURS: float = 24 * 7
+    JWT_KEY_RETENTION_HOURS: float = 24
+    # Сколько проверяющие сервисы кешируют /.well-known/jwks.json
+    JWKS_MAX_AGE: int = 300
+    TOKEN_CODEC: str = "jose"
+    TOKEN_MEMO_SIZE: int = 10_000
+    TOKEN_MEMO_TTL: int = 300
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REVOCATION_BLOOM_CAPACITY: int = 100_000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_INTERVAL: float = 5
+    REVOCATION_REBUILD_INTERVAL: float = 3600
+    VERIFY_TOKEN_EXPIRE_MINUTES: int = 10
 
     @property
     def SECRET_KEY(self):
@@ -46,12 +124,23 @@ class AuthConfig(BaseSettings):
     model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
 
 
-auth_config = AuthConfig()
+auth_config = lazy(AuthConfig)
 
 
 class EmailConfig(BaseSettings):
     APP_EMAIL: str
     SECRET_EMAIL: str
+    VERIFY_URL: str = "http://127.0.0.1:8000/users/verify"
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_PORT: int = 465
+    SMTP_USE_SSL: bool = True
+    SMTP_LOGIN: bool = True
+    SMTP_TIMEOUT: float = 10
+    SMTP_RATE_LIMIT: float = 5
+    SMTP_MAX_RETRIES: int = 3
+    SMTP_RETRY_BACKOFF: float = 1
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_IDLE_TIMEOUT: float = 60
 
     @property
     def APP_EMAIL(self):
@@ -63,4 +152,133 @@ class EmailConfig(BaseSettings):
     
     model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
 
-email_config = EmailConfig()
\ No newline at end of file
+email_config = lazy(EmailConfig)
+
+
+class HasherConfig(BaseSettings):
+    HASHER_EXECUTOR: str = "thread"
+    HASHER_WORKERS: int = 4
+    HASHER_MAX_CONCURRENCY: int = 8
+    # Первая схема используется для новых хешей, остальные только
+    # проверяются и при входе переводятся на первую.
+    HASH_SCHEMES: list[str] = ["bcrypt"]
+    HASH_BCRYPT_ROUNDS: int = 12
+    HASH_ARGON2_TIME_COST: int = 3
+    HASH_ARGON2_MEMORY_COST: int = 64 * 1024
+    HASH_ARGON2_PARALLELISM: int = 4
+    HASH_PBKDF2_ROUNDS: int = 600_000
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
+
+
+hasher_config = lazy(HasherConfig)
+
+
+class CacheConfig(BaseSettings):
+    REDIS_CACHE_URL: str | None = None
+    USER_CACHE_TTL: int = 300
+    USER_CACHE_LOCK_TTL: float = 2.0
+    # Сколько разных поисков пользователя объединять одновременно
+    USER_LOOKUP_MAX_IN_FLIGHT: int = 10_000
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
+
+
+cache_config = lazy(CacheConfig)
+
+
+class LoginLimiterConfig(BaseSettings):
+    LOGIN_LIMITER_REDIS_URL: str | None = None
+    LOGIN_MAX_FAILURES_PER_EMAIL: int = 5
+    # 0 - не ограничивать по IP
+    LOGIN_MAX_FAILURES_PER_IP: int = 20
+    # Адреса и сети прокси, которым можно верить в X-Forwarded-For,
+    # JSON-список: ["10.0.0.0/8"]. Без них ключ - адрес соединения.
+    LOGIN_TRUSTED_PROXIES: list[str] = []
+    LOGIN_FAILURE_WINDOW: float = 15 * 60
+    LOGIN_LOCKOUT_BASE: float = 60
+    LOGIN_LOCKOUT_MAX: float = 60 * 60
+    LOGIN_STRIKES_TTL: float = 24 * 60 * 60
+    LOGIN_LIMITER_MAX_KEYS: int = 100_000
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
+
+
+login_limiter_config = lazy(LoginLimiterConfig)
+
+
+class MetricsConfig(BaseSettings):
+    METRICS_ENABLED: bool = True
+    # Общий каталог, куда воркеры Celery сбрасывают свои метрики
+    METRICS_DIR: str | None = None
+    METRICS_FLUSH_INTERVAL: float = 5
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
+
+
+metrics_config = lazy(MetricsConfig)
+
+
+class OutboxConfig(BaseSettings):
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 100
+    # Как часто проверять outbox, если этот процесс не будил диспетчер:
+    # письма от других инстансов и отложенные повторы
+    OUTBOX_POLL_INTERVAL: float = 1
+    OUTBOX_RETRY_DELAY: float = 5
+    OUTBOX_MAX_RETRY_DELAY: float = 600
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
+
+
+outbox_config = lazy(OutboxConfig)
+
+
+class LifecycleConfig(BaseSettings):
+    # Сколько соединений пула открыть при старте, по умолчанию DB_POOL_SIZE
+    WARMUP_DB_CONNECTIONS: int | None = None
+    WARMUP_HASHER: bool = True
+    WARMUP_RETRY_DELAY: float = 2
+    # Сколько после SIGTERM отвечать 503 на /health/ready, продолжая
+    # принимать запросы, пока балансировщик не уберет инстанс: не меньше
+    # периода readiness-пробы, 0 - если это делает preStop-хук
+    SHUTDOWN_DELAY: float = 5
+    # Сколько затем ждать завершения запросов в работе
+    SHUTDOWN_DRAIN_TIMEOUT: float = 20
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
+
+
+lifecycle_config = lazy(LifecycleConfig)
+
+
+class TracingConfig(BaseSettings):
+    # none | memory | file
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 1.0
+    TRACING_SERVICE_NAME: str = "auth-service"
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
+
+
+tracing_config = lazy(TracingConfig)
+
+
+class ServerConfig(BaseSettings):
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # uvicorn | gunicorn (gunicorn ставится отдельно)
+    SERVER_RUNNER: str = "uvicorn"
+    # По умолчанию по числу доступных процессу ядер
+    SERVER_WORKERS: int | None = None
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE: int = 5
+    SERVER_LIMIT_CONCURRENCY: int | None = None
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_ACCESS_LOG: bool = False
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="allow")
+
+
+server_config = lazy(ServerConfig)
@@ -1,22 +1,237 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from typing import AsyncGenerator
-from .config import db_config
+import asyncio
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+    AsyncSession,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, Sequence
+from .config import db_config, metrics_config
+from .uow import UnitOfWork
 from app.models.base import Base
+from app.utils.metrics import db_query_duration_seconds
+from app.utils.tracing import tracer
+
+
+QUERY_OPERATIONS = frozenset(
+    ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK")
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который считает время ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            wait_time = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_max": self.wait_time_max,
+        }
+
+
+def observe_queries(engine: AsyncEngine) -> None:
+    """Пишет время выполнения каждого запроса в db_query_duration_seconds"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start_time"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        if operation not in QUERY_OPERATIONS:
+            operation = "OTHER"
+        db_query_duration_seconds.observe(
+            time.perf_counter() - start, operation=operation
+        )
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()
+
+
+def trace_queries(engine: AsyncEngine) -> None:
+    """Оборачивает каждый запрос в span (kind CLIENT) текущей трассы"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if tracer.current_span() is None:
+            conn.info.setdefault("query_spans", []).append(None)
+            return
+        span = tracer.start(
+            statement.lstrip().split(None, 1)[0].upper() if statement else "QUERY",
+            kind="CLIENT",
+            attributes={
+                "db.system": engine.dialect.name,
+                "db.statement": statement,
+            },
+        )
+        conn.info.setdefault("query_spans", []).append(span)
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info["query_spans"].pop()
+        if span is not None:
+            tracer.end(span)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is None or not connection.info.get("query_spans"):
+            return
+        span = connection.info["query_spans"].pop()
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            tracer.end(span)
+
+
+def create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url=url,
+        echo=db_config.DB_ECHO,
+        poolclass=TimedQueuePool,
+        pool_size=db_config.DB_POOL_SIZE,
+        max_overflow=db_config.DB_MAX_OVERFLOW,
+        pool_timeout=db_config.DB_POOL_TIMEOUT,
+        pool_pre_ping=db_config.DB_POOL_PRE_PING,
+        pool_recycle=db_config.DB_POOL_RECYCLE,
+        query_cache_size=db_config.DB_QUERY_CACHE_SIZE,
+        connect_args={
+            "prepared_statement_cache_size": db_config.DB_STATEMENT_CACHE_SIZE
+        },
+    )
+    if metrics_config.METRICS_ENABLED:
+        observe_queries(engine)
+    if tracer.enabled:
+        trace_queries(engine)
+    return engine
 
 
 class DBManager:
-    def __init__(self):
-        self.async_engine = create_async_engine(
-            url=db_config.DB_URL,
-            echo=True,
+    """Движки и фабрики сессий. Создаются при первом обращении к ним,
+    а не при импорте: импорт не загружает драйвер и не читает настройки БД,
+    а тесты и бенчмарки подставляют свои движки через use_engines."""
+
+    ENGINE_ATTRIBUTES = frozenset(
+        (
+            "async_engine",
+            "read_engine",
+            "async_session",
+            "async_read_session",
+            "async_stream_session",
         )
+    )
+
+    def __getattr__(self, name: str):
+        # Вызывается только для отсутствующих атрибутов, то есть до use_engines
+        if name not in self.ENGINE_ATTRIBUTES:
+            raise AttributeError(name)
+        read_engine = None
+        if db_config.DB_REPLICA_URL:
+            read_engine = create_engine(db_config.DB_REPLICA_URL)
+        self.use_engines(create_engine(db_config.DB_URL), read_engine)
+        return getattr(self, name)
+
+    def use_engines(
+        self, async_engine: AsyncEngine, read_engine: AsyncEngine | None = None
+    ) -> None:
+        self.async_engine = async_engine
+        self.read_engine = read_engine or async_engine
         self.async_session = async_sessionmaker(
             self.async_engine, class_=AsyncSession, expire_on_commit=False
         )
+        # Чтение вне транзакции: драйвер не отправляет BEGIN/COMMIT.
+        self.async_read_session = async_sessionmaker(
+            self.read_engine.execution_options(isolation_level="AUTOCOMMIT"),
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+        # Серверные курсоры и COPY читают в транзакции только для чтения.
+        self.async_stream_session = async_sessionmaker(
+            self.read_engine.execution_options(postgresql_readonly=True),
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+
+    async def get_unit_of_work(self) -> AsyncGenerator[UnitOfWork, None]:
+        """Единица работы на запрос. FastAPI кеширует зависимость в пределах
+        запроса, поэтому get_current_user и эндпоинт получают одну и ту же."""
+        uow = UnitOfWork(self.async_session, self.async_read_session)
+        try:
+            yield uow
+        finally:
+            await uow.close()
+
+    async def warm_up(
+        self, connections: int | None = None, queries: Sequence[tuple] = ()
+    ) -> None:
+        """Открывает connections соединений каждого пула (по умолчанию
+        весь pool_size) и выполняет на каждом queries - пары (запрос,
+        параметры). Соединения открываются одновременно, иначе пул
+        отдавал бы одно и то же. asyncpg готовит и кеширует statement
+        на соединении, так что первые запросы не платят за подключение
+        и за подготовку.
+        """
+        for engine in {self.async_engine, self.read_engine}:
+            pool_size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+            count = min(connections or pool_size, pool_size)
+            results = await asyncio.gather(
+                *(engine.connect() for _ in range(count)), return_exceptions=True
+            )
+            opened = [r for r in results if not isinstance(r, BaseException)]
+            try:
+                for result in results:
+                    if isinstance(result, BaseException):
+                        raise result
+                for connection in opened:
+                    for query, params in queries:
+                        await connection.execute(query, params)
+            finally:
+                await asyncio.gather(*(connection.close() for connection in opened))
+
+    async def dispose(self) -> None:
+        """Закрывает соединения пулов, если движки уже созданы"""
+        engines = {self.__dict__.get("async_engine"), self.__dict__.get("read_engine")}
+        for engine in engines - {None}:
+            await engine.dispose()
 
-    async def get_async_session(self) -> AsyncGenerator:
-        async with self.async_session() as session:
-            yield session
+    def pool_stats(self) -> dict:
+        stats = {"primary": self.async_engine.pool.stats()}
+        if self.read_engine is not self.async_engine:
+            stats["replica"] = self.read_engine.pool.stats()
+        return stats
 
     async def create_table(self):
         async with self.async_engine.begin() as conn:
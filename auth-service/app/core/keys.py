@@ -0,0 +1,225 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from .config import auth_config, lazy
+from .tokens import TokenCodec, token_codec
+
+
+ASYMMETRIC_ALGORITHMS = (
+    "RS256",
+    "RS384",
+    "RS512",
+    "ES256",
+    "ES384",
+    "ES512",
+    "EdDSA",
+)
+
+_EC_CURVES = {
+    "ES256": ec.SECP256R1,
+    "ES384": ec.SECP384R1,
+    "ES512": ec.SECP521R1,
+}
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str | None
+    private_key: Any
+    public_key: Any
+    created_at: float
+
+
+def generate_private_key_pem(algorithm: str) -> bytes:
+    if algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = ec.generate_private_key(_EC_CURVES[algorithm]())
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+class KeyRing:
+    """Набор ключей для подписи и проверки JWT.
+    Для HS* используется один общий SECRET_KEY. Для RS*/ES*/EdDSA ключи лежат
+    в keys_dir в файлах <период>.pem: каждый период rotation_period
+    подписывает новый ключ, а прошлые остаются для проверки еще
+    retention секунд. Ключ следующего периода создается и попадает в JWKS
+    за publish_ahead секунд до того, как начнет подписывать: проверяющие
+    сервисы кешируют JWKS, и publish_ahead должен быть не меньше срока
+    кеша, иначе первые токены нового ключа будут для них неизвестны.
+    Файл периода создается атомарно (os.link), поэтому воркеры и реплики
+    с общим каталогом сходятся на одном ключе.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        codec: TokenCodec,
+        secret_key: str | None = None,
+        keys_dir: str | None = None,
+        rotation_period: float = 7 * 24 * 3600,
+        retention: float = 24 * 3600,
+        publish_ahead: float = 600,
+    ) -> None:
+        if algorithm not in codec.algorithms:
+            raise ValueError(
+                f"Token codec {codec.name} does not support {algorithm}"
+            )
+        self.algorithm = algorithm
+        self.codec = codec
+        self.symmetric = algorithm not in ASYMMETRIC_ALGORITHMS
+        self.secret_key = secret_key
+        self.keys_dir = keys_dir
+        self.rotation_period = rotation_period
+        self.retention = retention
+        self.publish_ahead = publish_ahead
+        self._keys: dict[str, SigningKey] = {}
+        self._active: SigningKey | None = None
+        self._jwks: bytes | None = None
+        self._last_reload = 0.0
+        self._lock = threading.Lock()
+        if self.symmetric:
+            self._active = SigningKey(
+                kid=None, private_key=secret_key, public_key=secret_key, created_at=0
+            )
+
+    def signing_key(self) -> SigningKey:
+        if self.symmetric:
+            return self._active
+        now = time.time()
+        slot = int(now // self.rotation_period)
+        if self._active is None or self._active.kid != self._kid(slot):
+            with self._lock:
+                self._rotate(slot)
+        next_kid = self._kid(slot + 1)
+        if (
+            next_kid not in self._keys
+            and (slot + 1) * self.rotation_period - now <= self.publish_ahead
+        ):
+            with self._lock:
+                self._create(next_kid)
+                self._reload()
+        return self._active
+
+    def verification_key(self, kid: str | None) -> Any | None:
+        if self.symmetric:
+            return self._active.public_key
+        if kid is None:
+            return None
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_reload > 1:
+            # Ключ мог выпустить другой воркер, перечитываем каталог
+            # не чаще раза в секунду, чтобы мусорные kid не грузили диск.
+            with self._lock:
+                self._reload()
+            key = self._keys.get(kid)
+        return key.public_key if key is not None else None
+
+    def jwks(self) -> bytes:
+        """JSON с публичными ключами (RFC 7517) для /.well-known/jwks.json"""
+        self.signing_key()
+        if self._jwks is None:
+            keys = []
+            for key in sorted(self._keys.values(), key=lambda k: k.created_at):
+                public_jwk = self.codec.public_jwk(key.public_key, self.algorithm)
+                public_jwk.update(
+                    {"kid": key.kid, "use": "sig", "alg": self.algorithm}
+                )
+                keys.append(public_jwk)
+            self._jwks = json.dumps({"keys": keys}).encode()
+        return self._jwks
+
+    def _current_slot(self) -> int:
+        return int(time.time() // self.rotation_period)
+
+    def _kid(self, slot: int) -> str:
+        return f"{self.algorithm.lower()}-{slot}"
+
+    def _rotate(self, slot: int) -> None:
+        kid = self._kid(slot)
+        if self._active is not None and self._active.kid == kid:
+            return
+        self._create(kid)
+        self._reload()
+        self._active = self._keys[kid]
+
+    def _create(self, kid: str) -> None:
+        path = os.path.join(self.keys_dir, f"{kid}.pem")
+        if os.path.exists(path):
+            return
+        os.makedirs(self.keys_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.keys_dir, delete=False) as tmp:
+            tmp.write(generate_private_key_pem(self.algorithm))
+        os.chmod(tmp.name, 0o600)
+        try:
+            os.link(tmp.name, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp.name)
+
+    def _reload(self) -> None:
+        self._last_reload = time.monotonic()
+        oldest_slot = self._current_slot() - math.ceil(
+            self.retention / self.rotation_period
+        ) - 1
+        prefix = f"{self.algorithm.lower()}-"
+        keys = {}
+        os.makedirs(self.keys_dir, exist_ok=True)
+        for filename in os.listdir(self.keys_dir):
+            if not filename.startswith(prefix) or not filename.endswith(".pem"):
+                continue
+            kid = filename[: -len(".pem")]
+            slot = int(kid[len(prefix):])
+            if slot < oldest_slot:
+                if slot < oldest_slot - 1:
+                    # С запасом в период, чтобы не удалить ключ, который
+                    # реплика с отстающими часами еще проверяет.
+                    try:
+                        os.unlink(os.path.join(self.keys_dir, filename))
+                    except FileNotFoundError:
+                        pass
+                continue
+            key = self._keys.get(kid)
+            if key is None:
+                with open(os.path.join(self.keys_dir, filename), "rb") as f:
+                    private_key = serialization.load_pem_private_key(
+                        f.read(), password=None
+                    )
+                key = SigningKey(
+                    kid=kid,
+                    private_key=private_key,
+                    public_key=private_key.public_key(),
+                    created_at=slot * self.rotation_period,
+                )
+            keys[kid] = key
+        if keys.keys() != self._keys.keys():
+            self._jwks = None
+        self._keys = keys
+
+
+key_ring = lazy(
+    lambda: KeyRing(
+        algorithm=auth_config.ALGORITHM,
+        codec=token_codec,
+        secret_key=auth_config.SECRET_KEY,
+        keys_dir=auth_config.JWT_KEYS_DIR,
+        rotation_period=auth_config.JWT_KEY_ROTATION_HOURS * 3600,
+        retention=auth_config.JWT_KEY_RETENTION_HOURS * 3600,
+        # С запасом на расхождение часов реплик
+        publish_ahead=auth_config.JWKS_MAX_AGE * 2,
+    )
+)
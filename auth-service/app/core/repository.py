@@ -1,12 +1,103 @@
+import datetime as dt
 from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import ScalarResult, select, insert, update, delete
+from sqlalchemy import (
+    Row,
+    ScalarResult,
+    Select,
+    bindparam,
+    func,
+    select,
+    insert,
+    update,
+    delete,
+)
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Sequence
+from app.models.outbox import VerifyOutboxOrm
+from app.models.token import RevokedTokenOrm
 from app.models.user import UserOrm
+from app.schemas.user import GetUser, UserFilter, UserRow
+from app.core.uow import on_commit
+from app.utils.cache import token_cache
+from app.utils.single_flight import user_lookups
+from app.utils.user_cache import user_cache
+
+if TYPE_CHECKING:
+    # Драйвер нужен только COPY, импортируется при первом вызове
+    import asyncpg
+
+
+COPY_COLUMNS = (
+    "email",
+    "password",
+    "name",
+    "surname",
+    "date_of_birth",
+    "role",
+    "is_active",
+)
+
+EXPORT_QUERY = str(
+    select(
+        UserOrm.id,
+        UserOrm.email,
+        UserOrm.name,
+        UserOrm.surname,
+        UserOrm.date_of_birth,
+        UserOrm.role,
+        UserOrm.created_at,
+        UserOrm.is_active,
+    )
+    .order_by(UserOrm.id)
+    .compile(dialect=postgresql.dialect())
+)
+
+# Запросы горячих путей собираются один раз при импорте: ключ кеша
+# скомпилированного запроса у неизменяемой конструкции мемоизируется,
+# а выборка колонок таблицы возвращает Core-строки без ORM-объектов.
+users_table = UserOrm.__table__
+
+GET_USER_COLUMNS = (
+    users_table.c.id,
+    users_table.c.name,
+    users_table.c.surname,
+    users_table.c.email,
+    users_table.c.role,
+    users_table.c.date_of_birth,
+)
+
+GET_USER_BY_ID_QUERY = select(*GET_USER_COLUMNS).where(
+    users_table.c.id == bindparam("user_id")
+)
+
+# Адрес сравнивается без учета регистра, условие совпадает
+# с выражением индекса ix_users_email_lower.
+email_lower = func.lower(users_table.c.email)
+
+GET_USER_BY_EMAIL_QUERY = select(*GET_USER_COLUMNS).where(
+    email_lower == func.lower(bindparam("email"))
+)
+
+GET_CREDENTIALS_BY_EMAIL_QUERY = select(
+    users_table.c.id,
+    users_table.c.role,
+    users_table.c.password,
+    users_table.c.is_active,
+).where(email_lower == func.lower(bindparam("email")))
+
+# Прогреваются на каждом соединении пула при старте процесса
+WARM_UP_QUERIES = (
+    (GET_USER_BY_ID_QUERY, {"user_id": 0}),
+    (GET_USER_BY_EMAIL_QUERY, {"email": ""}),
+    (GET_CREDENTIALS_BY_EMAIL_QUERY, {"email": ""}),
+)
 
 
 class UserRepo:
-    """Репозиторий для инкапсуляции доступа к данным сервиса авторизации
+    """Репозиторий для инкапсуляции доступа к данным сервиса авторизации.
+    Транзакциями не управляет: их открывает и коммитит UnitOfWork.
     params: session: AsyncSession
     """
 
@@ -18,7 +109,6 @@ class UserRepo:
         try:
             insert_query = insert(self.model).values(**user_data).returning(self.model)
             user = await self.session.execute(insert_query)
-            await self.session.commit()
             return user.scalar_one()
         except IntegrityError:
             raise HTTPException(
@@ -30,50 +120,304 @@ class UserRepo:
         user = await self.session.execute(select_query)
         return user.scalar_one_or_none()
 
-    async def get_users(self) -> tuple | None:
-        select_query = select(self.model)
+    async def get_user_snapshot(self, user_id: int) -> GetUser | None:
+        """Быстрый путь для get_user: только колонки GetUser, без ORM"""
+        result = await self.session.execute(
+            GET_USER_BY_ID_QUERY, {"user_id": user_id}
+        )
+        row = result.mappings().one_or_none()
+        return GetUser.model_construct(**row) if row is not None else None
+
+    async def get_user_snapshot_by_email(self, email: str) -> GetUser | None:
+        """Быстрый путь для get_user_by_email: только колонки GetUser, без ORM"""
+        result = await self.session.execute(GET_USER_BY_EMAIL_QUERY, {"email": email})
+        row = result.mappings().one_or_none()
+        return GetUser.model_construct(**row) if row is not None else None
+
+    async def get_credentials_by_email(self, email: str) -> Row | None:
+        """Возвращает id, role, password и is_active для проверки входа"""
+        result = await self.session.execute(
+            GET_CREDENTIALS_BY_EMAIL_QUERY, {"email": email}
+        )
+        return result.one_or_none()
+
+    def _users_query(self, filters: UserFilter, after: int | None) -> Select:
+        select_query = select(self.model).order_by(self.model.id)
+        if after is not None:
+            select_query = select_query.where(self.model.id > after)
+        if filters.role is not None:
+            select_query = select_query.where(self.model.role == filters.role)
+        if filters.is_active is not None:
+            select_query = select_query.where(self.model.is_active == filters.is_active)
+        if filters.created_from is not None:
+            select_query = select_query.where(
+                self.model.created_at >= filters.created_from
+            )
+        if filters.created_to is not None:
+            select_query = select_query.where(
+                self.model.created_at < filters.created_to
+            )
+        return select_query
+
+    async def get_users(
+        self, filters: UserFilter, limit: int, after: int | None = None
+    ) -> Sequence[UserOrm]:
+        """Возвращает страницу пользователей с id > after (keyset-пагинация)"""
+        select_query = self._users_query(filters, after).limit(limit)
         users = await self.session.execute(select_query)
         return users.scalars().all()
 
+    async def get_user_rows(
+        self, filters: UserFilter, limit: int, after: int | None = None
+    ) -> list[UserRow]:
+        """Как get_users, но только колонки GetUser словарями, без ORM"""
+        select_query = (
+            self._users_query(filters, after)
+            .with_only_columns(*GET_USER_COLUMNS)
+            .limit(limit)
+        )
+        result = await self.session.execute(select_query)
+        return [row._asdict() for row in result]
+
+    async def stream_users(
+        self, filters: UserFilter, after: int | None = None, batch_size: int = 1000
+    ) -> AsyncIterator[UserOrm]:
+        """Читает пользователей серверным курсором, не загружая всю таблицу"""
+        select_query = self._users_query(filters, after).execution_options(
+            yield_per=batch_size
+        )
+        users = await self.session.stream_scalars(select_query)
+        async for user in users:
+            yield user
+
     async def get_user_by_email(self, email: str) -> ScalarResult | None:
-        select_query = select(self.model).where(self.model.email == email)
+        select_query = select(self.model).where(email_lower == func.lower(email))
         user = await self.session.execute(select_query)
         return user.scalar_one_or_none()
 
-    async def update_user(self, id: int, user_data: dict) -> ScalarResult:
-        select_query = select(UserOrm).where(UserOrm.id == id)
+    async def get_existing_emails(self, emails: list[str]) -> set[str]:
+        """Возвращает занятые адреса из emails в нижнем регистре"""
+        select_query = select(email_lower).where(
+            email_lower.in_([email.lower() for email in emails])
+        )
         result = await self.session.execute(select_query)
-        if result.scalar_one_or_none is None:
-            raise HTTPException(
-                status_code=400,
-                detail="Пользователь с id: {id} не найден, операция не возможна.",
+        return set(result.scalars().all())
+
+    async def copy_users(self, records: list[tuple]) -> None:
+        """Загружает пользователей через COPY, колонки - COPY_COLUMNS"""
+        import asyncpg
+
+        connection = await self._driver_connection()
+        try:
+            await connection.copy_records_to_table(
+                self.model.__tablename__, records=records, columns=COPY_COLUMNS
             )
+        except asyncpg.UniqueViolationError as e:
+            raise IntegrityError("COPY users", None, e)
+
+    async def export_users_csv(self, output: Callable[[bytes], Awaitable]) -> None:
+        """Выгружает пользователей в CSV через COPY TO, без паролей"""
+        connection = await self._driver_connection()
+        await connection.copy_from_query(
+            EXPORT_QUERY, output=output, format="csv", header=True
+        )
+
+    async def _driver_connection(self) -> "asyncpg.Connection":
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        return raw_connection.driver_connection
+
+    async def update_user(self, id: int, user_data: dict) -> UserOrm:
         update_query = (
             update(self.model)
             .where(self.model.id == id)
             .values(**user_data)
             .returning(self.model)
         )
-        updated_user = await self.session.execute(update_query)
-        await self.session.commit()
-        return updated_user.scalar_one()
+        result = await self.session.execute(update_query)
+        updated_user = result.scalar_one_or_none()
+        if updated_user is None:
+            raise self._not_found(id)
+        self._invalidate([id])
+        return updated_user
+
+    async def replace_password_hash(
+        self, id: int, old_hash: str, new_hash: str
+    ) -> bool:
+        """Меняет хеш пароля, только если он не изменился с момента чтения,
+        чтобы не затереть пароль, смененный параллельно."""
+        update_query = (
+            update(self.model)
+            .where(self.model.id == id, self.model.password == old_hash)
+            .values(password=new_hash)
+        )
+        result = await self.session.execute(update_query)
+        return result.rowcount > 0
+
+    async def update_users(
+        self, ids: list[int], user_data: dict
+    ) -> Sequence[UserOrm]:
+        """Обновляет нескольких пользователей одним запросом,
+        возвращает только найденных."""
+        update_query = (
+            update(self.model)
+            .where(self.model.id.in_(ids))
+            .values(**user_data)
+            .returning(self.model)
+        )
+        result = await self.session.execute(update_query)
+        updated_users = result.scalars().all()
+        self._invalidate([user.id for user in updated_users])
+        return updated_users
 
     async def delete_user(self, id: int) -> None:
-        select_query = select(UserOrm).where(UserOrm.id == id)
+        delete_query = (
+            delete(self.model).where(self.model.id == id).returning(self.model.id)
+        )
+        result = await self.session.execute(delete_query)
+        if result.scalar_one_or_none() is None:
+            raise self._not_found(id)
+        self._invalidate([id])
+
+    async def delete_users(self, ids: list[int]) -> list[int]:
+        """Удаляет нескольких пользователей одним запросом,
+        возвращает id удаленных."""
+        delete_query = (
+            delete(self.model).where(self.model.id.in_(ids)).returning(self.model.id)
+        )
+        result = await self.session.execute(delete_query)
+        deleted_ids = list(result.scalars().all())
+        self._invalidate(deleted_ids)
+        return deleted_ids
+
+    async def activate_user(self, id: int) -> None:
+        update_query = (
+            update(self.model)
+            .where(self.model.id == id)
+            .values(is_active=True)
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(update_query)
+        if result.scalar_one_or_none() is None:
+            raise self._not_found(id)
+        self._invalidate([id])
+
+    def _invalidate(self, ids: list[int]) -> None:
+        """Сбрасывает кеши пользователей после коммита транзакции"""
+
+        async def invalidate() -> None:
+            for id in ids:
+                token_cache.invalidate_tag(id)
+                await user_cache.invalidate(id)
+            user_lookups.invalidate()
+
+        if ids:
+            on_commit(self.session, invalidate)
+
+    @staticmethod
+    def _not_found(id: int) -> HTTPException:
+        return HTTPException(
+            status_code=404,
+            detail=f"Пользователь с id: {id} не найден, операция не возможна.",
+        )
+
+
+class RevokedTokenRepo:
+    """Репозиторий отозванных токенов (denylist по jti)
+    params: session: AsyncSession
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.model = RevokedTokenOrm
+
+    async def revoke(self, jti: str, expires_at: dt.datetime) -> bool:
+        """Отзывает токен. Возвращает False, если он уже был отозван."""
+        insert_query = (
+            postgresql.insert(self.model)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing()
+            .returning(self.model.jti)
+        )
+        result = await self.session.execute(insert_query)
+        revoked = result.scalar_one_or_none() is not None
+        return revoked
+
+    async def is_revoked(self, jti: str) -> bool:
+        select_query = select(self.model.jti).where(self.model.jti == jti)
         result = await self.session.execute(select_query)
-        if result.scalar_one_or_none is None:
-            raise HTTPException(
-                status_code=400,
-                detail="Пользователь с id: {id} не найден, операция не возможна.",
-            )
-        delete_query = delete(self.model).where(self.model.id == id)
+        return result.scalar_one_or_none() is not None
+
+    async def get_revoked(
+        self, since: dt.datetime | None = None
+    ) -> Sequence[Row]:
+        """Возвращает (jti, revoked_at) действующих отозванных токенов,
+        отозванных не раньше since."""
+        select_query = select(self.model.jti, self.model.revoked_at).where(
+            self.model.expires_at > func.now()
+        )
+        if since is not None:
+            select_query = select_query.where(self.model.revoked_at >= since)
+        result = await self.session.execute(select_query)
+        return result.all()
+
+    async def delete_expired(self) -> None:
+        delete_query = delete(self.model).where(self.model.expires_at <= func.now())
         await self.session.execute(delete_query)
-        await self.session.commit()
 
 
-    async def activate_user(self, id: int) -> None:
+class OutboxRepo:
+    """Репозиторий outbox писем подтверждения
+    params: session: AsyncSession
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.model = VerifyOutboxOrm
+
+    async def add(self, user_id: int, email: str) -> None:
+        insert_query = insert(self.model).values(user_id=user_id, email=email)
+        await self.session.execute(insert_query)
+
+    async def add_by_emails(self, emails: list[str]) -> None:
+        """Добавляет письма пользователям с адресами emails одним
+        INSERT ... SELECT: после COPY id новых пользователей неизвестны"""
+        select_query = select(users_table.c.id, users_table.c.email).where(
+            email_lower.in_([email.lower() for email in emails])
+        )
+        insert_query = insert(self.model).from_select(
+            ["user_id", "email"], select_query
+        )
+        await self.session.execute(insert_query)
+
+    async def claim(self, limit: int) -> Sequence[Row]:
+        """Берет до limit писем, готовых к отправке, и блокирует их
+        до конца транзакции. Строки, которые уже взял другой диспетчер,
+        пропускаются (SKIP LOCKED), а не ждут его коммита."""
+        select_query = (
+            select(
+                self.model.id,
+                self.model.user_id,
+                self.model.email,
+                self.model.attempts,
+            )
+            .where(self.model.available_at <= func.now())
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(select_query)
+        return result.all()
+
+    async def delete(self, ids: list[int]) -> None:
+        delete_query = delete(self.model).where(self.model.id.in_(ids))
+        await self.session.execute(delete_query)
+
+    async def postpone(self, ids: list[int], available_at: dt.datetime) -> None:
+        """Откладывает повторную отправку писем после ошибки"""
         update_query = (
-            update(self.model).where(self.model.id == id).values(is_active=True)
+            update(self.model)
+            .where(self.model.id.in_(ids))
+            .values(attempts=self.model.attempts + 1, available_at=available_at)
         )
         await self.session.execute(update_query)
-        await self.session.commit()
\ No newline at end of file
@@ -0,0 +1,180 @@
+import asyncio
+import contextlib
+import datetime as dt
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.bloom import BloomFilter
+from app.utils.cache import TTLCache
+from .config import auth_config, lazy
+from .db import db_manager
+from .repository import RevokedTokenRepo
+from .uow import on_commit
+
+
+class RevocationList:
+    """Denylist отозванных токенов по jti.
+    Источник истины — таблица revoked_tokens, а процесс держит по ней
+    фильтр Блума. Если jti нет в фильтре, токен точно не отозван и
+    проверка обходится без запроса к БД. Редкие положительные ответы
+    фильтра подтверждаются запросом, результат запоминается.
+    Отзывы из других процессов подтягиваются фоном не реже раза
+    в sync_interval, фильтр целиком пересобирается раз в rebuild_interval,
+    чтобы из него уходили истекшие токены.
+    """
+
+    # Запас на транзакции, которые начались раньше последней синхронизации,
+    # а закоммитились позже: revoked_at у них равен времени начала.
+    SYNC_OVERLAP = dt.timedelta(seconds=30)
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        sync_interval: float,
+        rebuild_interval: float,
+    ) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._bloom: BloomFilter | None = None
+        self._confirmed = TTLCache(maxsize=10_000, ttl=sync_interval)
+        self._last_seen: dt.datetime | None = None
+        self._synced_at = 0.0
+        self._rebuilt_at = 0.0
+        self._sync_task: asyncio.Task | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._load_lock = asyncio.Lock()
+        self.checks = 0
+        self.bloom_hits = 0
+        self.false_positives = 0
+
+    async def is_revoked(self, jti: str | None) -> bool:
+        if jti is None:
+            return False
+        if self._bloom is None:
+            await self.load()
+        elif time.monotonic() - self._synced_at > self.sync_interval:
+            self._schedule_sync()
+        self.checks += 1
+        if jti not in self._bloom:
+            return False
+        self.bloom_hits += 1
+        revoked = self._confirmed.get(jti)
+        if revoked is None:
+            async with db_manager.async_read_session() as session:
+                revoked = await RevokedTokenRepo(session).is_revoked(jti)
+            if not revoked:
+                self.false_positives += 1
+            self._confirmed.set(jti, revoked)
+        return revoked
+
+    async def load(self) -> None:
+        """Загружает фильтр, если он еще не загружен"""
+        async with self._load_lock:
+            if self._bloom is None:
+                await self._rebuild()
+
+    def start(self) -> None:
+        """Запускает фоновую синхронизацию раз в sync_interval, чтобы
+        проверки не ждали ее и в тихие периоды фильтр не отставал."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def stop(self) -> None:
+        for task in (self._refresh_task, self._sync_task):
+            if task is not None and not task.done():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._refresh_task = None
+
+    async def revoke(
+        self, session: AsyncSession, jti: str, expires_at: dt.datetime
+    ) -> bool:
+        """Отзывает токен в транзакции session. Возвращает False, если он
+        уже был отозван, например при повторном использовании refresh-токена.
+        Фильтр процесса обновляется после коммита."""
+        revoked = await RevokedTokenRepo(session).revoke(jti, expires_at)
+
+        async def remember() -> None:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            self._confirmed.set(jti, True, expires_at=expires_at.timestamp())
+
+        on_commit(session, remember)
+        return revoked
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self._bloom is not None,
+            "size": self._bloom.count if self._bloom else 0,
+            "capacity": self._bloom.capacity if self._bloom else self.capacity,
+            "bits": self._bloom.size if self._bloom else 0,
+            "checks": self.checks,
+            "bloom_hits": self.bloom_hits,
+            "false_positives": self.false_positives,
+        }
+
+    async def _refresh(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            if self._bloom is None:
+                await self.load()
+                continue
+            self._schedule_sync()
+            await self._sync_task
+
+    def _schedule_sync(self) -> None:
+        if self._sync_task is None or self._sync_task.done():
+            self._synced_at = time.monotonic()
+            self._sync_task = asyncio.create_task(self._sync())
+
+    async def _sync(self) -> None:
+        try:
+            if time.monotonic() - self._rebuilt_at > self.rebuild_interval:
+                await self._rebuild()
+                return
+            since = self._last_seen - self.SYNC_OVERLAP if self._last_seen else None
+            async with db_manager.async_read_session() as session:
+                rows = await RevokedTokenRepo(session).get_revoked(since)
+            self._add_rows(self._bloom, rows)
+            if self._bloom.count > self._bloom.capacity:
+                await self._rebuild()
+        except Exception:
+            # Следующая проверка повторит синхронизацию, а пока
+            # работаем по фильтру из прошлой.
+            self._synced_at = 0.0
+
+    async def _rebuild(self) -> None:
+        async with db_manager.async_session.begin() as session:
+            repo = RevokedTokenRepo(session)
+            await repo.delete_expired()
+            rows = await repo.get_revoked()
+        bloom = BloomFilter(
+            capacity=max(self.capacity, len(rows) * 2), error_rate=self.error_rate
+        )
+        self._add_rows(bloom, rows)
+        if self._bloom is not None:
+            # Отзывы, сделанные этим процессом во время загрузки
+            for jti, revoked in self._confirmed.items():
+                if revoked:
+                    bloom.add(jti)
+        self._bloom = bloom
+        self._synced_at = self._rebuilt_at = time.monotonic()
+
+    def _add_rows(self, bloom: BloomFilter, rows) -> None:
+        for jti, revoked_at in rows:
+            bloom.add(jti)
+            if self._last_seen is None or revoked_at > self._last_seen:
+                self._last_seen = revoked_at
+
+
+revocation_list = lazy(
+    lambda: RevocationList(
+        capacity=auth_config.REVOCATION_BLOOM_CAPACITY,
+        error_rate=auth_config.REVOCATION_BLOOM_ERROR_RATE,
+        sync_interval=auth_config.REVOCATION_SYNC_INTERVAL,
+        rebuild_interval=auth_config.REVOCATION_REBUILD_INTERVAL,
+    )
+)
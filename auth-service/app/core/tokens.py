@@ -0,0 +1,175 @@
+import abc
+import hashlib
+from typing import Any
+from app.utils.cache import TTLCache
+from .config import auth_config, lazy
+
+
+class TokenError(Exception):
+    """Токен поврежден, просрочен или подписан неизвестным ключом"""
+
+
+class TokenCodec(abc.ABC):
+    """Кодирование и проверка JWT конкретной библиотекой.
+    Ключи передаются уже разобранными объектами cryptography
+    (или строкой секрета для HS*), поэтому PEM не парсится на каждый вызов.
+    """
+
+    name: str
+    algorithms: frozenset[str]
+
+    @abc.abstractmethod
+    def encode(
+        self, claims: dict, key: Any, algorithm: str, headers: dict | None = None
+    ) -> str:
+        ...
+
+    @abc.abstractmethod
+    def decode(self, token: str, key: Any, algorithm: str) -> dict:
+        ...
+
+    @abc.abstractmethod
+    def unverified_header(self, token: str) -> dict:
+        ...
+
+    @abc.abstractmethod
+    def public_jwk(self, public_key: Any, algorithm: str) -> dict:
+        ...
+
+
+class JoseCodec(TokenCodec):
+    name = "jose"
+    algorithms = frozenset(
+        (
+            "HS256",
+            "HS384",
+            "HS512",
+            "RS256",
+            "RS384",
+            "RS512",
+            "ES256",
+            "ES384",
+            "ES512",
+        )
+    )
+
+    def __init__(self) -> None:
+        from jose import jwk, jwt, JWTError
+
+        self._jwk = jwk
+        self._jwt = jwt
+        self._error = JWTError
+        self._keys: dict[int, tuple[Any, Any]] = {}
+
+    def _key(self, key: Any, algorithm: str):
+        """Обертка jose над ключом cryptography, создается один раз на ключ"""
+        if isinstance(key, str):
+            return key
+        cached = self._keys.get(id(key))
+        if cached is None or cached[0] is not key:
+            if len(self._keys) >= 64:
+                self._keys.clear()
+            cached = (key, self._jwk.construct(key, algorithm))
+            self._keys[id(key)] = cached
+        return cached[1]
+
+    def encode(
+        self, claims: dict, key: Any, algorithm: str, headers: dict | None = None
+    ) -> str:
+        return self._jwt.encode(
+            claims, self._key(key, algorithm), algorithm=algorithm, headers=headers
+        )
+
+    def decode(self, token: str, key: Any, algorithm: str) -> dict:
+        try:
+            return self._jwt.decode(
+                token, self._key(key, algorithm), algorithms=algorithm
+            )
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+    def unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+    def public_jwk(self, public_key: Any, algorithm: str) -> dict:
+        return self._jwk.construct(public_key, algorithm).to_dict()
+
+
+class PyJWTCodec(TokenCodec):
+    name = "pyjwt"
+
+    def __init__(self) -> None:
+        import jwt
+        from jwt.algorithms import get_default_algorithms
+
+        self._jwt = jwt
+        self._algorithms = get_default_algorithms()
+        self.algorithms = frozenset(self._algorithms) - {"none"}
+
+    def encode(
+        self, claims: dict, key: Any, algorithm: str, headers: dict | None = None
+    ) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key: Any, algorithm: str) -> dict:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._jwt.PyJWTError as e:
+            raise TokenError(str(e)) from e
+
+    def unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._jwt.PyJWTError as e:
+            raise TokenError(str(e)) from e
+
+    def public_jwk(self, public_key: Any, algorithm: str) -> dict:
+        return self._algorithms[algorithm].to_jwk(public_key, as_dict=True)
+
+
+CODECS = {
+    JoseCodec.name: JoseCodec,
+    PyJWTCodec.name: PyJWTCodec,
+}
+
+
+def get_codec(name: str) -> TokenCodec:
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown token codec: {name}")
+
+
+class VerifiedTokenMemo:
+    """Запоминает claims уже проверенных токенов по хешу токена,
+    чтобы повторная проверка того же токена не проверяла подпись.
+    Запись живет не дольше exp токена.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> dict | None:
+        return self._cache.get(self._key(token))
+
+    def set(self, token: str, claims: dict) -> None:
+        self._cache.set(self._key(token), claims, expires_at=claims.get("exp"))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+token_codec = lazy(lambda: get_codec(auth_config.TOKEN_CODEC))
+
+verified_tokens = lazy(
+    lambda: VerifiedTokenMemo(
+        maxsize=auth_config.TOKEN_MEMO_SIZE, ttl=auth_config.TOKEN_MEMO_TTL
+    )
+)
@@ -0,0 +1,87 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """Откладывает callback до успешного коммита транзакции сессии.
+    Нужен для сброса кешей: сброс до коммита позволил бы параллельному
+    запросу снова закешировать старые данные."""
+    session.info.setdefault("on_commit", []).append(callback)
+
+
+class UnitOfWork:
+    """Единица работы одного запроса.
+    read() отдает сессию в режиме autocommit: запросы идут без
+    BEGIN/COMMIT, а соединение возвращается в пул сразу после блока.
+    write() открывает транзакцию на основной базе, вложенные write()
+    присоединяются к внешней, после коммита выполняются колбэки on_commit.
+    Если запрос уже писал, read() читает через ту же сессию, чтобы видеть
+    свои изменения; транзакция, которую SQLAlchemy начинает для такого
+    чтения, завершается вместе с блоком. Блоки не держат соединения одновременно, поэтому
+    запрос занимает из пула не больше одного соединения.
+    params: session_factory: сессии основной базы,
+    read_session_factory: сессии для чтения (autocommit, реплика).
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        read_session_factory: async_sessionmaker,
+    ) -> None:
+        self._session_factory = session_factory
+        self._read_session_factory = read_session_factory
+        self._session: AsyncSession | None = None
+        self._depth = 0
+
+    @property
+    def writing(self) -> bool:
+        """Запрос уже писал: чтения идут через его сессию"""
+        return self._session is not None
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[AsyncSession]:
+        if self._session is not None:
+            yield self._session
+            if not self._depth:
+                await self._end_read(self._session)
+            return
+        async with self._read_session_factory() as session:
+            yield session
+
+    @asynccontextmanager
+    async def write(self) -> AsyncIterator[AsyncSession]:
+        if self._session is None:
+            self._session = self._session_factory()
+        session = self._session
+        if self._depth:
+            self._depth += 1
+            try:
+                yield session
+            finally:
+                self._depth -= 1
+            return
+        await self._end_read(session)
+        self._depth = 1
+        try:
+            async with session.begin():
+                yield session
+        except BaseException:
+            session.info.pop("on_commit", None)
+            raise
+        finally:
+            self._depth = 0
+        for callback in session.info.pop("on_commit", []):
+            await callback()
+
+    async def _end_read(self, session: AsyncSession) -> None:
+        # Чтение через сессию записи начинает транзакцию неявно (autobegin).
+        # Если ее не закрыть, следующий write() примет ее за свою внешнюю
+        # и не закоммитит, а соединение останется занятым до close().
+        if session.in_transaction():
+            await session.commit()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
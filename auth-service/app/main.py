@@ -1,24 +1,29 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
-from app.core.config import db_config
 from app.api.crud import router
+from app.api.health import InFlightMiddleware, lifecycle, router as health_router
+from app.api.stats import router as stats_router
+from app.api.jwks import router as jwks_router
+from app.api.metrics import MetricsMiddleware, router as metrics_router
+from app.api.tracing import TracingMiddleware
 
 
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     print(f"Host: {db_config.DB_HOST}")
-#     print(f"Port: {db_config.DB_PORT}")
-#     print(f"User: {db_config.DB_USER}")
-#     print(f"Pass: {db_config.DB_PASS}")
-#     print(f"Name: {db_config.DB_NAME}")
-#     print(f"URL: {db_config.DB_URL}")
-#     yield
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await lifecycle.startup()
+    lifecycle.handle_signals()
+    yield
+    await lifecycle.shutdown()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(router=router)
+app.include_router(router=stats_router)
+app.include_router(router=jwks_router)
+app.include_router(router=metrics_router)
+app.include_router(router=health_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,3 +34,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(InFlightMiddleware)
@@ -1,2 +1,4 @@
 from .base import Base
-from .user import UserOrm
\ No newline at end of file
+from .user import UserOrm
+from .token import RevokedTokenOrm
+from .outbox import VerifyOutboxOrm
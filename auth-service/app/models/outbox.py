@@ -0,0 +1,20 @@
+from sqlalchemy import DateTime, ForeignKey, func
+from .base import Base
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime as dt
+
+
+class VerifyOutboxOrm(Base):
+    """Письма подтверждения, ожидающие отправки.
+    Строка пишется в одной транзакции с пользователем, поэтому
+    письмо не теряется, даже если брокер недоступен."""
+
+    __tablename__ = "verify_outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    email: Mapped[str]
+    attempts: Mapped[int] = mapped_column(default=0)
+    available_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import DateTime, func
+from .base import Base
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime as dt
+
+
+class RevokedTokenOrm(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[str] = mapped_column(primary_key=True)
+    expires_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), index=True
+    )
+    revoked_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
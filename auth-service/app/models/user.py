@@ -1,4 +1,4 @@
-from sqlalchemy import text
+from sqlalchemy import Index, func, text
 from .base import Base
 from sqlalchemy.orm import Mapped, mapped_column
 import datetime as dt
@@ -15,11 +15,26 @@ class UserOrm(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    email: Mapped[str] = mapped_column(unique=True)
+    email: Mapped[str]
     password: Mapped[str]
     name: Mapped[str]
     surname: Mapped[str]
     date_of_birth: Mapped[dt.date]
     role: Mapped[Role] = mapped_column(default=Role.USER)
-    created_at: Mapped[dt.datetime] = mapped_column(default=dt.datetime.now())
+    created_at: Mapped[dt.datetime] = mapped_column(server_default=func.now())
     is_active: Mapped[bool] = mapped_column(default=False)
+
+    __table_args__ = (
+        # Адрес уникален без учета регистра, по этому же индексу идет поиск
+        Index("ix_users_email_lower", text("lower(email)"), unique=True),
+        # Фильтр по роли с keyset-пагинацией по id
+        Index("ix_users_role_id", "role", "id"),
+        # Неподтвержденные пользователи - небольшая часть таблицы
+        Index(
+            "ix_users_inactive_id",
+            "id",
+            postgresql_where=text("NOT is_active"),
+            sqlite_where=text("NOT is_active"),
+        ),
+        Index("ix_users_created_at", "created_at"),
+    )
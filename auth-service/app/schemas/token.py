@@ -1,10 +1,22 @@
+import datetime as dt
 from pydantic import BaseModel
 
 
 class Token(BaseModel):
     token_type: str
     access_token: str
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: str | None = None
 
 
 class TokenData(BaseModel):
     id: int
+    exp: dt.datetime | None = None
+    jti: str | None = None
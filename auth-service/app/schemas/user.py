@@ -1,6 +1,7 @@
 import re
 from fastapi import HTTPException
 from pydantic import BaseModel, EmailStr, field_validator
+from typing_extensions import TypedDict
 import datetime as dt
 from app.models.user import Role
 
@@ -82,6 +83,25 @@ class GetUser(BaseModel):
     date_of_birth: dt.date
 
 
+class UserRow(TypedDict):
+    """Строка БД с полями GetUser. Сериализуется в тот же JSON,
+    но без создания и валидации моделей."""
+
+    id: int
+    name: str
+    surname: str
+    email: str
+    role: Role
+    date_of_birth: dt.date
+
+
+class UserFilter(BaseModel):
+    role: Role | None = None
+    is_active: bool | None = None
+    created_from: dt.datetime | None = None
+    created_to: dt.datetime | None = None
+
+
 class UpdateUser(BaseModel):
     name: str
     surname: str
@@ -103,3 +123,29 @@ class UpdateUser(BaseModel):
                 status_code=422, detail=f"Поле {value} содержит недопустимые символы."
             )
         return value
+
+
+class ImportRowError(BaseModel):
+    line: int
+    email: str | None = None
+    detail: str
+
+
+class ImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = []
+
+
+class BatchUpdateUsers(BaseModel):
+    ids: list[int]
+    data: UpdateUser
+
+
+class BatchDeleteUsers(BaseModel):
+    ids: list[int]
+
+
+class BatchDeleteResult(BaseModel):
+    deleted: list[int]
+    not_found: list[int]
@@ -0,0 +1,163 @@
+"""Запуск API в продакшене.
+
+Поднимает uvicorn (или gunicorn с воркерами uvicorn) с числом воркеров
+по доступным ядрам, uvloop и httptools, если они установлены
+(pip install uvicorn[standard]), и keep-alive/backlog из SERVER_*.
+Пул соединений каждого воркера урезается так, чтобы все воркеры
+вместе не открыли больше DB_MAX_CONNECTIONS соединений.
+
+    python -m app
+    python -m app --workers 4 --port 8080
+    python -m app --runner gunicorn
+    python -m app --dry-run
+"""
+import argparse
+import importlib.util
+import math
+import os
+import pathlib
+from app.core.config import db_config, lifecycle_config, server_config
+
+
+APP = "app.main:app"
+
+
+def cpu_count() -> int:
+    """Ядра, доступные процессу: affinity и квота CPU cgroup v2 контейнера"""
+    if hasattr(os, "sched_getaffinity"):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = os.cpu_count() or 1
+    try:
+        quota, period = pathlib.Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            count = min(count, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(count, 1)
+
+
+def pool_limits(
+    workers: int, max_connections: int | None, pool_size: int, max_overflow: int
+) -> tuple[int, int]:
+    """pool_size и max_overflow одного воркера, при которых workers
+    воркеров вместе держат не больше max_connections соединений."""
+    if max_connections is None:
+        return pool_size, max_overflow
+    per_worker = max_connections // workers
+    if per_worker < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} is less than workers={workers}"
+        )
+    pool_size = min(pool_size, per_worker)
+    return pool_size, min(max_overflow, per_worker - pool_size)
+
+
+def available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def run_uvicorn(args, loop: str, http: str) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keepalive,
+        limit_concurrency=server_config.SERVER_LIMIT_CONCURRENCY,
+        timeout_graceful_shutdown=server_config.SERVER_GRACEFUL_TIMEOUT,
+        access_log=server_config.SERVER_ACCESS_LOG,
+        server_header=False,
+    )
+
+
+def run_gunicorn(args) -> None:
+    # UvicornWorker сам выбирает uvloop и httptools, если они есть
+    from gunicorn.app.base import BaseApplication
+
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "backlog": args.backlog,
+        "keepalive": args.keepalive,
+        # Отсчитывается от SIGTERM, а воркер передает его uvicorn только
+        # после drain (см. Lifecycle.handle_signals)
+        "graceful_timeout": lifecycle_config.SHUTDOWN_DELAY
+        + lifecycle_config.SHUTDOWN_DRAIN_TIMEOUT
+        + server_config.SERVER_GRACEFUL_TIMEOUT,
+        "accesslog": "-" if server_config.SERVER_ACCESS_LOG else None,
+    }
+
+    class Application(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+
+            return app
+
+    Application().run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default=server_config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=server_config.SERVER_PORT)
+    parser.add_argument(
+        "--runner", choices=("uvicorn", "gunicorn"), default=server_config.SERVER_RUNNER
+    )
+    parser.add_argument(
+        "--workers", type=int, default=server_config.SERVER_WORKERS or cpu_count()
+    )
+    parser.add_argument("--backlog", type=int, default=server_config.SERVER_BACKLOG)
+    parser.add_argument(
+        "--keepalive", type=int, default=server_config.SERVER_KEEPALIVE
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="напечатать параметры и выйти"
+    )
+    args = parser.parse_args()
+    if args.runner == "gunicorn" and not available("gunicorn"):
+        parser.error("gunicorn is not installed")
+
+    try:
+        pool_size, max_overflow = pool_limits(
+            args.workers,
+            db_config.DB_MAX_CONNECTIONS,
+            db_config.DB_POOL_SIZE,
+            db_config.DB_MAX_OVERFLOW,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    # Воркеры читают настройки БД из окружения при первом обращении;
+    # с одним воркером uvicorn обслуживает в этом процессе, где db_config
+    # уже прочитан выше
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    db_config.reset()
+
+    loop = "uvloop" if available("uvloop") else "asyncio"
+    http = "httptools" if available("httptools") else "h11"
+    print(
+        f"{args.runner}: {args.workers} workers on {args.host}:{args.port}, "
+        f"loop={loop}, http={http}, backlog={args.backlog}, "
+        f"keepalive={args.keepalive}s, db pool {pool_size}+{max_overflow} "
+        f"per worker ({args.workers * (pool_size + max_overflow)} total)"
+    )
+    if args.dry_run:
+        return
+    if args.runner == "gunicorn":
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args, loop, http)
@@ -0,0 +1,58 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """Разбивает поток байтов на строки, не читая его целиком.
+    Возвращает пары (номер строки, строка) без пустых строк.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_no += 1
+            line = line.rstrip("\r")
+            if line:
+                yield line_no, line
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield line_no + 1, buffer.rstrip("\r")
+
+
+Row = tuple[int, dict | None, str | None]
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    """Читает CSV с заголовком и возвращает (номер строки, запись, ошибка).
+    Поля с переводом строки внутри кавычек не поддерживаются:
+    каждая запись должна занимать одну строку.
+    """
+    header = None
+    async for line_no, line in iter_lines(chunks):
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [column.strip() for column in values]
+            continue
+        if len(values) != len(header):
+            yield line_no, None, "Число полей не совпадает с заголовком"
+            continue
+        yield line_no, dict(zip(header, values)), None
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    """Читает NDJSON и возвращает (номер строки, запись, ошибка)"""
+    async for line_no, line in iter_lines(chunks):
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f"Некорректный JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Строка должна быть JSON-объектом"
+            continue
+        yield line_no, row, None
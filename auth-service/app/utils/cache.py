@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+from app.core.config import auth_config, lazy
+
+
+class TTLCache:
+    """LRU-кеш с временем жизни для каждой записи.
+    Записи можно помечать тегом (например, id пользователя),
+    чтобы сбрасывать все связанные записи одним вызовом.
+    params: maxsize: максимальное число записей, ttl: верхняя граница
+    времени жизни записи в секундах.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float, Hashable]] = OrderedDict()
+        self._tags: dict[Hashable, set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.time():
+            self._pop(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        expires_at: float | None = None,
+        tag: Hashable | None = None,
+    ) -> None:
+        max_expires_at = time.time() + self.ttl
+        if expires_at is None or expires_at > max_expires_at:
+            expires_at = max_expires_at
+        if key in self._data:
+            self._pop(key)
+        self._data[key] = (value, expires_at, tag)
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            self._pop(next(iter(self._data)))
+
+    def invalidate(self, key: Hashable) -> None:
+        self._pop(key)
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        for key in self._tags.pop(tag, set()):
+            self._data.pop(key, None)
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        """Живые записи без обновления LRU-порядка и счетчиков"""
+        now = time.time()
+        return [
+            (key, value)
+            for key, (value, expires_at, _) in self._data.items()
+            if expires_at > now
+        ]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._tags.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _pop(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None or entry[2] is None:
+            return
+        keys = self._tags.get(entry[2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[entry[2]]
+
+
+token_cache = lazy(
+    lambda: TTLCache(
+        maxsize=auth_config.TOKEN_CACHE_SIZE, ttl=auth_config.TOKEN_CACHE_TTL
+    )
+)
@@ -1,16 +1,181 @@
-from passlib.context import CryptContext
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+from app.core.config import hasher_config, lazy
+from app.utils.metrics import password_hash_duration_seconds
+from app.utils.tracing import tracer
 
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def build_context(
+    schemes: list[str],
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+    argon2_parallelism: int,
+    pbkdf2_rounds: int,
+) -> "CryptContext":
+    """CryptContext с настройками стоимости только для указанных схем.
+    Хеши других схем и хеши с другой стоимостью считаются устаревшими
+    (needs_update)."""
+    from passlib.context import CryptContext
+
+    settings = {
+        "bcrypt": {"bcrypt__rounds": bcrypt_rounds},
+        "argon2": {
+            "argon2__time_cost": argon2_time_cost,
+            "argon2__memory_cost": argon2_memory_cost,
+            "argon2__parallelism": argon2_parallelism,
+        },
+        "pbkdf2_sha256": {"pbkdf2_sha256__rounds": pbkdf2_rounds},
+    }
+    kwargs = {}
+    for scheme in schemes:
+        kwargs.update(settings.get(scheme, {}))
+    return CryptContext(schemes=schemes, deprecated="auto", **kwargs)
+
+
+@functools.cache
+def get_pwd_context() -> "CryptContext":
+    """Контекст из настроек HASH_*. Собирается при первом хешировании:
+    passlib и бэкенды схем не загружаются при импорте, в том числе
+    в процессах пула хеширования до их первой задачи."""
+    return build_context(
+        schemes=hasher_config.HASH_SCHEMES,
+        bcrypt_rounds=hasher_config.HASH_BCRYPT_ROUNDS,
+        argon2_time_cost=hasher_config.HASH_ARGON2_TIME_COST,
+        argon2_memory_cost=hasher_config.HASH_ARGON2_MEMORY_COST,
+        argon2_parallelism=hasher_config.HASH_ARGON2_PARALLELISM,
+        pbkdf2_rounds=hasher_config.HASH_PBKDF2_ROUNDS,
+    )
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(password, hashed_password)
+
+
+def _warm_up() -> None:
+    _verify("warm-up", _hash("warm-up"))
+
+
+class HasherPool:
+    """Пул воркеров для хеширования паролей вне event loop.
+    params: executor: "thread" | "process", workers: размер пула,
+    max_concurrency: сколько хешей может выполняться одновременно,
+    остальные вызовы ждут своей очереди на семафоре.
+    """
+
+    def __init__(self, executor: str, workers: int, max_concurrency: int) -> None:
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown hasher executor: {executor}")
+        self.executor_type = executor
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="hasher"
+                )
+        return self._executor
+
+    async def run(self, func, *args):
+        if self._semaphore.locked():
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            operation = func.__name__.strip("_")
+            with tracer.span(f"hasher.{operation}"):
+                with password_hash_duration_seconds.time(operation=operation):
+                    return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def warm_up(self) -> None:
+        """Запускает все воркеры пула и собирает в каждом контекст passlib
+        с бэкендом схемы: в пуле процессов это импорт passlib в каждом
+        процессе. Иначе за это платили бы первые входы после старта."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, _warm_up)
+                for _ in range(self.workers)
+            )
+        )
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "completed": self.completed,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+hasher_pool = lazy(
+    lambda: HasherPool(
+        executor=hasher_config.HASHER_EXECUTOR,
+        workers=hasher_config.HASHER_WORKERS,
+        max_concurrency=hasher_config.HASHER_MAX_CONCURRENCY,
+    )
+)
 
 
 class Hasher:
 
     @staticmethod
     def hash_password(password: str) -> str:
-        hashed_password = pwd_context.hash(password)
+        hashed_password = get_pwd_context().hash(password)
         return hashed_password
 
     @staticmethod
     def verify_password(password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(password, hashed_password)
+        return get_pwd_context().verify(password, hashed_password)
+
+    @staticmethod
+    def needs_update(hashed_password: str) -> bool:
+        """Хеш сделан устаревшей схемой или с другой стоимостью"""
+        return get_pwd_context().needs_update(hashed_password)
+
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        return await hasher_pool.run(_hash, password)
+
+    @staticmethod
+    async def verify_password_async(password: str, hashed_password: str) -> bool:
+        return await hasher_pool.run(_verify, password, hashed_password)
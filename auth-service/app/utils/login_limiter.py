@@ -0,0 +1,285 @@
+import ipaddress
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Sequence
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from app.core.config import lazy, login_limiter_config
+
+
+@dataclass
+class _Entry:
+    failures: deque = field(default_factory=deque)
+    locked_until: float = 0.0
+    strikes: int = 0
+    strikes_until: float = 0.0
+
+
+class MemoryLimiterBackend:
+    """Счетчики неудачных входов в памяти процесса.
+    Число ключей ограничено: самые давно не использованные вытесняются.
+    """
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def _entry(self, key: str) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def locked_for(self, key: str) -> float:
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry.locked_until - time.time())
+
+    async def add_failure(
+        self,
+        key: str,
+        limit: int,
+        window: float,
+        lockout_base: float,
+        lockout_max: float,
+        strikes_ttl: float,
+    ) -> float:
+        now = time.time()
+        entry = self._entry(key)
+        failures = entry.failures
+        while failures and failures[0] <= now - window:
+            failures.popleft()
+        failures.append(now)
+        if len(failures) < limit:
+            return 0.0
+        failures.clear()
+        if entry.strikes_until <= now:
+            entry.strikes = 0
+        entry.strikes += 1
+        entry.strikes_until = now + strikes_ttl
+        lockout = min(lockout_base * 2 ** (entry.strikes - 1), lockout_max)
+        entry.locked_until = now + lockout
+        return lockout
+
+    async def reset(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisLimiterBackend:
+    """Счетчики неудачных входов в Redis, общие для всех воркеров.
+    Скользящее окно хранится в sorted set с временем попытки в score.
+    """
+
+    def __init__(self, redis: Redis, prefix: str = "login") -> None:
+        self.redis = redis
+        self.prefix = prefix
+
+    async def locked_for(self, key: str) -> float:
+        ttl = await self.redis.pttl(f"{self.prefix}:lock:{key}")
+        return max(0.0, ttl / 1000)
+
+    async def add_failure(
+        self,
+        key: str,
+        limit: int,
+        window: float,
+        lockout_base: float,
+        lockout_max: float,
+        strikes_ttl: float,
+    ) -> float:
+        now = time.time()
+        failures_key = f"{self.prefix}:fail:{key}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(failures_key, 0, now - window)
+            pipe.zadd(failures_key, {uuid.uuid4().hex: now})
+            pipe.zcard(failures_key)
+            pipe.pexpire(failures_key, int(window * 1000))
+            _, _, count, _ = await pipe.execute()
+        if count < limit:
+            return 0.0
+        strikes_key = f"{self.prefix}:strikes:{key}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(failures_key)
+            pipe.incr(strikes_key)
+            pipe.pexpire(strikes_key, int(strikes_ttl * 1000))
+            _, strikes, _ = await pipe.execute()
+        lockout = min(lockout_base * 2 ** (strikes - 1), lockout_max)
+        await self.redis.set(
+            f"{self.prefix}:lock:{key}", 1, px=max(1, int(lockout * 1000))
+        )
+        return lockout
+
+    async def reset(self, key: str) -> None:
+        await self.redis.delete(
+            f"{self.prefix}:fail:{key}",
+            f"{self.prefix}:strikes:{key}",
+            f"{self.prefix}:lock:{key}",
+        )
+
+
+Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+def client_ip(
+    peer: str | None, forwarded_for: str | None, trusted_proxies: list[Network]
+) -> str | None:
+    """Адрес клиента за доверенными прокси.
+    X-Forwarded-For читается справа налево: каждый доверенный прокси
+    дописывает адрес, с которого к нему пришли, поэтому первый адрес
+    не из trusted_proxies - клиент. Левее него значения мог подставить
+    сам клиент, им не верим. Если соединение пришло не от доверенного
+    прокси, заголовок игнорируется.
+    """
+
+    def trusted(address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in trusted_proxies)
+
+    if peer is None or not trusted(peer) or not forwarded_for:
+        return peer
+    ip = peer
+    for address in reversed(forwarded_for.split(",")):
+        ip = address.strip()
+        if not trusted(ip):
+            break
+    return ip
+
+
+class LoginLimiter:
+    """Ограничитель попыток входа по IP и по email.
+    Неудачные попытки считаются в скользящем окне window. Когда их
+    становится limit, ключ блокируется; каждая следующая блокировка
+    в пределах strikes_ttl вдвое длиннее предыдущей, но не дольше
+    lockout_max. Проверка выполняется до запроса в БД и bcrypt, поэтому
+    заблокированный перебор не тратит ни соединения, ни CPU.
+    Если Redis недоступен, вход не блокируется (fail open).
+    За балансировщиком у всех запросов один адрес соединения, поэтому
+    IP клиента берется из X-Forwarded-For, если соединение пришло от
+    одного из trusted_proxies. max_failures_per_ip=0 отключает лимит по IP.
+    """
+
+    def __init__(
+        self,
+        backend: MemoryLimiterBackend | RedisLimiterBackend,
+        max_failures_per_email: int,
+        max_failures_per_ip: int,
+        window: float,
+        lockout_base: float,
+        lockout_max: float,
+        strikes_ttl: float,
+        trusted_proxies: Sequence[str] = (),
+    ) -> None:
+        self.backend = backend
+        self.limits = {"email": max_failures_per_email, "ip": max_failures_per_ip}
+        self.window = window
+        self.lockout_base = lockout_base
+        self.lockout_max = lockout_max
+        self.strikes_ttl = strikes_ttl
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies
+        ]
+        self.checks = 0
+        self.rejected = 0
+        self.failures = 0
+        self.lockouts = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str | None, max_keys: int, **kwargs) -> "LoginLimiter":
+        if url:
+            backend = RedisLimiterBackend(Redis.from_url(url))
+        else:
+            backend = MemoryLimiterBackend(max_keys=max_keys)
+        return cls(backend=backend, **kwargs)
+
+    def client_ip(self, peer: str | None, forwarded_for: str | None) -> str | None:
+        return client_ip(peer, forwarded_for, self.trusted_proxies)
+
+    def _keys(self, ip: str | None, email: str) -> list[tuple[str, str]]:
+        keys = [("email", f"email:{email.lower()}")]
+        if ip and self.limits["ip"]:
+            keys.append(("ip", f"ip:{ip}"))
+        return keys
+
+    async def check(self, ip: str | None, email: str) -> float:
+        """Возвращает, через сколько секунд можно повторить вход,
+        или 0, если вход разрешен."""
+        self.checks += 1
+        try:
+            retry_after = 0.0
+            for _, key in self._keys(ip, email):
+                retry_after = max(retry_after, await self.backend.locked_for(key))
+        except RedisError:
+            self.errors += 1
+            return 0.0
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    async def failure(self, ip: str | None, email: str) -> None:
+        self.failures += 1
+        try:
+            for kind, key in self._keys(ip, email):
+                lockout = await self.backend.add_failure(
+                    key,
+                    limit=self.limits[kind],
+                    window=self.window,
+                    lockout_base=self.lockout_base,
+                    lockout_max=self.lockout_max,
+                    strikes_ttl=self.strikes_ttl,
+                )
+                if lockout:
+                    self.lockouts += 1
+        except RedisError:
+            self.errors += 1
+
+    async def success(self, email: str) -> None:
+        """Сбрасывает счетчики email. Счетчик IP не сбрасывается, чтобы
+        один свой аккаунт не открывал перебор чужих с того же адреса."""
+        try:
+            await self.backend.reset(f"email:{email.lower()}")
+        except RedisError:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        stats = {
+            "backend": "redis"
+            if isinstance(self.backend, RedisLimiterBackend)
+            else "memory",
+            "checks": self.checks,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "lockouts": self.lockouts,
+            "errors": self.errors,
+        }
+        if isinstance(self.backend, MemoryLimiterBackend):
+            stats["keys"] = len(self.backend)
+        return stats
+
+
+login_limiter = lazy(
+    lambda: LoginLimiter.from_url(
+        login_limiter_config.LOGIN_LIMITER_REDIS_URL,
+        max_keys=login_limiter_config.LOGIN_LIMITER_MAX_KEYS,
+        max_failures_per_email=login_limiter_config.LOGIN_MAX_FAILURES_PER_EMAIL,
+        max_failures_per_ip=login_limiter_config.LOGIN_MAX_FAILURES_PER_IP,
+        window=login_limiter_config.LOGIN_FAILURE_WINDOW,
+        lockout_base=login_limiter_config.LOGIN_LOCKOUT_BASE,
+        lockout_max=login_limiter_config.LOGIN_LOCKOUT_MAX,
+        strikes_ttl=login_limiter_config.LOGIN_STRIKES_TTL,
+        trusted_proxies=login_limiter_config.LOGIN_TRUSTED_PROXIES,
+    )
+)
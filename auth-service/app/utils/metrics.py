@@ -0,0 +1,316 @@
+import abc
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    """Метрика с набором меток в текстовом формате Prometheus.
+    Значения хранятся по кортежу значений меток в порядке label_names.
+    """
+
+    type: str
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def dump(self) -> list:
+        with self._lock:
+            return [
+                [list(key), self._dump_value(value)]
+                for key, value in self._values.items()
+            ]
+
+    def _dump_value(self, value):
+        return value
+
+    @abc.abstractmethod
+    def merge(self, state: list) -> None:
+        """Прибавляет значения, выгруженные dump() в другом процессе"""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        labels = _format_labels(self.label_names, key)
+        return [f"{self.name}{labels} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, state: list) -> None:
+        for key, value in state:
+            self.inc(value, **dict(zip(self.label_names, key)))
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def merge(self, state: list) -> None:
+        for key, value in state:
+            self.inc(value, **dict(zip(self.label_names, key)))
+
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными границами корзин.
+    Для каждого набора меток хранит счетчики корзин (не накопительные),
+    сумму и число наблюдений.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        key = self._key(labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(key, time.perf_counter() - start)
+
+    def _dump_value(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+    def merge(self, state: list) -> None:
+        for key, (counts, total, count) in state:
+            if len(counts) != len(self.buckets) + 1:
+                continue
+            key = tuple(key)
+            with self._lock:
+                current = self._values.get(key)
+                if current is None:
+                    current = self._values[key] = [[0] * len(counts), 0.0, 0]
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+                current[2] += count
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(
+                self.label_names, key, f'le="{_format_value(float(bound))}"'
+            )
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса.
+    Процессы без HTTP (воркеры Celery) выгружают свое состояние
+    в JSON-файлы каталога metrics_dir, а /metrics API суммирует их
+    со своими значениями, поэтому внешний сборщик не нужен.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, label_names))
+
+    def gauge(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, label_names, buckets))
+
+    def dump(self) -> dict:
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def write_state(self, path: str) -> None:
+        """Атомарно сохраняет состояние метрик для другого процесса"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, suffix=".tmp", delete=False
+        ) as tmp:
+            json.dump(self.dump(), tmp)
+        os.replace(tmp.name, path)
+
+    def render(self, metrics_dir: str | None = None) -> str:
+        metrics = self._metrics
+        if metrics_dir:
+            metrics = self._merged(metrics_dir)
+        lines = []
+        for metric in metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _merged(self, metrics_dir: str) -> dict[str, Metric]:
+        merged = {}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Histogram):
+                copy = Histogram(name, metric.help, metric.label_names, metric.buckets)
+            else:
+                copy = type(metric)(name, metric.help, metric.label_names)
+            copy.merge(metric.dump())
+            merged[name] = copy
+        for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, values in state.items():
+                if name in merged:
+                    merged[name].merge(values)
+        return merged
+
+
+registry = Registry()
+
+http_requests_total = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+db_query_duration_seconds = registry.histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time",
+    ("operation",),
+)
+password_hash_duration_seconds = registry.histogram(
+    "password_hash_duration_seconds",
+    "Password hash and verify time in the hasher pool",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.5, 0.75, 1.0, 2.5),
+)
+jwt_duration_seconds = registry.histogram(
+    "jwt_duration_seconds",
+    "JWT encode and signature verification time",
+    ("operation",),
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025),
+)
+celery_task_duration_seconds = registry.histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time in the worker",
+    ("task", "state"),
+)
+outbox_messages_total = registry.counter(
+    "outbox_messages_total",
+    "Verification emails handed to the mailer by the outbox dispatcher",
+    ("result",),
+)
+single_flight_calls_total = registry.counter(
+    "single_flight_calls_total",
+    "Lookups that started a query (leader), joined one in flight (coalesced) or ran alone (bypassed)",
+    ("name", "result"),
+)
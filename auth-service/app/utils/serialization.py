@@ -0,0 +1,40 @@
+import datetime as dt
+import hashlib
+import msgpack
+from pydantic import TypeAdapter
+from app.schemas.user import UserRow
+
+
+user_rows_adapter = TypeAdapter(list[UserRow])
+
+
+def dump_user_rows(rows: list[UserRow]) -> bytes:
+    """JSON списка пользователей прямо из строк БД.
+    Сериализатор схемы GetUser работает в pydantic-core без валидации
+    и без промежуточных моделей."""
+    return user_rows_adapter.dump_json(rows)
+
+
+def _pack_default(value):
+    if isinstance(value, dt.date):
+        return value.toordinal()
+    raise TypeError(f"Cannot pack {type(value).__name__}")
+
+
+def rows_etag(rows: list) -> str:
+    """ETag по содержимому строк. Строки упаковываются в msgpack,
+    это дешевле сборки JSON, поэтому на совпавший If-None-Match
+    ответ не сериализуется вовсе."""
+    payload = msgpack.packb(rows, default=_pack_default)
+    return f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Слабое сравнение ETag для If-None-Match (RFC 9110, 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
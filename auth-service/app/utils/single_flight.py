@@ -0,0 +1,74 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+from app.core.config import cache_config, lazy
+from app.utils.metrics import single_flight_calls_total
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Объединяет одновременные вызовы с одним ключом: первый вызов
+    запускает загрузку отдельной задачей, остальные ждут ее результат
+    или исключение. Результат не кешируется - запись удаляется, как
+    только загрузка завершилась. Отмена одного из ожидающих (клиент
+    отключился) не отменяет загрузку для остальных.
+    В памяти только ключи, по которым загрузка идет прямо сейчас; если их
+    уже max_keys, новые ключи загружаются без объединения.
+    params: name: метка в метрике single_flight_calls_total,
+    max_keys: сколько загрузок держать одновременно.
+    """
+
+    def __init__(self, name: str, max_keys: int) -> None:
+        self.name = name
+        self.max_keys = max_keys
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.bypassed = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            single_flight_calls_total.inc(name=self.name, result="coalesced")
+        elif len(self._calls) >= self.max_keys:
+            self.bypassed += 1
+            single_flight_calls_total.inc(name=self.name, result="bypassed")
+            return await func()
+        else:
+            self.leaders += 1
+            single_flight_calls_total.inc(name=self.name, result="leader")
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda task: self._done(key, task))
+        return await asyncio.shield(task)
+
+    def invalidate(self) -> None:
+        """Отвязывает идущие загрузки: их дождутся те, кто уже ждет,
+        а новые вызовы начнут загрузку заново. Вызывается после записи,
+        чтобы запрос, пришедший после коммита, не получил данные,
+        прочитанные до него."""
+        self._calls.clear()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "max_keys": self.max_keys,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+        }
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Если все ожидающие отменены, исключение некому забрать
+        if not task.cancelled():
+            task.exception()
+
+
+user_lookups = lazy(
+    lambda: SingleFlight(
+        name="user_lookup", max_keys=cache_config.USER_LOOKUP_MAX_IN_FLIGHT
+    )
+)
@@ -0,0 +1,363 @@
+import abc
+import asyncio
+import collections
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+from app.core.config import tracing_config
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: int
+    span_id: int
+    sampled: bool = True
+
+    def traceparent(self) -> str:
+        """Заголовок W3C Trace Context"""
+        flags = "01" if self.sampled else "00"
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-{flags}"
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        trace_id = int(parts[1], 16)
+        span_id = int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if not trace_id or not span_id:
+        return None
+    return SpanContext(trace_id=trace_id, span_id=span_id, sampled=bool(flags & 1))
+
+
+@dataclass
+class Span:
+    """Span в модели OpenTelemetry: имя, вид (SERVER, CLIENT, INTERNAL,
+    PRODUCER, CONSUMER), родитель, время начала и конца в наносекундах,
+    атрибуты и статус."""
+
+    name: str
+    context: SpanContext
+    parent_id: int | None
+    kind: str
+    start_time: int
+    end_time: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "UNSET"
+    status_message: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_time or time.time_ns()) - self.start_time) / 1e9
+
+    def to_dict(self, service_name: str) -> dict:
+        """Span в JSON-представлении OTLP"""
+        return {
+            "traceId": f"{self.context.trace_id:032x}",
+            "spanId": f"{self.context.span_id:016x}",
+            "parentSpanId": f"{self.parent_id:016x}" if self.parent_id else "",
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": self.start_time,
+            "endTimeUnixNano": self.end_time,
+            "attributes": self.attributes,
+            "status": {
+                "code": f"STATUS_CODE_{self.status}",
+                "message": self.status_message,
+            },
+            "resource": {"service.name": service_name},
+        }
+
+
+class SpanExporter(abc.ABC):
+    @abc.abstractmethod
+    def export(self, span: Span, service_name: str) -> None:
+        ...
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    """Хранит последние maxsize span'ов в памяти, для тестов и отладки"""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 10_000, **kwargs) -> None:
+        self.spans: collections.deque[Span] = collections.deque(maxlen=maxsize)
+
+    def export(self, span: Span, service_name: str) -> None:
+        self.spans.append(span)
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileExporter(SpanExporter):
+    """Дописывает span'ы в файл по одному JSON (OTLP) на строку.
+    export() только кладет span в буфер, а пишет фоновый поток пачками:
+    раз в flush_interval или как только набралось batch_size span'ов,
+    так что запрос не ждет диска. Если в буфере уже max_queue_size
+    span'ов, новые отбрасываются и считаются в dropped.
+    """
+
+    name = "file"
+
+    def __init__(
+        self,
+        path: str = "traces.jsonl",
+        flush_interval: float = 1.0,
+        batch_size: int = 512,
+        max_queue_size: int = 10_000,
+        **kwargs,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self._queue: collections.deque[tuple[Span, str]] = collections.deque()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._stopping = False
+        self._file = None
+        self.dropped = 0
+
+    def export(self, span: Span, service_name: str) -> None:
+        with self._condition:
+            if len(self._queue) >= self.max_queue_size:
+                self.dropped += 1
+                return
+            self._queue.append((span, service_name))
+            # После fork (воркеры Celery и gunicorn) потока в процессе нет
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="tracing-file-exporter", daemon=True
+                )
+                self._thread.start()
+            elif len(self._queue) >= self.batch_size:
+                self._condition.notify()
+
+    def shutdown(self, timeout: float = 5) -> None:
+        """Дописывает буфер и останавливает поток"""
+        with self._condition:
+            thread = self._thread if self._pid == os.getpid() else None
+            self._stopping = True
+            self._condition.notify()
+        if thread is not None:
+            thread.join(timeout)
+        if thread is not None and thread.is_alive():
+            return
+        with self._condition:
+            self._thread = self._pid = None
+            self._stopping = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                batch = list(self._queue)
+                self._queue.clear()
+                stopping = self._stopping
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: list[tuple[Span, str]]) -> None:
+        lines = "".join(
+            json.dumps(span.to_dict(service_name), default=str) + "\n"
+            for span, service_name in batch
+        )
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(lines)
+        self._file.flush()
+
+
+EXPORTERS = {
+    InMemoryExporter.name: InMemoryExporter,
+    FileExporter.name: FileExporter,
+}
+
+
+def get_exporter(name: str, **kwargs) -> SpanExporter | None:
+    if name == "none":
+        return None
+    try:
+        return EXPORTERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown tracing exporter: {name}")
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Tracer:
+    """Создает span'ы и отдает завершенные в exporter.
+    Текущий span хранится в contextvar, поэтому вложенные вызовы
+    в той же задаче asyncio (и в greenlet SQLAlchemy) становятся его
+    детьми. Контекст между процессами передается заголовком traceparent.
+    Без exporter'а трассировка выключена и span'ы не создаются.
+    Tracer() без аргументов берет настройки из TRACING_* при первом
+    обращении к ним, а не при импорте: декоратор traced() применяется
+    еще при импорте модулей.
+    """
+
+    SETTINGS = frozenset(("service_name", "exporter", "sample_rate"))
+
+    def __init__(
+        self,
+        service_name: str | None = None,
+        exporter: SpanExporter | None = None,
+        sample_rate: float = 1.0,
+    ) -> None:
+        if service_name is not None:
+            self.service_name = service_name
+            self.exporter = exporter
+            self.sample_rate = sample_rate
+
+    def __getattr__(self, name: str):
+        # Вызывается только для отсутствующих атрибутов, то есть до настройки
+        if name not in self.SETTINGS:
+            raise AttributeError(name)
+        self.service_name = tracing_config.TRACING_SERVICE_NAME
+        self.exporter = get_exporter(
+            tracing_config.TRACING_EXPORTER, path=tracing_config.TRACING_FILE
+        )
+        self.sample_rate = tracing_config.TRACING_SAMPLE_RATE
+        return getattr(self, name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current_span(self) -> Span | None:
+        return _current_span.get()
+
+    def start(
+        self,
+        name: str,
+        kind: str = "INTERNAL",
+        attributes: dict | None = None,
+        parent: SpanContext | None = None,
+    ) -> Span:
+        """Начинает span, не делая его текущим"""
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        if parent is None:
+            trace_id = random.getrandbits(128) or 1
+            sampled = random.random() < self.sample_rate
+        else:
+            trace_id = parent.trace_id
+            sampled = parent.sampled
+        return Span(
+            name=name,
+            context=SpanContext(
+                trace_id=trace_id, span_id=random.getrandbits(64) or 1, sampled=sampled
+            ),
+            parent_id=parent.span_id if parent is not None else None,
+            kind=kind,
+            start_time=time.time_ns(),
+            attributes=attributes or {},
+        )
+
+    def end(self, span: Span) -> None:
+        span.end_time = time.time_ns()
+        if span.context.sampled and self.exporter is not None:
+            self.exporter.export(span, self.service_name)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "INTERNAL",
+        attributes: dict | None = None,
+        parent: SpanContext | None = None,
+    ) -> Iterator[Span | None]:
+        if self.exporter is None:
+            yield None
+            return
+        span = self.start(name, kind=kind, attributes=attributes, parent=parent)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end(span)
+
+    def traced(self, name: str | None = None):
+        """Декоратор: оборачивает вызов функции в span.
+        По умолчанию span называется <Класс>.<метод>."""
+
+        def decorator(func):
+            span_name = name or func.__qualname__
+            if asyncio.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if self.exporter is None:
+                        return await func(*args, **kwargs)
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.exporter is None:
+                    return func(*args, **kwargs)
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def inject(self, carrier: dict, span: Span | None = None) -> None:
+        """Записывает контекст span'а (по умолчанию текущего) в заголовки"""
+        span = span or _current_span.get()
+        if span is not None:
+            carrier["traceparent"] = span.context.traceparent()
+
+    @staticmethod
+    def extract(carrier: dict) -> SpanContext | None:
+        return parse_traceparent(carrier.get("traceparent"))
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+tracer = Tracer()
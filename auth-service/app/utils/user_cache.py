@@ -0,0 +1,263 @@
+import asyncio
+import datetime as dt
+import secrets
+from typing import Awaitable, Callable
+import msgpack
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, WatchError
+from app.core.config import cache_config, lazy
+from app.models.user import Role
+from app.schemas.user import GetUser
+
+
+Loader = Callable[[], Awaitable[GetUser | None]]
+Lookup = Callable[[], Awaitable[GetUser | None]]
+
+
+def pack_user(user: GetUser) -> bytes:
+    return msgpack.packb(
+        [
+            user.id,
+            user.name,
+            user.surname,
+            user.email,
+            user.role.value,
+            user.date_of_birth.toordinal(),
+        ]
+    )
+
+
+def unpack_user(payload: bytes) -> GetUser:
+    id, name, surname, email, role, date_of_birth = msgpack.unpackb(payload)
+    return GetUser.model_construct(
+        id=id,
+        name=name,
+        surname=surname,
+        email=email,
+        role=Role(role),
+        date_of_birth=dt.date.fromordinal(date_of_birth),
+    )
+
+
+class UserCache:
+    """Общий для всех воркеров кеш GetUser в Redis.
+    По ключу user:id:<id> хранится упакованный в msgpack пользователь,
+    по ключу user:email:<email в нижнем регистре> - ссылка на его id.
+    Промах по ключу защищен от "stampede": загружает данные из БД
+    только владелец блокировки, остальные ждут появления значения.
+    invalidate увеличивает версию пользователя (user:ver:<id>) и общее
+    поколение (user:gen). Владелец блокировки запоминает версию до
+    загрузки (по email id еще неизвестен - поколение) и записывает
+    результат, только если она не изменилась: иначе строка, прочитанная
+    до записи в БД, попала бы в кеш после ее invalidate.
+    params: redis: клиент Redis или None, если кеш выключен.
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None,
+        ttl: int,
+        lock_ttl: float,
+        lock_poll_interval: float = 0.05,
+        prefix: str = "user",
+    ) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.lock_poll_interval = lock_poll_interval
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str | None, **kwargs) -> "UserCache":
+        redis = Redis.from_url(url) if url else None
+        return cls(redis=redis, **kwargs)
+
+    @property
+    def enabled(self) -> bool:
+        return self.redis is not None
+
+    def _id_key(self, id: int) -> str:
+        return f"{self.prefix}:id:{id}"
+
+    def _email_key(self, email: str) -> str:
+        return f"{self.prefix}:email:{email.lower()}"
+
+    def _version_key(self, id: int) -> str:
+        return f"{self.prefix}:ver:{id}"
+
+    def _generation_key(self) -> str:
+        return f"{self.prefix}:gen"
+
+    async def get_by_id(self, id: int, loader: Loader) -> GetUser | None:
+        if not self.enabled:
+            return await loader()
+        key = self._id_key(id)
+        return await self._get_or_load(
+            key, lambda: self._get(key), loader, self._version_key(id)
+        )
+
+    async def get_by_email(self, email: str, loader: Loader) -> GetUser | None:
+        if not self.enabled:
+            return await loader()
+        return await self._get_or_load(
+            self._email_key(email),
+            lambda: self._get_by_email(email),
+            loader,
+            self._generation_key(),
+        )
+
+    async def set(self, user: GetUser) -> None:
+        if not self.enabled:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                self._queue_set(pipe, user)
+                await pipe.execute()
+        except RedisError:
+            self.errors += 1
+
+    async def invalidate(self, id: int) -> None:
+        """Удаляет пользователя из кеша. Ссылка по email остается,
+        но без записи по id она считается промахом. Версия живет ttl:
+        дольше загрузка из БД не идет."""
+        if not self.enabled:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self._id_key(id))
+                pipe.incr(self._version_key(id))
+                pipe.expire(self._version_key(id), self.ttl)
+                pipe.incr(self._generation_key())
+                await pipe.execute()
+        except RedisError:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+    def _queue_set(self, pipe, user: GetUser) -> None:
+        pipe.set(self._id_key(user.id), pack_user(user), ex=self.ttl)
+        pipe.set(self._email_key(user.email), user.id, ex=self.ttl)
+
+    async def _set_if_unchanged(
+        self, user: GetUser, version_key: str, version: bytes | None
+    ) -> None:
+        """set, если версия не изменилась с начала загрузки"""
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(version_key)
+                if await pipe.get(version_key) != version:
+                    return
+                pipe.multi()
+                self._queue_set(pipe, user)
+                await pipe.execute()
+        except WatchError:
+            pass
+        except RedisError:
+            self.errors += 1
+
+    async def _unlock(self, lock_key: str, token: str) -> None:
+        """Снимает блокировку, только если ее держит этот token:
+        загрузка дольше lock_ttl не снимет чужую блокировку."""
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(lock_key)
+                if await pipe.get(lock_key) != token.encode():
+                    return
+                pipe.multi()
+                pipe.delete(lock_key)
+                await pipe.execute()
+        except WatchError:
+            pass
+        except RedisError:
+            self.errors += 1
+
+    async def _get(self, key: str) -> GetUser | None:
+        try:
+            payload = await self.redis.get(key)
+        except RedisError:
+            self.errors += 1
+            return None
+        if payload is None:
+            return None
+        return unpack_user(payload)
+
+    async def _get_by_email(self, email: str) -> GetUser | None:
+        try:
+            id = await self.redis.get(self._email_key(email))
+        except RedisError:
+            self.errors += 1
+            return None
+        if id is None:
+            return None
+        user = await self._get(self._id_key(int(id)))
+        if user is None or user.email.lower() != email.lower():
+            return None
+        return user
+
+    async def _get_or_load(
+        self, key: str, lookup: Lookup, loader: Loader, version_key: str
+    ) -> GetUser | None:
+        user = await lookup()
+        if user is not None:
+            self.hits += 1
+            return user
+        self.misses += 1
+
+        lock_key = f"{key}:lock"
+        token = secrets.token_hex(8)
+        try:
+            locked = await self.redis.set(
+                lock_key, token, nx=True, px=int(self.lock_ttl * 1000)
+            )
+            if locked:
+                version = await self.redis.get(version_key)
+        except RedisError:
+            self.errors += 1
+            return await loader()
+
+        if not locked:
+            user = await self._wait_for(lock_key, lookup)
+            if user is not None:
+                return user
+            return await loader()
+
+        try:
+            user = await loader()
+            if user is not None:
+                await self._set_if_unchanged(user, version_key, version)
+            return user
+        finally:
+            await self._unlock(lock_key, token)
+
+    async def _wait_for(self, lock_key: str, lookup: Lookup) -> GetUser | None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl
+        while loop.time() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            user = await lookup()
+            if user is not None:
+                return user
+            try:
+                if not await self.redis.exists(lock_key):
+                    return None
+            except RedisError:
+                self.errors += 1
+                return None
+        return None
+
+user_cache = lazy(
+    lambda: UserCache.from_url(
+        cache_config.REDIS_CACHE_URL,
+        ttl=cache_config.USER_CACHE_TTL,
+        lock_ttl=cache_config.USER_CACHE_LOCK_TTL,
+    )
+)
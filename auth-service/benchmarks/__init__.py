@@ -0,0 +1,19 @@
+"""Бенчмарки сервиса авторизации.
+
+Запускаются как модули из каталога auth-service, например
+python -m benchmarks.bench_tokens. Если переменные окружения
+сервиса не заданы, подставляются значения для локального прогона.
+"""
+import os
+
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_USER", "bench")
+os.environ.setdefault("DB_PASS", "bench")
+os.environ.setdefault("DB_NAME", "bench")
+os.environ.setdefault("TEST_DB_NAME", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
+os.environ.setdefault("APP_EMAIL", "bench@example.com")
+os.environ.setdefault("SECRET_EMAIL", "bench")
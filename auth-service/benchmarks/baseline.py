@@ -0,0 +1,94 @@
+"""Сохранение результатов бенчмарков и сравнение с базовой линией.
+
+Результат - JSON вида {"<замер>": {"<метрика>": число, ...}, ...}.
+Для метрик задержки (p50, p95, p99, us_per_call, import_ms) рост хуже,
+для пропускной способности (rps, ops_per_second) хуже падение.
+Число ошибок (errors) не должно расти совсем, как и их доля в requests.
+Замер или метрика из базовой линии, которых нет в результате, - тоже
+регрессия: иначе сломанный прогон прошел бы проверку.
+"""
+import json
+import math
+import pathlib
+
+
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+
+LOWER_IS_BETTER = frozenset(("p50", "p95", "p99", "mean", "us_per_call", "import_ms"))
+HIGHER_IS_BETTER = frozenset(("rps", "ops_per_second"))
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Перцентиль по рангу (nearest-rank) из отсортированного списка"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def save(results: dict, path: str | pathlib.Path) -> None:
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+def load(path: str | pathlib.Path) -> dict:
+    return json.loads(pathlib.Path(path).read_text())
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Возвращает описания регрессий хуже базовой линии больше чем
+    на tolerance (доля, 0.2 = 20%)."""
+    regressions = []
+    for name, metrics in baseline.items():
+        current = results.get(name)
+        if current is None:
+            regressions.append(f"{name}: missing from results")
+            continue
+        for metric, base_value in metrics.items():
+            value = current.get(metric)
+            if value is None:
+                regressions.append(f"{name} {metric}: missing from results")
+                continue
+            if metric == "errors":
+                if more_errors(current, metrics):
+                    regressions.append(
+                        f"{name} errors: {value} of {current.get('requests')} "
+                        f"vs {base_value} of {metrics.get('requests')}"
+                    )
+                continue
+            if not base_value:
+                continue
+            change = value / base_value - 1
+            if (metric in LOWER_IS_BETTER and change > tolerance) or (
+                metric in HIGHER_IS_BETTER and change < -tolerance
+            ):
+                regressions.append(
+                    f"{name} {metric}: {value:.2f} vs {base_value:.2f} ({change:+.0%})"
+                )
+    return regressions
+
+
+def more_errors(current: dict, base: dict) -> bool:
+    """Выросло ли число ошибок или их доля в requests"""
+    if current["errors"] > base["errors"]:
+        return True
+    if current.get("requests") and base.get("requests"):
+        return (
+            current["errors"] / current["requests"]
+            > base["errors"] / base["requests"]
+        )
+    return False
+
+
+def check(results: dict, baseline_path: str | None, tolerance: float) -> int:
+    """Печатает регрессии и возвращает код выхода процесса"""
+    if not baseline_path:
+        return 0
+    if not pathlib.Path(baseline_path).exists():
+        print(f"Базовая линия {baseline_path} не найдена, сравнение пропущено")
+        return 0
+    regressions = compare(results, load(baseline_path), tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
@@ -0,0 +1,123 @@
+"""Микробенчмарки горячих путей: Hasher, JWT, GetUser и список пользователей.
+
+Меряет время одного вызова в микросекундах:
+хеширование и проверку пароля при текущих HASH_* настройках,
+выпуск и проверку access-токена через AuthService (с пустым
+и заполненным VerifiedTokenMemo), GetUser.model_validate из ORM-объекта
+и из словаря, JSON страницы из 100 пользователей через модели GetUser
+и из строк БД, ETag страницы. С --baseline завершается с кодом 1
+при регрессии.
+
+    python -m benchmarks.bench_hot_paths --iterations 2000
+    python -m benchmarks.bench_hot_paths --baseline benchmarks/results/hot_paths.json
+"""
+import argparse
+import asyncio
+import datetime as dt
+import sys
+import time
+from benchmarks import baseline
+
+
+def us_per_call(func, iterations: int) -> float:
+    for _ in range(min(iterations, 50)):
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--hash-iterations", type=int, default=10)
+    parser.add_argument(
+        "--output", default=str(baseline.RESULTS_DIR / "hot_paths_last.json")
+    )
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from pydantic import TypeAdapter
+    from app.api.actions.auth import AuthService
+    from app.core.tokens import verified_tokens
+    from app.models import UserOrm
+    from app.models.user import Role
+    from app.schemas.user import GetUser
+    from app.utils.hasher import Hasher
+    from app.utils.serialization import dump_user_rows, rows_etag
+
+    hashed = Hasher.hash_password("bench-Password1")
+    auth_service = AuthService()
+    token = auth_service.create_access_token({"id": "1", "role": "user"})
+    loop = asyncio.new_event_loop()
+
+    def verify_cold():
+        verified_tokens._cache.clear()
+        loop.run_until_complete(auth_service.verify_access_token(token))
+
+    def verify_warm():
+        loop.run_until_complete(auth_service.verify_access_token(token))
+
+    user_data = {
+        "id": 1,
+        "name": "Bench",
+        "surname": "User",
+        "email": "bench@example.com",
+        "role": Role.USER,
+        "date_of_birth": dt.date(2000, 1, 1),
+    }
+    user_orm = UserOrm(**user_data, password=hashed, is_active=True)
+    page = [{**user_data, "id": i} for i in range(100)]
+    page_adapter = TypeAdapter(list[GetUser])
+
+    def page_models():
+        users = [GetUser.model_validate(row) for row in page]
+        # Повторная проверка по response_model, как делал FastAPI
+        return page_adapter.dump_json(page_adapter.validate_python(users))
+
+    cases = {
+        "hasher.hash": (
+            lambda: Hasher.hash_password("bench-Password1"),
+            args.hash_iterations,
+        ),
+        "hasher.verify": (
+            lambda: Hasher.verify_password("bench-Password1", hashed),
+            args.hash_iterations,
+        ),
+        "jwt.encode": (
+            lambda: auth_service.create_access_token({"id": "1", "role": "user"}),
+            args.iterations,
+        ),
+        "jwt.verify_cold": (verify_cold, args.iterations),
+        "jwt.verify_memo": (verify_warm, args.iterations),
+        "GetUser.model_validate_orm": (
+            lambda: GetUser.model_validate(user_orm, from_attributes=True),
+            args.iterations,
+        ),
+        "GetUser.model_validate_dict": (
+            lambda: GetUser.model_validate(user_data),
+            args.iterations,
+        ),
+        "users_page.models": (page_models, args.iterations),
+        "users_page.rows": (lambda: dump_user_rows(page), args.iterations),
+        "users_page.etag": (lambda: rows_etag(page), args.iterations),
+    }
+    results = {}
+    for name, (func, iterations) in cases.items():
+        results[name] = {"us_per_call": us_per_call(func, iterations)}
+        print(f"{name:>28}: {results[name]['us_per_call']:10.1f} us/call")
+    loop.close()
+
+    baseline.save(results, args.output)
+    if args.save_baseline:
+        baseline.save(results, args.save_baseline)
+    sys.exit(baseline.check(results, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Время импорта процесса API и воркера Celery.
+
+Для каждого модуля --repeat раз запускает свежий интерпретатор
+с python -X importtime -c "import <модуль>" и берет медиану суммарного
+времени импорта. Печатает самые дорогие по собственному времени модули
+и проверяет, что при импорте не загружаются зависимости, которые процесс
+должен подгружать лениво (Celery и драйвер БД в API и т.п.).
+
+Завершается с кодом 1, если медиана больше бюджета (--budget-ms или
+BUDGETS_MS), если загрузилось что-то из LAZY_MODULES, или, с --baseline,
+при регрессии относительно базовой линии.
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --module app.main --budget-ms 800
+    python -m benchmarks.bench_import --baseline benchmarks/results/import.json
+"""
+import argparse
+import pathlib
+import statistics
+import subprocess
+import sys
+from benchmarks import baseline
+
+
+PROJECT_DIR = pathlib.Path(__file__).parent.parent
+
+# Процесс API и точка входа воркера (celery -A app.bg_tasks.conf worker)
+BUDGETS_MS = {
+    "app.main": 1100,
+    "app.bg_tasks.conf": 500,
+}
+
+# Пакеты, которые модуль не должен загружать при импорте
+LAZY_MODULES = {
+    "app.main": ("celery", "kombu", "asyncpg", "passlib"),
+    "app.bg_tasks.conf": ("sqlalchemy", "fastapi", "passlib"),
+}
+
+
+def import_profile(module: str) -> tuple[float, dict[str, float]]:
+    """Импортирует модуль в новом процессе. Возвращает его суммарное время
+    импорта в мс и собственное время каждого загруженного модуля."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    self_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        self_times[name] = int(self_us) / 1000
+        if name == module:
+            total = int(cumulative_us) / 1000
+    return total, self_times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--module", action="append", default=None, help="по умолчанию BUDGETS_MS"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument(
+        "--output", default=str(baseline.RESULTS_DIR / "import_last.json")
+    )
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    failed = False
+    results = {}
+    for module in args.module or list(BUDGETS_MS):
+        totals = []
+        for _ in range(args.repeat):
+            total, self_times = import_profile(module)
+            totals.append(total)
+        median = statistics.median(totals)
+        results[f"import.{module}"] = {"import_ms": median}
+        budget = args.budget_ms or BUDGETS_MS.get(module)
+        print(f"{module}: {median:.1f} ms (budget {budget or '-'} ms)")
+        for name, self_ms in sorted(
+            self_times.items(), key=lambda item: item[1], reverse=True
+        )[: args.top]:
+            print(f"    {self_ms:8.1f} ms  {name}")
+
+        if budget and median > budget:
+            print(f"OVER BUDGET {module}: {median:.1f} ms > {budget} ms")
+            failed = True
+        loaded = sorted(
+            package
+            for package in LAZY_MODULES.get(module, ())
+            if package in self_times
+        )
+        if loaded:
+            print(f"EAGER IMPORT {module}: {', '.join(loaded)}")
+            failed = True
+
+    baseline.save(results, args.output)
+    if args.save_baseline:
+        baseline.save(results, args.save_baseline)
+    code = baseline.check(results, args.baseline, args.tolerance)
+    sys.exit(1 if failed else code)
+
+
+if __name__ == "__main__":
+    main()
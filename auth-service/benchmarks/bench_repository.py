@@ -0,0 +1,76 @@
+"""Микробенчмарк горячих путей чтения UserRepo.
+
+Сравнивает ORM-путь (get_user + GetUser.model_validate) с быстрым путем
+(get_user_snapshot: готовый запрос, только колонки GetUser, без ORM).
+По умолчанию работает на SQLite в памяти, чтобы не требовать Postgres;
+с --db-url можно указать настоящую базу с заполненной таблицей users.
+
+    python -m benchmarks.bench_repository --iterations 5000
+"""
+import argparse
+import asyncio
+import datetime as dt
+import time
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.core.repository import UserRepo
+from app.models import Base, UserOrm
+from app.schemas.user import GetUser
+
+
+async def prepare(db_url: str, users: int) -> async_sessionmaker:
+    engine = create_async_engine(db_url)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    if db_url.startswith("sqlite"):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as session:
+            session.add_all(
+                UserOrm(
+                    email=f"user{i}@example.com",
+                    password="x",
+                    name="Ivan",
+                    surname="Petrov",
+                    date_of_birth=dt.date(2000, 1, 1),
+                )
+                for i in range(users)
+            )
+            await session.commit()
+    return session_maker
+
+
+async def orm_path(repo: UserRepo, user_id: int) -> GetUser:
+    user = await repo.get_user(user_id)
+    return GetUser.model_validate(user, from_attributes=True)
+
+
+async def snapshot_path(repo: UserRepo, user_id: int) -> GetUser:
+    return await repo.get_user_snapshot(user_id)
+
+
+async def measure(session_maker, func, iterations: int, users: int) -> float:
+    async with session_maker() as session:
+        repo = UserRepo(session)
+        for i in range(100):
+            await func(repo, i % users + 1)
+        start = time.perf_counter()
+        for i in range(iterations):
+            await func(repo, i % users + 1)
+        elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-url", default="sqlite+aiosqlite://")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    session_maker = await prepare(args.db_url, args.users)
+    for name, func in (("orm", orm_path), ("snapshot", snapshot_path)):
+        per_call = await measure(session_maker, func, args.iterations, args.users)
+        print(f"{name:>10}: {per_call:8.1f} us/call")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+"""HTTP-пропускная способность сервера: uvicorn по умолчанию против лаунчера.
+
+Поднимает сервер отдельным процессом в каждом режиме (MODES): default -
+`uvicorn app.main:app` с одним воркером, циклом asyncio и парсером h11,
+как без uvicorn[standard]; tuned - `python -m app` (воркеры по ядрам,
+uvloop, httptools, без access-лога). Затем --concurrency keep-alive
+соединений в течение --duration секунд запрашивают --path. Клиент
+пишет HTTP/1.1 прямо в сокет, чтобы мерить сервер, а не клиента.
+Эндпоинты по умолчанию не ходят в БД: сравнивается стек сервера.
+
+Печатает rps и p50/p99 по режимам, сохраняет результат в JSON.
+С --baseline завершается с кодом 1 при регрессии.
+
+    python -m benchmarks.bench_server
+    python -m benchmarks.bench_server --duration 10 --concurrency 64 --workers 4
+    python -m benchmarks.bench_server --path /health/live --baseline benchmarks/results/server.json
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import subprocess
+import sys
+import time
+from benchmarks import baseline
+
+
+PROJECT_DIR = pathlib.Path(__file__).parent.parent
+
+MODES = {
+    "default": [
+        "-m", "uvicorn", "app.main:app", "--loop", "asyncio", "--http", "h11",
+    ],
+    "tuned": ["-m", "app"],
+}
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def connection(port, path, deadline, latencies, errors) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load(port: int, path: str, duration: float, concurrency: int) -> dict:
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            connection(port, path, start + duration, latencies, errors)
+            for _ in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50": baseline.percentile(latencies, 50),
+        "p99": baseline.percentile(latencies, 99),
+    }
+
+
+async def wait_started(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /health/live HTTP/1.1\r\nHost: bench\r\n\r\n")
+            await read_response(reader)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+def run_mode(mode: str, args) -> dict:
+    env = dict(os.environ)
+    if args.workers:
+        env["SERVER_WORKERS"] = str(args.workers)
+    server = subprocess.Popen(
+        [sys.executable, *MODES[mode], "--port", str(args.port)],
+        cwd=PROJECT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(wait_started(args.port))
+        results = {}
+        for path in args.path:
+            # Прогрев соединений и кешей сервера
+            asyncio.run(load(args.port, path, 1, args.concurrency))
+            results[f"server.{mode}.{path}"] = asyncio.run(
+                load(args.port, path, args.duration, args.concurrency)
+            )
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--mode", action="append", choices=list(MODES), default=None)
+    parser.add_argument("--path", action="append", default=None)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="для tuned, по умолчанию по ядрам"
+    )
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument(
+        "--output", default=str(baseline.RESULTS_DIR / "server_last.json")
+    )
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    args.path = args.path or ["/health/live", "/.well-known/jwks.json"]
+
+    results = {}
+    for mode in args.mode or list(MODES):
+        results.update(run_mode(mode, args))
+
+    print(f"{'':>40} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, metrics in results.items():
+        print(
+            f"{name:>40} {metrics['requests']:>9} {metrics['errors']:>7} "
+            f"{metrics['rps']:>9.1f} {metrics['p50']:>8.2f} {metrics['p99']:>8.2f}"
+        )
+    for path in args.path:
+        default = results.get(f"server.default.{path}")
+        tuned = results.get(f"server.tuned.{path}")
+        if default and tuned:
+            print(f"{path}: tuned/default rps x{tuned['rps'] / default['rps']:.2f}")
+
+    baseline.save(results, args.output)
+    if args.save_baseline:
+        baseline.save(results, args.save_baseline)
+    sys.exit(baseline.check(results, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Сравнение скорости кодирования и проверки JWT разными кодеками.
+
+Для каждого кодека и алгоритма меряет encode и decode в операциях
+в секунду, а также повторную проверку через VerifiedTokenMemo.
+
+    python -m benchmarks.bench_tokens --iterations 2000
+"""
+import argparse
+import datetime as dt
+import time
+from cryptography.hazmat.primitives import serialization
+from app.core.keys import generate_private_key_pem
+from app.core.tokens import CODECS, VerifiedTokenMemo
+
+
+def load_keys(algorithm: str) -> tuple:
+    if algorithm.startswith("HS"):
+        secret = "bench-secret-" + "x" * 32
+        return secret, secret
+    private_key = serialization.load_pem_private_key(
+        generate_private_key_pem(algorithm), password=None
+    )
+    return private_key, private_key.public_key()
+
+
+def ops_per_second(func, iterations: int) -> float:
+    for _ in range(min(iterations, 100)):
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument(
+        "--algorithms", nargs="+", default=["HS256", "RS256", "ES256", "EdDSA"]
+    )
+    args = parser.parse_args()
+
+    claims = {
+        "id": "42",
+        "role": "user",
+        "exp": dt.datetime.now(dt.timezone.utc) + dt.timedelta(hours=1),
+    }
+    print(
+        f"{'codec':>6} {'algorithm':>9} {'encode/s':>10} {'decode/s':>10} {'memo/s':>10}"
+    )
+    for name, codec_class in CODECS.items():
+        codec = codec_class()
+        for algorithm in args.algorithms:
+            if algorithm not in codec.algorithms:
+                continue
+            private_key, public_key = load_keys(algorithm)
+            token = codec.encode(claims, private_key, algorithm, headers={"kid": "k"})
+            encode = ops_per_second(
+                lambda: codec.encode(claims, private_key, algorithm), args.iterations
+            )
+            decode = ops_per_second(
+                lambda: codec.decode(token, public_key, algorithm), args.iterations
+            )
+            memo = VerifiedTokenMemo(maxsize=100, ttl=60)
+            memo.set(token, codec.decode(token, public_key, algorithm))
+            memo_hit = ops_per_second(lambda: memo.get(token), args.iterations)
+            print(
+                f"{name:>6} {algorithm:>9} "
+                f"{encode:>10.0f} {decode:>10.0f} {memo_hit:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Подбор стоимости хеширования паролей под целевую задержку.
+
+Для выбранной схемы увеличивает параметр стоимости, пока медиана
+проверки пароля не превысит --target-ms, и печатает наибольшее значение,
+которое в бюджет укладывается, в виде строки для .env.
+Запускать на том же железе, где работает сервис.
+
+    python -m benchmarks.calibrate_hasher --scheme bcrypt --target-ms 250
+"""
+import argparse
+import statistics
+import time
+from passlib.context import CryptContext
+
+
+SCHEMES = {
+    # схема: (переменная окружения, параметр passlib, первое значение, шаг)
+    "bcrypt": ("HASH_BCRYPT_ROUNDS", "rounds", 4, lambda cost: cost + 1),
+    "argon2": ("HASH_ARGON2_TIME_COST", "time_cost", 1, lambda cost: cost + 1),
+    "pbkdf2_sha256": (
+        "HASH_PBKDF2_ROUNDS",
+        "rounds",
+        10_000,
+        lambda cost: int(cost * 1.25),
+    ),
+}
+
+
+def verify_time(context: CryptContext, samples: int) -> float:
+    """Медиана времени проверки пароля в миллисекундах"""
+    hashed = context.hash("calibration-password")
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def calibrate(scheme: str, target_ms: float, samples: int, extra: dict) -> int:
+    env_name, param, cost, next_cost = SCHEMES[scheme]
+    best = None
+    while True:
+        context = CryptContext(
+            schemes=[scheme], **{f"{scheme}__{param}": cost}, **extra
+        )
+        elapsed = verify_time(context, samples)
+        print(f"{env_name}={cost}: {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = cost
+        cost = next_cost(cost)
+    if best is None:
+        raise SystemExit(
+            f"Даже минимальная стоимость медленнее {target_ms} ms на этом железе"
+        )
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scheme", choices=sorted(SCHEMES), default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument(
+        "--argon2-memory-cost",
+        type=int,
+        default=64 * 1024,
+        help="память argon2 в КиБ, фиксируется при подборе time_cost",
+    )
+    args = parser.parse_args()
+
+    extra = {}
+    if args.scheme == "argon2":
+        extra["argon2__memory_cost"] = args.argon2_memory_cost
+    best = calibrate(args.scheme, args.target_ms, args.samples, extra)
+    env_name = SCHEMES[args.scheme][0]
+    print(f"\n{env_name}={best}")
+
+
+if __name__ == "__main__":
+    main()
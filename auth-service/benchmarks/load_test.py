@@ -0,0 +1,256 @@
+"""Нагрузочный тест API сервиса авторизации.
+
+Поднимает приложение в этом же процессе (ASGI без сети, чтобы мерить
+сервис, а не стек TCP) поверх настоящего Postgres (--db-url, схема уже
+накатана alembic) или файла SQLite как замены. concurrency виртуальных
+пользователей в течение --duration секунд выполняют смесь запросов:
+регистрация, вход, подтверждение почты, /users/me и список пользователей.
+Печатает rps, ошибки и p50/p95/p99 по каждому эндпоинту, сохраняет
+результат в JSON. С --baseline завершается с кодом 1, если какая-то
+метрика хуже базовой линии больше чем на --tolerance.
+
+    python -m benchmarks.load_test --duration 20 --concurrency 32
+    python -m benchmarks.load_test --save-baseline benchmarks/results/load.json
+    python -m benchmarks.load_test --baseline benchmarks/results/load.json
+"""
+import argparse
+import asyncio
+import collections
+import datetime as dt
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from benchmarks import baseline
+
+
+MIX = {
+    "register": 5,
+    "login": 10,
+    "verify": 5,
+    "me": 50,
+    "list": 30,
+}
+
+PASSWORD = "bench-Password1"
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = collections.defaultdict(list)
+        self.errors: collections.Counter[str] = collections.Counter()
+
+    def record(self, name: str, elapsed: float, ok: bool) -> None:
+        self.latencies[name].append(elapsed * 1000)
+        if not ok:
+            self.errors[name] += 1
+
+    def results(self, duration: float) -> dict:
+        results = {}
+        total = 0
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            total += len(values)
+            results[name] = {
+                "requests": len(values),
+                "errors": self.errors[name],
+                "rps": len(values) / duration,
+                "mean": sum(values) / len(values),
+                "p50": baseline.percentile(values, 50),
+                "p95": baseline.percentile(values, 95),
+                "p99": baseline.percentile(values, 99),
+            }
+        results["total"] = {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "rps": total / duration,
+        }
+        return results
+
+
+class VerifyMailbox:
+    """Подменяет отправку писем диспетчером outbox: сохраняет токены
+    подтверждения, чтобы нагрузка могла пройти по ссылке из письма."""
+
+    def __init__(self) -> None:
+        self.tokens: collections.deque[str] = collections.deque(maxlen=10_000)
+
+    async def deliver(self, messages: list[dict]) -> None:
+        self.tokens.extend(message["token"] for message in messages)
+
+
+async def use_database(db_url: str | None, users: int) -> None:
+    """Переключает db_manager на базу бенчмарка и создает seed-пользователей"""
+    from sqlalchemy import delete
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.core.db import create_engine, db_manager
+    from app.models import Base, UserOrm
+    from app.utils.hasher import Hasher
+
+    if db_url is None:
+        path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30}
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        engine = create_engine(db_url)
+    db_manager.use_engines(engine)
+
+    password = Hasher.hash_password(PASSWORD)
+    async with db_manager.async_session() as session:
+        await session.execute(delete(UserOrm).where(UserOrm.email.like("bench%")))
+        session.add_all(
+            UserOrm(
+                email=f"bench{i}@example.com",
+                password=password,
+                name="Bench",
+                surname="User",
+                date_of_birth=dt.date(2000, 1, 1),
+                is_active=True,
+            )
+            for i in range(users)
+        )
+        await session.commit()
+
+
+async def virtual_user(client, recorder, mailbox, tokens, deadline, counter) -> None:
+    operations = list(MIX)
+    weights = list(MIX.values())
+    while time.perf_counter() < deadline:
+        operation = random.choices(operations, weights)[0]
+        if operation == "verify" and not mailbox.tokens:
+            operation = "register"
+        start = time.perf_counter()
+        if operation == "register":
+            response = await client.post(
+                "/users",
+                json={
+                    "email": f"load{next(counter)}-{os.getpid()}@example.com",
+                    "name": "Load",
+                    "surname": "Test",
+                    "password": PASSWORD,
+                    "date_of_birth": "2000-01-01",
+                },
+            )
+        elif operation == "login":
+            response = await client.post(
+                "/users/login",
+                data={
+                    "username": f"bench{random.randrange(len(tokens))}@example.com",
+                    "password": PASSWORD,
+                },
+            )
+        elif operation == "verify":
+            response = await client.get(
+                "/users/verify", params={"token": mailbox.tokens.popleft()}
+            )
+        elif operation == "me":
+            response = await client.get(
+                "/users/me",
+                headers={"Authorization": f"Bearer {random.choice(tokens)}"},
+            )
+        else:
+            response = await client.get(
+                "/users",
+                params={"limit": 20},
+                headers={"Authorization": f"Bearer {random.choice(tokens)}"},
+            )
+        recorder.record(
+            operation, time.perf_counter() - start, response.status_code < 400
+        )
+
+
+async def run(args) -> dict:
+    import httpx
+    from app.api.actions.outbox import outbox_dispatcher
+    from app.api.deps import auth_service
+    from app.api.health import lifecycle
+    from app.core.db import db_manager
+    from app.core.repository import UserRepo
+    from app.main import app
+
+    await use_database(args.db_url, args.users)
+    mailbox = VerifyMailbox()
+    outbox_dispatcher.deliver = mailbox.deliver
+    # ASGITransport не вызывает lifespan: запускаем и прогреваем сами
+    await lifecycle.startup()
+    await lifecycle.wait_ready()
+
+    tokens = []
+    async with db_manager.async_session() as session:
+        repo = UserRepo(session)
+        for i in range(args.users):
+            user = await repo.get_user_snapshot_by_email(f"bench{i}@example.com")
+            token_pair = auth_service.create_token_pair(id=user.id, role=user.role)
+            tokens.append(token_pair["access_token"])
+
+    recorder = Recorder()
+    counter = itertools.count()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *(
+                virtual_user(client, recorder, mailbox, tokens, deadline, counter)
+                for _ in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - start
+    await lifecycle.shutdown()
+    return recorder.results(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--db-url", default=None, help="по умолчанию SQLite")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument(
+        "--hash-rounds",
+        type=int,
+        default=None,
+        help="HASH_BCRYPT_ROUNDS для прогона, по умолчанию из настроек",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", default=str(baseline.RESULTS_DIR / "load_test_last.json")
+    )
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.hash_rounds is not None:
+        os.environ["HASH_BCRYPT_ROUNDS"] = str(args.hash_rounds)
+    # Лимитер входа считает только неудачи, но на всякий случай
+    # не даем ему вмешаться в прогон.
+    os.environ.setdefault("LOGIN_MAX_FAILURES_PER_IP", str(10**9))
+    random.seed(args.seed)
+
+    results = asyncio.run(run(args))
+    print(
+        f"{'endpoint':>10} {'requests':>9} {'errors':>7} {'rps':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for name, metrics in results.items():
+        print(
+            f"{name:>10} {metrics['requests']:>9} {metrics['errors']:>7} "
+            f"{metrics['rps']:>9.1f} {metrics.get('p50', 0):>8.2f} "
+            f"{metrics.get('p95', 0):>8.2f} {metrics.get('p99', 0):>8.2f}"
+        )
+    baseline.save(results, args.output)
+    if args.save_baseline:
+        baseline.save(results, args.save_baseline)
+    sys.exit(baseline.check(results, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
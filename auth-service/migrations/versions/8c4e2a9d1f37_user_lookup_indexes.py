@@ -0,0 +1,46 @@
+"""user lookup indexes
+
+Revision ID: 8c4e2a9d1f37
+Revises: 5b1f0c2d7a91
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e2a9d1f37'
+down_revision: Union[str, None] = '5b1f0c2d7a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(sa.text(
+            "SELECT lower(email) FROM users GROUP BY lower(email) "
+            "HAVING count(*) > 1 LIMIT 10"
+        )).scalars().all()
+        if duplicates:
+            raise RuntimeError(
+                "Адреса, совпадающие без учета регистра, нужно "
+                f"объединить до миграции: {', '.join(duplicates)}"
+            )
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+    op.drop_constraint('users_email_key', 'users', type_='unique')
+    op.create_index('ix_users_role_id', 'users', ['role', 'id'], unique=False)
+    op.create_index('ix_users_inactive_id', 'users', ['id'], unique=False, postgresql_where=sa.text('NOT is_active'))
+    op.create_index('ix_users_created_at', 'users', ['created_at'], unique=False)
+    op.alter_column('users', 'created_at', server_default=sa.text('now()'))
+
+
+def downgrade() -> None:
+    op.alter_column('users', 'created_at', server_default=None)
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_index('ix_users_inactive_id', table_name='users', postgresql_where=sa.text('NOT is_active'))
+    op.drop_index('ix_users_role_id', table_name='users')
+    op.create_unique_constraint('users_email_key', 'users', ['email'])
+    op.drop_index('ix_users_email_lower', table_name='users')
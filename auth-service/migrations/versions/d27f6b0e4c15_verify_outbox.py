@@ -0,0 +1,36 @@
+"""verify outbox
+
+Revision ID: d27f6b0e4c15
+Revises: 8c4e2a9d1f37
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27f6b0e4c15'
+down_revision: Union[str, None] = '8c4e2a9d1f37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('verify_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_verify_outbox_available_at'), 'verify_outbox', ['available_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_verify_outbox_available_at'), table_name='verify_outbox')
+    op.drop_table('verify_outbox')
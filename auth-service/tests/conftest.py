@@ -0,0 +1,81 @@
+"""Общие фикстуры тестов.
+
+Тесты не требуют Postgres и Redis: база - SQLite в памяти (aiosqlite),
+Redis - fakeredis. Если переменные окружения сервиса не заданы,
+подставляются значения для локального прогона.
+"""
+import os
+
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASS", "test")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("TEST_DB_NAME", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
+os.environ.setdefault("APP_EMAIL", "test@example.com")
+os.environ.setdefault("SECRET_EMAIL", "test")
+# Минимальная стоимость bcrypt, чтобы тесты не упирались в хеширование
+os.environ.setdefault("HASH_BCRYPT_ROUNDS", "4")
+
+import datetime as dt
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.db import db_manager
+from app.models import Base, UserOrm
+from app.models.user import Role
+from app.utils.hasher import Hasher
+
+PASSWORD = "test-Password1"
+
+
+@pytest.fixture
+async def engine():
+    """SQLite в памяти со схемой из моделей, подставленный в db_manager"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db_manager.use_engines(engine)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(engine):
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def users(engine) -> list[UserOrm]:
+    """Активные пользователи user0..user3@example.com, user0 - администратор"""
+    password = Hasher.hash_password(PASSWORD)
+    users = [
+        UserOrm(
+            email=f"user{i}@example.com",
+            password=password,
+            name="Test",
+            surname="User",
+            date_of_birth=dt.date(2000, 1, 1),
+            role=Role.ADMIN if i == 0 else Role.USER,
+            is_active=True,
+        )
+        for i in range(4)
+    ]
+    async with db_manager.async_session() as session:
+        session.add_all(users)
+        await session.commit()
+    return users
+
+
+def auth_headers(user: UserOrm) -> dict:
+    from app.api.deps import auth_service
+
+    token_pair = auth_service.create_token_pair(id=user.id, role=user.role)
+    return {"Authorization": f"Bearer {token_pair['access_token']}"}
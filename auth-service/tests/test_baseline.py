@@ -0,0 +1,54 @@
+import pytest
+from benchmarks.baseline import compare, percentile
+
+VALUES = [float(value) for value in range(1, 101)]
+
+
+@pytest.mark.parametrize(
+    "values, percent, expected",
+    [
+        (VALUES, 50, 50),
+        (VALUES, 95, 95),
+        (VALUES, 99, 99),
+        (VALUES, 100, 100),
+        (VALUES, 0, 1),
+        (VALUES[:20], 95, 19),
+        (VALUES[:20], 50, 10),
+        ([7.0], 99, 7),
+        ([], 50, 0),
+    ],
+)
+def test_percentile_is_nearest_rank(values, percent, expected):
+    assert percentile(values, percent) == expected
+
+
+def test_latency_and_throughput_regressions():
+    base = {"me": {"p50": 1.0, "rps": 100.0}}
+
+    assert compare({"me": {"p50": 1.1, "rps": 90.0}}, base, 0.2) == []
+    assert len(compare({"me": {"p50": 1.5, "rps": 100.0}}, base, 0.2)) == 1
+    assert len(compare({"me": {"p50": 1.0, "rps": 70.0}}, base, 0.2)) == 1
+
+
+def test_fast_failures_are_regression():
+    results = {"me": {"p50": 1, "errors": 500, "requests": 500, "rps": 100}}
+    base = {"me": {"p50": 4, "errors": 0, "requests": 500, "rps": 100}}
+
+    assert compare(results, base, 0.2) == ["me errors: 500 of 500 vs 0 of 500"]
+
+
+def test_error_rate_growth_is_regression():
+    base = {"me": {"errors": 10, "requests": 1000}}
+
+    assert compare({"me": {"errors": 5, "requests": 100}}, base, 0.2)
+    assert compare({"me": {"errors": 11, "requests": 2000}}, base, 0.2)
+    assert compare({"me": {"errors": 10, "requests": 1000}}, base, 0.2) == []
+
+
+def test_missing_endpoint_and_metric_are_regression():
+    base = {"me": {"p50": 1.0, "p99": 2.0}, "login": {"p50": 1.0}}
+
+    assert compare({"me": {"p50": 1.0}}, base, 0.2) == [
+        "me p99: missing from results",
+        "login: missing from results",
+    ]
@@ -0,0 +1,100 @@
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select
+from app.core.db import db_manager
+from app.models import UserOrm
+from app.schemas.user import GetUser
+from app.utils.serialization import etag_matches
+from conftest import auth_headers
+
+
+async def get_users(client, users, headers: dict | None = None, **params):
+    return await client.get(
+        "/users", params=params, headers={**auth_headers(users[0]), **(headers or {})}
+    )
+
+
+async def delete_users(*ids: int) -> None:
+    async with db_manager.async_session.begin() as session:
+        await session.execute(delete(UserOrm).where(UserOrm.id.in_(ids)))
+
+
+async def test_body_matches_get_user_schema(client, users):
+    response = await get_users(client, users)
+
+    async with db_manager.async_session() as session:
+        rows = (await session.scalars(select(UserOrm).order_by(UserOrm.id))).all()
+    expected = [GetUser.model_validate(row, from_attributes=True) for row in rows]
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == TypeAdapter(list[GetUser]).dump_json(expected)
+
+
+async def test_matching_etag_returns_304(client, users):
+    first = await get_users(client, users)
+    etag = first.headers["ETag"]
+
+    second = await get_users(client, users, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+    weak = await get_users(client, users, headers={"If-None-Match": f"W/{etag}"})
+    assert weak.status_code == 304
+
+
+async def test_changed_page_returns_new_etag(client, users):
+    etag = (await get_users(client, users)).headers["ETag"]
+
+    await delete_users(users[1].id)
+
+    response = await get_users(client, users, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 3
+
+
+async def test_next_page_cursor(client, users):
+    response = await get_users(client, users, limit=2)
+    assert [user["id"] for user in response.json()] == [users[0].id, users[1].id]
+    assert response.headers["X-Next-After"] == str(users[1].id)
+
+    response = await get_users(client, users, limit=2, after=users[1].id)
+    assert [user["id"] for user in response.json()] == [users[2].id, users[3].id]
+    assert "X-Next-After" not in response.headers
+
+
+async def test_look_ahead_row_is_part_of_etag(client, users):
+    first = await get_users(client, users, limit=2)
+    assert "X-Next-After" in first.headers
+
+    # Страница та же, но следующей больше нет: старый ответ с
+    # X-Next-After устарел
+    await delete_users(users[2].id, users[3].id)
+
+    response = await get_users(
+        client, users, headers={"If-None-Match": first.headers["ETag"]}, limit=2
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != first.headers["ETag"]
+    assert "X-Next-After" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    [
+        (None, False),
+        ("", False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"other", W/"abc"', True),
+        (' "other" ,"abc" ', True),
+        ("*", True),
+        (" * ", True),
+        ('"other"', False),
+        ('"abc', False),
+        ('W/"other"', False),
+    ],
+)
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, '"abc"') == matches
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import signal
+import pytest
+from app.api.health import Lifecycle, lifecycle
+
+
+@pytest.fixture
+def sigterm():
+    """Обработчик SIGTERM на месте обработчика uvicorn, записывает вызовы"""
+    calls = []
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: calls.append(signum))
+    yield calls
+    signal.signal(signal.SIGTERM, previous)
+
+
+def make_lifecycle(shutdown_delay: float = 0.1, drain_timeout: float = 5) -> Lifecycle:
+    return Lifecycle(
+        warm_up_connections=0,
+        warm_up_hasher=False,
+        retry_delay=0,
+        shutdown_delay=shutdown_delay,
+        drain_timeout=drain_timeout,
+    )
+
+
+async def test_sigterm_drains_before_passing_signal(sigterm):
+    lifecycle = make_lifecycle()
+    lifecycle.ready = True
+    lifecycle.handle_signals()
+    lifecycle.request_started()
+
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.sleep(0.2)
+    assert not lifecycle.ready
+    assert lifecycle.stats()["status"] == "draining"
+    assert sigterm == []
+
+    lifecycle.request_finished()
+    await asyncio.sleep(0.05)
+    assert sigterm == [signal.SIGTERM]
+
+
+async def test_second_sigterm_passes_immediately(sigterm):
+    lifecycle = make_lifecycle(shutdown_delay=10)
+    lifecycle.handle_signals()
+
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.sleep(0.05)
+    assert sigterm == []
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.sleep(0.05)
+    assert sigterm == [signal.SIGTERM]
+    lifecycle._drain_task.cancel()
+
+
+async def test_drain_timeout_bounds_wait(sigterm):
+    lifecycle = make_lifecycle(shutdown_delay=0, drain_timeout=0.1)
+    lifecycle.handle_signals()
+    lifecycle.request_started()
+
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.sleep(0.3)
+    assert sigterm == [signal.SIGTERM]
+
+
+async def test_ready_is_503_while_draining(client, monkeypatch):
+    monkeypatch.setattr(lifecycle, "ready", True)
+    assert (await client.get("/health/ready")).status_code == 200
+
+    monkeypatch.setattr(lifecycle, "ready", False)
+    monkeypatch.setattr(lifecycle, "draining", True)
+    assert (await client.get("/health/ready")).status_code == 503
+    assert (await client.get("/health/live")).status_code == 200
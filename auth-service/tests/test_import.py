@@ -0,0 +1,46 @@
+import subprocess
+import sys
+import pytest
+from benchmarks.bench_import import BUDGETS_MS, LAZY_MODULES, PROJECT_DIR, import_profile
+
+# Печатает синглтоны и настройки, созданные при импорте модуля
+CREATED_ON_IMPORT = """
+import sys
+import {module}
+from app.core.config import Lazy
+from app.utils.tracing import tracer
+
+for name, module in list(sys.modules.items()):
+    if name.startswith("app."):
+        for attr, value in vars(module).items():
+            if isinstance(value, Lazy) and value._instance is not None:
+                print(f"{{name}}.{{attr}}")
+if "exporter" in vars(tracer):
+    print("app.utils.tracing.tracer")
+"""
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS_MS))
+def test_import_reads_no_settings(module):
+    # Пустое окружение: без DB_*, SECRET_KEY и т.д. импорт должен пройти
+    result = subprocess.run(
+        [sys.executable, "-c", CREATED_ON_IMPORT.format(module=module)],
+        cwd=PROJECT_DIR,
+        env={},
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == []
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS_MS))
+def test_import_budget_and_lazy_modules(module):
+    # Минимум из нескольких запусков меньше всего зависит от шума машины
+    profiles = [import_profile(module) for _ in range(3)]
+    total = min(total for total, _ in profiles)
+    _, self_times = profiles[0]
+
+    assert total <= BUDGETS_MS[module]
+    assert [name for name in LAZY_MODULES[module] if name in self_times] == []
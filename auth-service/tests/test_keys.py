@@ -0,0 +1,92 @@
+import json
+import types
+import time
+import pytest
+from app.core import keys
+from app.core.config import auth_config
+from app.core.keys import KeyRing, key_ring
+from app.core.tokens import PyJWTCodec
+
+PERIOD = 3600
+
+
+class Clock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock(100 * PERIOD)
+    monkeypatch.setattr(
+        keys, "time", types.SimpleNamespace(time=clock.time, monotonic=time.monotonic)
+    )
+    return clock
+
+
+def make_ring(tmp_path, publish_ahead: float = 600) -> KeyRing:
+    return KeyRing(
+        algorithm="ES256",
+        codec=PyJWTCodec(),
+        keys_dir=str(tmp_path),
+        rotation_period=PERIOD,
+        retention=PERIOD,
+        publish_ahead=publish_ahead,
+    )
+
+
+def jwks_kids(ring: KeyRing) -> list[str]:
+    return [key["kid"] for key in json.loads(ring.jwks())["keys"]]
+
+
+def test_next_key_is_published_before_it_signs(tmp_path, clock):
+    ring = make_ring(tmp_path)
+
+    assert ring.signing_key().kid == "es256-100"
+    assert jwks_kids(ring) == ["es256-100"]
+
+    clock.now = 101 * PERIOD - 600
+    assert ring.signing_key().kid == "es256-100"
+    assert jwks_kids(ring) == ["es256-100", "es256-101"]
+
+    clock.now = 101 * PERIOD
+    assert ring.signing_key().kid == "es256-101"
+    assert jwks_kids(ring) == ["es256-100", "es256-101"]
+
+
+def test_replicas_share_published_key(tmp_path, clock):
+    first, second = make_ring(tmp_path), make_ring(tmp_path)
+    clock.now = 101 * PERIOD - 1
+    published = json.loads(first.jwks())["keys"][-1]
+
+    clock.now = 101 * PERIOD
+    key = second.signing_key()
+    token = second.codec.encode(
+        {"sub": "1"}, key.private_key, "ES256", headers={"kid": key.kid}
+    )
+
+    assert key.kid == published["kid"]
+    assert first.codec.decode(token, first.verification_key(key.kid), "ES256")
+
+
+def test_old_keys_expire_after_retention(tmp_path, clock):
+    ring = make_ring(tmp_path)
+    ring.signing_key()
+
+    # retention плюс период запаса на расхождение часов
+    clock.now = 102 * PERIOD
+    assert jwks_kids(ring) == ["es256-100", "es256-102"]
+    clock.now = 103 * PERIOD
+    assert jwks_kids(ring) == ["es256-102", "es256-103"]
+    assert ring.verification_key("es256-100") is None
+
+
+async def test_jwks_cache_lifetime_matches_config(client):
+    response = await client.get("/.well-known/jwks.json")
+
+    max_age = auth_config.JWKS_MAX_AGE
+    assert response.headers["Cache-Control"] == f"public, max-age={max_age}"
+    assert key_ring.publish_ahead >= max_age
@@ -0,0 +1,141 @@
+import ipaddress
+import fakeredis
+import pytest
+from app.api import crud
+from app.utils.login_limiter import (
+    LoginLimiter,
+    MemoryLimiterBackend,
+    RedisLimiterBackend,
+    client_ip,
+)
+from conftest import PASSWORD
+
+PROXIES = [ipaddress.ip_network("10.0.0.0/8")]
+
+
+def make_limiter(backend=None, **kwargs) -> LoginLimiter:
+    options = {
+        "max_failures_per_email": 3,
+        "max_failures_per_ip": 5,
+        "window": 60,
+        "lockout_base": 60,
+        "lockout_max": 600,
+        "strikes_ttl": 3600,
+        **kwargs,
+    }
+    return LoginLimiter(backend=backend or MemoryLimiterBackend(max_keys=100), **options)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryLimiterBackend(max_keys=100)
+    return RedisLimiterBackend(fakeredis.FakeAsyncRedis())
+
+
+@pytest.fixture
+def limiter(monkeypatch) -> LoginLimiter:
+    limiter = make_limiter(trusted_proxies=["10.0.0.0/8"])
+    monkeypatch.setattr(crud, "login_limiter", limiter)
+    return limiter
+
+
+@pytest.mark.parametrize(
+    "peer, forwarded_for, expected",
+    [
+        ("203.0.113.5", None, "203.0.113.5"),
+        # Заголовок от недоверенного адреса игнорируется
+        ("203.0.113.5", "198.51.100.1", "203.0.113.5"),
+        ("10.0.0.2", "198.51.100.1", "198.51.100.1"),
+        ("10.0.0.2", "198.51.100.1, 10.0.0.3", "198.51.100.1"),
+        # Подставленные клиентом адреса левее реального не читаются
+        ("10.0.0.2", "1.1.1.1, 198.51.100.1", "198.51.100.1"),
+        ("10.0.0.2", "10.0.0.4, 10.0.0.3", "10.0.0.4"),
+        ("10.0.0.2", None, "10.0.0.2"),
+        (None, "198.51.100.1", None),
+    ],
+)
+def test_client_ip(peer, forwarded_for, expected):
+    assert client_ip(peer, forwarded_for, PROXIES) == expected
+
+
+async def test_email_is_locked_after_max_failures(backend):
+    limiter = make_limiter(backend)
+    for _ in range(3):
+        assert await limiter.check(ip=None, email="a@example.com") == 0
+        await limiter.failure(ip=None, email="a@example.com")
+
+    assert await limiter.check(ip=None, email="A@example.com") > 0
+    assert await limiter.check(ip=None, email="b@example.com") == 0
+    assert limiter.stats()["lockouts"] == 1
+
+
+async def test_repeated_lockouts_grow(backend):
+    limiter = make_limiter(backend, max_failures_per_email=1, lockout_base=10)
+
+    await limiter.failure(ip=None, email="a@example.com")
+    first = await limiter.check(ip=None, email="a@example.com")
+    await limiter.failure(ip=None, email="a@example.com")
+    second = await limiter.check(ip=None, email="a@example.com")
+
+    assert 0 < first <= 10
+    assert 10 < second <= 20
+
+
+async def test_success_resets_email_but_not_ip(backend):
+    limiter = make_limiter(backend)
+    for _ in range(2):
+        await limiter.failure(ip="198.51.100.1", email="a@example.com")
+    await limiter.success(email="a@example.com")
+    for _ in range(2):
+        await limiter.failure(ip="198.51.100.1", email="a@example.com")
+    assert await limiter.check(ip=None, email="a@example.com") == 0
+
+    await limiter.failure(ip="198.51.100.1", email="c@example.com")
+    assert await limiter.check(ip="198.51.100.1", email="d@example.com") > 0
+
+
+async def test_ip_limit_can_be_disabled():
+    limiter = make_limiter(max_failures_per_ip=0)
+    for i in range(10):
+        await limiter.failure(ip="198.51.100.1", email=f"user{i}@example.com")
+
+    assert await limiter.check(ip="198.51.100.1", email="new@example.com") == 0
+
+
+async def login(client, email, password, forwarded_for):
+    return await client.post(
+        "/users/login",
+        data={"username": email, "password": password},
+        headers={"X-Forwarded-For": forwarded_for},
+    )
+
+
+async def test_login_lockout_and_reset(client, users, limiter):
+    email = users[1].email
+    for _ in range(2):
+        response = await login(client, email, "wrong-Password1", "198.51.100.1")
+        assert response.status_code == 401
+    assert (await login(client, email, PASSWORD, "198.51.100.1")).status_code == 200
+
+    for _ in range(3):
+        await login(client, email, "wrong-Password1", "198.51.100.1")
+    response = await login(client, email, PASSWORD, "198.51.100.1")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+
+async def test_login_ip_limit_uses_forwarded_client(
+    client, users, limiter, monkeypatch
+):
+    # Запросы приходят от доверенного прокси, лимит считается по клиенту
+    monkeypatch.setattr(
+        limiter, "trusted_proxies", [ipaddress.ip_network("127.0.0.1/32")]
+    )
+    for i in range(5):
+        await login(client, f"nobody{i}@example.com", "wrong-Password1", "198.51.100.1")
+
+    response = await login(client, users[1].email, PASSWORD, "198.51.100.1")
+    assert response.status_code == 429
+    response = await login(client, users[1].email, PASSWORD, "198.51.100.2")
+    assert response.status_code == 200
@@ -0,0 +1,112 @@
+import email
+import socket
+import pytest
+from aiosmtpd.controller import Controller
+from app.bg_tasks.mailer import SMTPMailer, build_verify_message
+
+
+class Handler:
+    """SMTP-сервер для тестов: запоминает письма, отвечает на RCPT
+    кодами из replies (по одному ответу на попытку)"""
+
+    def __init__(self) -> None:
+        self.messages = []
+        self.replies: dict[str, list[str]] = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        replies = self.replies.get(address)
+        if replies:
+            return replies.pop(0)
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        message = email.message_from_bytes(envelope.content)
+        self.messages.append((envelope.rcpt_tos, message.get_payload(decode=True)))
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+def make_mailer(smtp, **kwargs) -> SMTPMailer:
+    options = {"use_ssl": False, "retry_backoff": 0, **kwargs}
+    return SMTPMailer(host=smtp.hostname, port=smtp.port, **options)
+
+
+def messages(count: int) -> list:
+    return [
+        build_verify_message(f"user{i}@example.com", f"token{i}") for i in range(count)
+    ]
+
+
+def test_send_many_reuses_connection(smtp):
+    mailer = make_mailer(smtp)
+
+    failed = mailer.send_many(messages(5))
+    mailer.close()
+
+    assert failed == []
+    assert mailer.connections_opened == 1
+    assert mailer.sent == 5
+    recipients, body = smtp.handler.messages[0]
+    assert recipients == ["user0@example.com"]
+    assert b"?token=token0" in body
+
+
+def test_connection_is_rotated_after_max_messages(smtp):
+    mailer = make_mailer(smtp, max_messages_per_connection=2)
+
+    mailer.send_many(messages(5))
+    mailer.close()
+
+    assert mailer.connections_opened == 3
+    assert len(smtp.handler.messages) == 5
+
+
+def test_idle_connection_is_reopened(smtp):
+    mailer = make_mailer(smtp, idle_timeout=0)
+
+    mailer.send_many(messages(2))
+    mailer.close()
+
+    assert mailer.connections_opened == 2
+
+
+def test_temporary_error_is_retried(smtp):
+    smtp.handler.replies["user1@example.com"] = ["451 Try again later"]
+    mailer = make_mailer(smtp)
+
+    failed = mailer.send_many(messages(2))
+    mailer.close()
+
+    assert failed == []
+    assert mailer.retries == 1
+    assert [rcpt for rcpt, _ in smtp.handler.messages] == [
+        ["user0@example.com"],
+        ["user1@example.com"],
+    ]
+
+
+def test_permanent_error_is_reported_without_retry(smtp):
+    smtp.handler.replies["user1@example.com"] = ["550 No such user"]
+    mailer = make_mailer(smtp)
+
+    failed = mailer.send_many(messages(3))
+    mailer.close()
+
+    assert [email for email, _ in failed] == ["user1@example.com"]
+    assert mailer.retries == 0
+    assert len(smtp.handler.messages) == 2
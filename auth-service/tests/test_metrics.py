@@ -0,0 +1,69 @@
+import pytest
+from app.utils.metrics import Counter, Histogram, Metric, Registry
+
+
+def test_metric_requires_merge():
+    class Broken(Metric):
+        type = "counter"
+
+    with pytest.raises(TypeError):
+        Broken("broken", "Broken metric")
+
+
+def test_counter_render():
+    counter = Counter("jobs_total", "Jobs", ("result",))
+    counter.inc(result="ok")
+    counter.inc(2, result='say "hi"')
+
+    assert counter.render() == [
+        "# HELP jobs_total Jobs",
+        "# TYPE jobs_total counter",
+        'jobs_total{result="ok"} 1',
+        'jobs_total{result="say \\"hi\\""} 2',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5):
+        histogram.observe(value)
+
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 6.25",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_render_merges_worker_state(tmp_path):
+    worker = Registry()
+    worker.counter("tasks_total", "Tasks", ("task",)).inc(3, task="send")
+    worker.histogram("task_seconds", "Task time", buckets=(1.0,)).observe(0.5)
+    worker.write_state(str(tmp_path / "worker-1.json"))
+    (tmp_path / "broken.json").write_text("{")
+
+    api = Registry()
+    tasks = api.counter("tasks_total", "Tasks", ("task",))
+    tasks.inc(task="send")
+    api.histogram("task_seconds", "Task time", buckets=(1.0,)).observe(2)
+
+    text = api.render(str(tmp_path))
+
+    assert 'tasks_total{task="send"} 4' in text
+    assert 'task_seconds_bucket{le="1.0"} 1' in text
+    assert "task_seconds_count 2" in text
+    # Значения самого процесса при слиянии не меняются
+    assert tasks.dump() == [[["send"], 1]]
+
+
+async def test_metrics_endpoint_uses_route_template(client, users):
+    await client.get(f"/users/get_user_by_id/{users[1].id}")
+
+    response = await client.get("/metrics")
+
+    assert (
+        'http_requests_total{method="GET",route="/users/get_user_by_id/{id}",'
+        'status="200"}'
+    ) in response.text
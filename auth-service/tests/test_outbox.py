@@ -0,0 +1,126 @@
+import asyncio
+import datetime as dt
+import pytest
+from sqlalchemy import select
+from app.api.actions import user as user_actions
+from app.api.actions.auth import AuthService
+from app.api.actions.outbox import OutboxDispatcher
+from app.core.db import db_manager
+from app.core.repository import OutboxRepo
+from app.models import VerifyOutboxOrm
+from conftest import PASSWORD
+
+NEW_USER = {
+    "email": "new@example.com",
+    "name": "New",
+    "surname": "User",
+    "password": PASSWORD,
+    "date_of_birth": "2000-01-01",
+}
+
+
+class Mailbox:
+    def __init__(self) -> None:
+        self.messages: list[dict] = []
+        self.received = asyncio.Event()
+        self.error: Exception | None = None
+
+    async def __call__(self, messages: list[dict]) -> None:
+        if self.error is not None:
+            raise self.error
+        self.messages.extend(messages)
+        self.received.set()
+
+
+def make_dispatcher(mailbox: Mailbox, **kwargs) -> OutboxDispatcher:
+    options = {
+        "batch_size": 10,
+        # Опрос реже, чем длится тест: письмо может прийти только по notify
+        "poll_interval": 60,
+        "retry_delay": 60,
+        "max_retry_delay": 600,
+        **kwargs,
+    }
+    return OutboxDispatcher(auth_service=AuthService(), deliver=mailbox, **options)
+
+
+@pytest.fixture
+def mailbox() -> Mailbox:
+    return Mailbox()
+
+
+@pytest.fixture
+async def dispatcher(engine, mailbox, monkeypatch):
+    dispatcher = make_dispatcher(mailbox)
+    monkeypatch.setattr(user_actions, "outbox_dispatcher", dispatcher)
+    yield dispatcher
+    await dispatcher.stop()
+
+
+async def outbox_rows() -> list[VerifyOutboxOrm]:
+    async with db_manager.async_session() as session:
+        return list(await session.scalars(select(VerifyOutboxOrm)))
+
+
+async def test_registration_wakes_dispatcher(client, dispatcher, mailbox):
+    dispatcher.start()
+    # Первый проход по пустому outbox, дальше диспетчер спит до notify
+    await asyncio.sleep(0.05)
+
+    response = await client.post("/users", json=NEW_USER)
+    assert response.status_code == 201
+    await asyncio.wait_for(mailbox.received.wait(), 5)
+
+    (message,) = mailbox.messages
+    assert message["email"] == NEW_USER["email"]
+    assert await outbox_rows() == []
+
+    response = await client.get("/users/verify", params={"token": message["token"]})
+    assert response.status_code == 200
+    response = await client.post(
+        "/users/login",
+        data={"username": NEW_USER["email"], "password": PASSWORD},
+    )
+    assert response.status_code == 200
+
+
+async def test_failed_registration_leaves_no_message(client, users, dispatcher):
+    response = await client.post("/users", json={**NEW_USER, "email": users[1].email})
+
+    assert response.status_code >= 400
+    assert await outbox_rows() == []
+
+
+async def test_failed_delivery_is_postponed(engine, mailbox):
+    dispatcher = make_dispatcher(mailbox)
+    async with db_manager.async_session.begin() as session:
+        await OutboxRepo(session).add(user_id=1, email="a@example.com")
+
+    mailbox.error = ConnectionError("broker is down")
+    started_at = dt.datetime.now(dt.timezone.utc)
+    assert await dispatcher.dispatch_once() == 0
+
+    (row,) = await outbox_rows()
+    assert row.attempts == 1
+    available_at = row.available_at.replace(tzinfo=dt.timezone.utc)
+    assert available_at >= started_at + dt.timedelta(seconds=59)
+    # Отложенное письмо не берется до available_at
+    mailbox.error = None
+    assert await dispatcher.dispatch_once() == 0
+    assert dispatcher.stats()["retried"] == 1
+
+
+async def test_dispatch_sends_in_batches(engine, mailbox):
+    dispatcher = make_dispatcher(mailbox, batch_size=2)
+    async with db_manager.async_session.begin() as session:
+        for i in range(3):
+            await OutboxRepo(session).add(user_id=i + 1, email=f"user{i}@example.com")
+
+    assert await dispatcher.dispatch_once() == 2
+    assert await dispatcher.dispatch_once() == 1
+    assert await dispatcher.dispatch_once() == 0
+    assert [message["email"] for message in mailbox.messages] == [
+        "user0@example.com",
+        "user1@example.com",
+        "user2@example.com",
+    ]
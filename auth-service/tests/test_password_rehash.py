@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import select, update
+from app.api.deps import auth_service
+from app.core.db import db_manager
+from app.core.repository import UserRepo
+from app.models import UserOrm
+from app.utils.hasher import Hasher, build_context
+from conftest import PASSWORD
+
+
+@pytest.fixture
+def stale_hash() -> str:
+    """bcrypt с 5 раундами, а тесты хешируют с 4 (HASH_BCRYPT_ROUNDS)"""
+    context = build_context(
+        schemes=["bcrypt"],
+        bcrypt_rounds=5,
+        argon2_time_cost=2,
+        argon2_memory_cost=19456,
+        argon2_parallelism=1,
+        pbkdf2_rounds=1000,
+    )
+    return context.hash(PASSWORD)
+
+
+async def set_user(id: int, **values) -> None:
+    async with db_manager.async_session.begin() as session:
+        await session.execute(update(UserOrm).where(UserOrm.id == id).values(**values))
+
+
+async def password_hash(id: int) -> str:
+    async with db_manager.async_session() as session:
+        return await session.scalar(select(UserOrm.password).where(UserOrm.id == id))
+
+
+async def login(client, user: UserOrm):
+    return await client.post(
+        "/users/login", data={"username": user.email, "password": PASSWORD}
+    )
+
+
+async def test_stale_hash_is_rehashed_on_login(client, users, stale_hash):
+    user = users[1]
+    await set_user(user.id, password=stale_hash)
+    assert Hasher.needs_update(stale_hash)
+
+    assert (await login(client, user)).status_code == 200
+
+    new_hash = await password_hash(user.id)
+    assert new_hash.startswith("$2b$04$")
+    assert not Hasher.needs_update(new_hash)
+    assert (await login(client, user)).status_code == 200
+    assert await password_hash(user.id) == new_hash
+
+
+async def test_current_hash_is_left_alone(client, users):
+    user = users[1]
+    old_hash = await password_hash(user.id)
+
+    assert (await login(client, user)).status_code == 200
+
+    assert await password_hash(user.id) == old_hash
+
+
+async def test_concurrently_changed_hash_is_not_overwritten(users, stale_hash):
+    user = users[1]
+    changed = Hasher.hash_password("changed-Password1")
+    await set_user(user.id, password=changed)
+
+    await auth_service.rehash_password(
+        id=user.id, password=PASSWORD, old_hash=stale_hash
+    )
+
+    assert await password_hash(user.id) == changed
+    async with db_manager.async_session.begin() as session:
+        replaced = await UserRepo(session).replace_password_hash(
+            user.id, stale_hash, "new-hash"
+        )
+    assert not replaced
+
+
+async def test_inactive_user_is_not_rehashed(client, users, stale_hash):
+    user = users[1]
+    await set_user(user.id, password=stale_hash, is_active=False)
+
+    assert (await login(client, user)).status_code == 403
+
+    assert await password_hash(user.id) == stale_hash
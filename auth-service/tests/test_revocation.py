@@ -0,0 +1,106 @@
+import datetime as dt
+import pytest
+from app.api.actions import auth as auth_actions
+from app.core.db import db_manager
+from app.core.revocation import RevocationList
+from app.utils.bloom import BloomFilter
+from conftest import PASSWORD
+
+
+def make_revocations(capacity: int = 1000, error_rate: float = 0.001):
+    return RevocationList(
+        capacity=capacity,
+        error_rate=error_rate,
+        sync_interval=60,
+        rebuild_interval=3600,
+    )
+
+
+async def revoke(revocations: RevocationList, *jtis: str) -> None:
+    expires_at = dt.datetime.now(dt.timezone.utc) + dt.timedelta(hours=1)
+    async with db_manager.async_session.begin() as session:
+        for jti in jtis:
+            await revocations.revoke(session, jti, expires_at)
+
+
+@pytest.fixture
+def revocations(monkeypatch) -> RevocationList:
+    revocations = make_revocations()
+    monkeypatch.setattr(auth_actions, "revocation_list", revocations)
+    return revocations
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+
+    assert all(f"jti-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+async def test_unknown_jti_is_answered_by_filter(engine):
+    revocations = make_revocations()
+    await revoke(revocations, "revoked")
+    await revocations.load()
+
+    assert await revocations.is_revoked("revoked")
+    assert not await revocations.is_revoked("active")
+    assert revocations.stats()["bloom_hits"] == 1
+
+
+async def test_false_positive_falls_back_to_database(engine):
+    # Фильтр на 1 элемент с долей ошибок 0.5 почти на все отвечает "возможно"
+    revocations = make_revocations(capacity=1, error_rate=0.5)
+    await revoke(revocations, *(f"revoked-{i}" for i in range(20)))
+    await revocations.load()
+
+    probes = [f"active-{i}" for i in range(50)]
+    assert not any([await revocations.is_revoked(jti) for jti in probes])
+    stats = revocations.stats()
+    assert stats["false_positives"] > 0
+    assert stats["false_positives"] == stats["bloom_hits"]
+
+    # Подтвержденный ответ запоминается и в БД повторно не идет
+    for jti in probes:
+        await revocations.is_revoked(jti)
+    assert revocations.stats()["false_positives"] == stats["false_positives"]
+    assert all([await revocations.is_revoked(f"revoked-{i}") for i in range(20)])
+
+
+async def test_logout_revokes_tokens(client, users, revocations):
+    user = users[1]
+    response = await client.post(
+        "/users/login", data={"username": user.email, "password": PASSWORD}
+    )
+    tokens = response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get("/users/me", headers=headers)).status_code == 200
+
+    response = await client.post(
+        "/users/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers=headers,
+    )
+    assert response.status_code == 204
+
+    assert (await client.get("/users/me", headers=headers)).status_code == 401
+    response = await client.post(
+        "/users/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+async def test_refresh_token_is_single_use(client, users, revocations):
+    user = users[1]
+    response = await client.post(
+        "/users/login", data={"username": user.email, "password": PASSWORD}
+    )
+    refresh_token = response.json()["refresh_token"]
+
+    first = await client.post("/users/refresh", json={"refresh_token": refresh_token})
+    second = await client.post("/users/refresh", json={"refresh_token": refresh_token})
+
+    assert first.status_code == 200
+    assert second.status_code == 401
@@ -0,0 +1,41 @@
+import sys
+import pytest
+import uvicorn
+from app import server
+from app.core.config import db_config
+
+
+@pytest.mark.parametrize(
+    "workers, max_connections, expected",
+    [(4, None, (10, 5)), (4, 20, (5, 0)), (2, 30, (10, 5)), (3, 40, (10, 3))],
+)
+def test_pool_limits(workers, max_connections, expected):
+    assert server.pool_limits(workers, max_connections, 10, 5) == expected
+
+
+def test_pool_limits_rejects_fewer_connections_than_workers():
+    with pytest.raises(ValueError):
+        server.pool_limits(4, 3, 10, 5)
+
+
+def test_single_worker_uses_trimmed_pool(monkeypatch):
+    monkeypatch.setenv("DB_MAX_CONNECTIONS", "3")
+    monkeypatch.setenv("DB_POOL_SIZE", "10")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "5")
+    monkeypatch.setattr(sys, "argv", ["app", "--workers", "1", "--runner", "uvicorn"])
+    seen = []
+    monkeypatch.setattr(
+        uvicorn,
+        "run",
+        lambda *args, **kwargs: seen.append(
+            (db_config.DB_POOL_SIZE, db_config.DB_MAX_OVERFLOW)
+        ),
+    )
+    db_config.reset()
+    try:
+        server.main()
+    finally:
+        monkeypatch.undo()
+        db_config.reset()
+
+    assert seen == [(3, 0)]
@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from app.api.actions import user as user_actions
+from app.core.repository import UserRepo
+from app.utils.single_flight import SingleFlight
+
+
+class Loader:
+    def __init__(self, result=None, error: Exception | None = None) -> None:
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def start(flight: SingleFlight, key, loader: Loader, count: int) -> list:
+    tasks = [asyncio.create_task(flight.do(key, loader)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+async def test_concurrent_calls_share_one_load():
+    flight = SingleFlight(name="test", max_keys=10)
+    loader = Loader(result="user")
+
+    tasks = await start(flight, "key", loader, 10)
+    loader.release.set()
+
+    assert await asyncio.gather(*tasks) == ["user"] * 10
+    assert loader.calls == 1
+    assert flight.stats()["leaders"] == 1
+    assert flight.stats()["coalesced"] == 9
+    assert flight.stats()["in_flight"] == 0
+
+
+async def test_different_keys_load_separately():
+    flight = SingleFlight(name="test", max_keys=10)
+    first, second = Loader(result=1), Loader(result=2)
+
+    tasks = await start(flight, "first", first, 2) + await start(
+        flight, "second", second, 2
+    )
+    first.release.set()
+    second.release.set()
+
+    assert await asyncio.gather(*tasks) == [1, 1, 2, 2]
+    assert first.calls == second.calls == 1
+
+
+async def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight(name="test", max_keys=10)
+    loader = Loader(error=ValueError("db is down"))
+
+    tasks = await start(flight, "key", loader, 3)
+    loader.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    loader.error = None
+    loader.result = "user"
+    assert await flight.do("key", loader) == "user"
+    assert loader.calls == 2
+
+
+async def test_cancelled_waiter_does_not_cancel_load():
+    flight = SingleFlight(name="test", max_keys=10)
+    loader = Loader(result="user")
+
+    first, second = await start(flight, "key", loader, 2)
+    first.cancel()
+    await asyncio.sleep(0)
+    loader.release.set()
+
+    assert await second == "user"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_calls_over_max_keys_bypass_coalescing():
+    flight = SingleFlight(name="test", max_keys=1)
+    busy, other = Loader(result=1), Loader(result=2)
+
+    tasks = await start(flight, "busy", busy, 1) + await start(
+        flight, "other", other, 2
+    )
+    busy.release.set()
+    other.release.set()
+
+    assert await asyncio.gather(*tasks) == [1, 2, 2]
+    assert other.calls == 2
+    assert flight.stats()["bypassed"] == 2
+
+
+async def test_invalidate_starts_new_load_for_later_calls():
+    flight = SingleFlight(name="test", max_keys=10)
+    stale, fresh = Loader(result="stale"), Loader(result="fresh")
+
+    before = await start(flight, "key", stale, 1)
+    flight.invalidate()
+    after = await start(flight, "key", fresh, 1)
+    stale.release.set()
+    fresh.release.set()
+
+    assert await asyncio.gather(*before, *after) == ["stale", "fresh"]
+
+
+async def test_concurrent_requests_share_one_query(client, users, monkeypatch):
+    flight = SingleFlight(name="test", max_keys=10)
+    monkeypatch.setattr(user_actions, "user_lookups", flight)
+    get_user_snapshot = UserRepo.get_user_snapshot
+    queries = 0
+
+    async def slow_snapshot(self, user_id):
+        nonlocal queries
+        queries += 1
+        await asyncio.sleep(0.05)
+        return await get_user_snapshot(self, user_id)
+
+    monkeypatch.setattr(UserRepo, "get_user_snapshot", slow_snapshot)
+    user = users[1]
+
+    responses = await asyncio.gather(
+        *(client.get(f"/users/get_user_by_id/{user.id}") for _ in range(10))
+    )
+
+    assert {response.json()["email"] for response in responses} == {user.email}
+    assert queries == 1
+    assert flight.stats()["coalesced"] == 9
@@ -0,0 +1,178 @@
+import pytest
+from app.api.actions import auth as auth_actions
+from app.core.db import db_manager
+from app.core.revocation import RevocationList
+from app.core.uow import UnitOfWork
+from app.api.deps import auth_service
+from app.utils import cache as cache_module
+from app.utils.cache import TTLCache, token_cache
+from conftest import auth_headers
+from test_revocation import make_revocations
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture
+def revocations(monkeypatch) -> RevocationList:
+    revocations = make_revocations()
+    monkeypatch.setattr(auth_actions, "revocation_list", revocations)
+    return revocations
+
+
+def bearer(headers: dict) -> str:
+    return headers["Authorization"].removeprefix("Bearer ")
+
+
+async def claims(headers: dict):
+    return await auth_service.verify_access_token(bearer(headers), Exception())
+
+
+def test_hits_and_misses_are_counted():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("a") == 1
+
+    assert cache.stats() == {"size": 1, "maxsize": 10, "hits": 2, "misses": 1}
+
+
+def test_entry_expires_at_given_time(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, expires_at=clock.now + 5)
+
+    clock.now += 4.9
+    assert cache.get("a") == 1
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_expiry_is_capped_by_ttl(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, expires_at=clock.now + 3600)
+
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_invalidate_tag_drops_only_tagged_entries():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, tag=1)
+    cache.set("b", 2, tag=1)
+    cache.set("c", 3, tag=2)
+
+    cache.invalidate_tag(1)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+async def test_current_user_is_cached_until_token_expires(
+    client, users, revocations, monkeypatch
+):
+    monkeypatch.setattr(token_cache, "ttl", 24 * 3600)
+    headers = auth_headers(users[1])
+    before = token_cache.stats()
+
+    assert (await client.get("/users/me", headers=headers)).status_code == 200
+    assert (await client.get("/users/me", headers=headers)).status_code == 200
+
+    assert token_cache.stats()["hits"] - before["hits"] == 1
+    assert token_cache.stats()["misses"] - before["misses"] == 1
+    token = bearer(headers)
+    _, expires_at, tag = token_cache._data[token]
+    assert expires_at == (await claims(headers)).exp.timestamp()
+    assert tag == users[1].id
+
+
+async def test_update_user_drops_cached_user(client, users, revocations):
+    user = users[1]
+    headers = auth_headers(user)
+    await client.get("/users/me", headers=headers)
+
+    response = await client.put(
+        f"/users/{user.id}",
+        json={"name": "Changed", "surname": "User"},
+        headers=headers,
+    )
+    assert response.status_code == 201
+
+    assert (await client.get("/users/me", headers=headers)).json()["name"] == "Changed"
+
+
+async def test_deleted_user_is_unauthorized(client, users, revocations):
+    user = users[1]
+    headers = auth_headers(user)
+    assert (await client.get("/users/me", headers=headers)).status_code == 200
+
+    response = await client.delete(f"/users/{user.id}", headers=headers)
+    assert response.status_code == 204
+
+    assert (await client.get("/users/me", headers=headers)).status_code == 401
+
+
+async def test_activate_user_drops_cached_user(client, users, revocations):
+    user = users[1]
+    headers = auth_headers(user)
+    other = auth_headers(users[2])
+    await client.get("/users/me", headers=headers)
+    await client.get("/users/me", headers=other)
+
+    response = await client.get("/users/verify", params={"token": bearer(headers)})
+    assert response.status_code == 200
+
+    cached = dict(token_cache.items())
+    assert bearer(headers) not in cached
+    assert bearer(other) in cached
+
+
+async def test_revoked_token_is_rejected_on_cache_hit(client, users, revocations):
+    headers = auth_headers(users[1])
+    assert (await client.get("/users/me", headers=headers)).status_code == 200
+
+    # Отзыв не через logout (например, всех токенов пользователя):
+    # запись в кеше токенов остается
+    token_data = await claims(headers)
+    uow = UnitOfWork(db_manager.async_session, db_manager.async_read_session)
+    async with uow.write() as session:
+        await revocations.revoke(session, token_data.jti, token_data.exp)
+
+    assert (await client.get("/users/me", headers=headers)).status_code == 401
+    assert bearer(headers) not in dict(token_cache.items())
@@ -0,0 +1,53 @@
+import pytest
+from cryptography.hazmat.primitives import serialization
+from app.core.keys import generate_private_key_pem
+from app.core.tokens import CODECS, TokenCodec, TokenError, get_codec
+
+
+def test_codec_interface_is_abstract():
+    class Partial(TokenCodec):
+        name = "partial"
+        algorithms = frozenset()
+
+        def encode(self, claims, key, algorithm, headers=None):
+            return ""
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.fixture(params=sorted(CODECS))
+def codec(request) -> TokenCodec:
+    return get_codec(request.param)
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "ES256", "RS256"])
+def test_codecs_round_trip(codec, algorithm):
+    if algorithm == "HS256":
+        private_key = public_key = "s" * 32
+    else:
+        private_key = serialization.load_pem_private_key(
+            generate_private_key_pem(algorithm), password=None
+        )
+        public_key = private_key.public_key()
+
+    token = codec.encode({"sub": "1"}, private_key, algorithm, headers={"kid": "k1"})
+
+    assert codec.decode(token, public_key, algorithm) == {"sub": "1"}
+    assert codec.unverified_header(token)["kid"] == "k1"
+    with pytest.raises(TokenError):
+        codec.decode(token[:-4] + "AAAA", public_key, algorithm)
+
+
+def test_codecs_agree(codec):
+    other = get_codec("pyjwt" if codec.name == "jose" else "jose")
+    private_key = serialization.load_pem_private_key(
+        generate_private_key_pem("ES256"), password=None
+    )
+
+    token = codec.encode({"sub": "1"}, private_key, "ES256")
+
+    assert other.decode(token, private_key.public_key(), "ES256") == {"sub": "1"}
+    assert codec.public_jwk(private_key.public_key(), "ES256")["x"] == other.public_jwk(
+        private_key.public_key(), "ES256"
+    )["x"]
@@ -0,0 +1,166 @@
+import json
+import time
+import kombu
+import pytest
+from kombu.exceptions import OperationalError
+from app.bg_tasks import tracing as task_tracing
+from app.bg_tasks.tracing import TracedCelery
+from app.utils.tracing import (
+    FileExporter,
+    InMemoryExporter,
+    SpanContext,
+    Tracer,
+    parse_traceparent,
+    tracer,
+)
+
+
+@pytest.fixture
+def exporter(monkeypatch) -> InMemoryExporter:
+    """Включает трассировку глобального tracer в память"""
+    exporter = InMemoryExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    return exporter
+
+
+def test_traceparent_round_trip():
+    context = SpanContext(trace_id=0xABC, span_id=0x123, sampled=False)
+
+    assert parse_traceparent(context.traceparent()) == context
+    assert parse_traceparent("00-abc-123-01") is None
+    assert parse_traceparent(f"00-{0:032x}-{1:016x}-01") is None
+
+
+def test_nested_spans_share_trace():
+    exporter = InMemoryExporter()
+    tracer = Tracer(service_name="test", exporter=exporter)
+
+    with tracer.span("outer") as outer:
+        with tracer.span("inner") as inner:
+            assert tracer.current_span() is inner
+        assert tracer.current_span() is outer
+
+    inner, outer = exporter.spans
+    assert inner.context.trace_id == outer.context.trace_id
+    assert inner.parent_id == outer.context.span_id
+    assert outer.parent_id is None
+    assert outer.end_time >= inner.end_time
+
+
+async def test_traced_records_exception():
+    exporter = InMemoryExporter()
+    tracer = Tracer(service_name="test", exporter=exporter)
+
+    @tracer.traced()
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await fail()
+
+    (span,) = exporter.spans
+    assert span.name.endswith("fail")
+    assert span.status == "ERROR"
+    assert span.status_message == "ValueError: boom"
+
+
+def test_unsampled_trace_is_not_exported():
+    exporter = InMemoryExporter()
+    tracer = Tracer(service_name="test", exporter=exporter, sample_rate=0)
+
+    with tracer.span("outer"):
+        with tracer.span("inner"):
+            pass
+
+    assert len(exporter.spans) == 0
+
+
+async def test_request_continues_incoming_trace(client, users, exporter):
+    parent = SpanContext(trace_id=0xABC, span_id=0x123)
+
+    response = await client.get(
+        f"/users/get_user_by_id/{users[1].id}",
+        headers={"traceparent": parent.traceparent()},
+    )
+
+    server = next(span for span in exporter.spans if span.kind == "SERVER")
+    assert server.name == "GET /users/get_user_by_id/{id}"
+    assert server.context.trace_id == parent.trace_id
+    assert server.parent_id == parent.span_id
+    assert parse_traceparent(response.headers["traceparent"]) == server.context
+    assert any(span.parent_id == server.context.span_id for span in exporter.spans)
+
+
+def test_file_exporter_writes_in_background(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = FileExporter(path=str(path), flush_interval=60, batch_size=2)
+    tracer = Tracer(service_name="test", exporter=exporter)
+
+    with tracer.span("first"):
+        pass
+    with tracer.span("second"):
+        pass
+    # Пачка набрана: поток пишет, не дожидаясь flush_interval
+    deadline = time.monotonic() + 5
+    while not path.exists() or len(path.read_text().splitlines()) < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    with tracer.span("third"):
+        pass
+    exporter.shutdown()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["first", "second", "third"]
+    assert spans[0]["resource"] == {"service.name": "test"}
+
+
+def test_file_exporter_drops_spans_when_buffer_is_full(tmp_path):
+    exporter = FileExporter(path=str(tmp_path / "traces.jsonl"), max_queue_size=0)
+    tracer = Tracer(service_name="test", exporter=exporter)
+
+    with tracer.span("dropped"):
+        pass
+    exporter.shutdown()
+
+    assert exporter.dropped == 1
+
+
+@pytest.fixture
+def celery_app():
+    app = TracedCelery("test", broker="memory://")
+
+    @app.task(name="test.noop")
+    def noop():
+        pass
+
+    return app
+
+
+def test_publish_span_ends_after_publish(celery_app, exporter):
+    with tracer.span("request") as request:
+        result = celery_app.tasks["test.noop"].delay()
+
+    publish = next(span for span in exporter.spans if span.kind == "PRODUCER")
+    assert publish.attributes["messaging.message.id"] == result.id
+    assert publish.parent_id == request.context.span_id
+    assert publish.status == "UNSET"
+    assert task_tracing._publish_spans == {}
+
+
+def test_publish_span_ends_with_error_when_publish_fails(
+    celery_app, exporter, monkeypatch
+):
+    def publish(self, *args, **kwargs):
+        raise OperationalError("broker is down")
+
+    monkeypatch.setattr(kombu.Producer, "publish", publish)
+
+    with pytest.raises(OperationalError):
+        celery_app.tasks["test.noop"].delay()
+
+    (span,) = exporter.spans
+    assert span.kind == "PRODUCER"
+    assert span.status == "ERROR"
+    assert "broker is down" in span.status_message
+    assert task_tracing._publish_spans == {}
@@ -0,0 +1,98 @@
+import datetime as dt
+from sqlalchemy import func, select
+from app.core.db import db_manager
+from app.core.uow import UnitOfWork, on_commit
+from app.models import UserOrm
+
+
+def make_uow() -> UnitOfWork:
+    return UnitOfWork(db_manager.async_session, db_manager.async_read_session)
+
+
+def make_user(i: int) -> UserOrm:
+    return UserOrm(
+        email=f"uow{i}@example.com",
+        password="hash",
+        name="Test",
+        surname="User",
+        date_of_birth=dt.date(2000, 1, 1),
+    )
+
+
+def record(calls: list, value):
+    async def callback() -> None:
+        calls.append(value)
+
+    return callback
+
+
+async def count_users() -> int:
+    async with db_manager.async_session() as session:
+        return await session.scalar(select(func.count()).select_from(UserOrm))
+
+
+async def test_write_commits_and_runs_on_commit(engine):
+    uow = make_uow()
+    calls = []
+
+    async with uow.write() as session:
+        session.add(make_user(0))
+        on_commit(session, record(calls, "commit"))
+        assert calls == []
+    await uow.close()
+
+    assert calls == ["commit"]
+    assert await count_users() == 1
+
+
+async def test_write_after_read_through_write_session_commits(engine):
+    # Чтение через сессию записи неявно начинает транзакцию; следующий
+    # write() не должен принять ее за внешнюю и пропустить коммит.
+    uow = make_uow()
+    calls = []
+    for i in range(3):
+        async with uow.read() as session:
+            await session.execute(select(UserOrm.id))
+        async with uow.write() as session:
+            session.add(make_user(i))
+            on_commit(session, record(calls, i))
+    await uow.close()
+
+    assert calls == [0, 1, 2]
+    assert await count_users() == 3
+
+
+async def test_nested_write_joins_outer_transaction(engine):
+    uow = make_uow()
+    calls = []
+
+    async with uow.write() as outer:
+        outer.add(make_user(0))
+        async with uow.write() as inner:
+            assert inner is outer
+            inner.add(make_user(1))
+            on_commit(inner, record(calls, "inner"))
+        assert calls == []
+    await uow.close()
+
+    assert calls == ["inner"]
+    assert await count_users() == 2
+
+
+async def test_failed_write_rolls_back_and_drops_on_commit(engine):
+    uow = make_uow()
+    calls = []
+
+    try:
+        async with uow.write() as session:
+            session.add(make_user(0))
+            on_commit(session, record(calls, "commit"))
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    async with uow.write() as session:
+        session.add(make_user(1))
+    await uow.close()
+
+    assert calls == []
+    assert await count_users() == 1
@@ -0,0 +1,211 @@
+import asyncio
+import datetime as dt
+import fakeredis
+import pytest
+from app.models.user import Role
+from app.schemas.user import GetUser
+from app.utils.user_cache import UserCache, pack_user, unpack_user, user_cache
+from conftest import auth_headers
+
+
+def make_user(id: int = 1, email: str = "author@example.com") -> GetUser:
+    return GetUser(
+        id=id,
+        name="Ann",
+        surname="Lee",
+        email=email,
+        role=Role.ADMIN,
+        date_of_birth=dt.date(1990, 5, 17),
+    )
+
+
+class Loader:
+    def __init__(self, user: GetUser | None, delay: float = 0) -> None:
+        self.user = user
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> GetUser | None:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.user
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis()
+
+
+@pytest.fixture
+def cache(redis) -> UserCache:
+    return UserCache(redis=redis, ttl=60, lock_ttl=1, lock_poll_interval=0.01)
+
+
+def test_pack_user_round_trip():
+    user = make_user()
+    assert unpack_user(pack_user(user)) == user
+
+
+async def test_get_by_id_loads_once_then_hits(cache):
+    loader = Loader(make_user())
+
+    assert await cache.get_by_id(1, loader) == loader.user
+    assert await cache.get_by_id(1, loader) == loader.user
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+async def test_get_by_email_ignores_case(cache):
+    loader = Loader(make_user(email="Author@Example.com"))
+
+    await cache.get_by_email("Author@Example.com", loader)
+    user = await cache.get_by_email("author@example.com", loader)
+
+    assert user.id == 1
+    assert loader.calls == 1
+
+
+async def test_email_pointer_to_changed_user_is_miss(cache):
+    await cache.set(make_user(email="old@example.com"))
+    await cache.set(make_user(email="new@example.com"))
+    loader = Loader(None)
+
+    assert await cache.get_by_email("old@example.com", loader) is None
+    assert loader.calls == 1
+
+
+async def test_missing_user_is_not_cached(cache):
+    loader = Loader(None)
+
+    assert await cache.get_by_id(1, loader) is None
+    assert await cache.get_by_id(1, loader) is None
+    assert loader.calls == 2
+
+
+async def test_concurrent_misses_load_once(cache):
+    loader = Loader(make_user(), delay=0.05)
+
+    users = await asyncio.gather(*(cache.get_by_id(1, loader) for _ in range(20)))
+
+    assert all(user == loader.user for user in users)
+    assert loader.calls == 1
+
+
+async def test_invalidate_forces_reload(cache):
+    loader = Loader(make_user())
+    await cache.get_by_id(1, loader)
+
+    await cache.invalidate(1)
+    await cache.get_by_id(1, loader)
+
+    assert loader.calls == 2
+
+
+class BlockingLoader:
+    """Возвращает user, но только после release: на это время загрузка
+    "висит", как запрос к БД, прочитавший строку до ее изменения"""
+
+    def __init__(self, user: GetUser) -> None:
+        self.user = user
+        self.started = asyncio.Event()
+        self.released = asyncio.Event()
+
+    async def __call__(self) -> GetUser:
+        self.started.set()
+        await self.released.wait()
+        return self.user
+
+
+async def test_invalidate_during_load_is_not_overwritten(cache):
+    stale = BlockingLoader(make_user())
+    load = asyncio.create_task(cache.get_by_id(1, stale))
+    await stale.started.wait()
+
+    await cache.invalidate(1)
+    stale.released.set()
+    assert await load == stale.user
+
+    changed = make_user().model_copy(update={"name": "Changed", "role": Role.USER})
+    fresh = Loader(changed)
+    user = await cache.get_by_id(1, fresh)
+    assert fresh.calls == 1
+    assert user.name == "Changed"
+    assert user.role == Role.USER
+    assert await cache.get_by_id(1, fresh) == user
+    assert fresh.calls == 1
+
+
+async def test_invalidate_during_load_by_email(cache):
+    stale = BlockingLoader(make_user())
+    load = asyncio.create_task(cache.get_by_email("author@example.com", stale))
+    await stale.started.wait()
+
+    await cache.invalidate(1)
+    stale.released.set()
+    await load
+
+    fresh = Loader(make_user().model_copy(update={"name": "Changed"}))
+    assert (await cache.get_by_email("author@example.com", fresh)).name == "Changed"
+    assert fresh.calls == 1
+
+
+async def test_slow_loader_keeps_lock_taken_over_by_another(redis):
+    cache = UserCache(redis=redis, ttl=60, lock_ttl=0.05, lock_poll_interval=0.01)
+    slow = BlockingLoader(make_user())
+    load = asyncio.create_task(cache.get_by_id(1, slow))
+    await slow.started.wait()
+
+    await asyncio.sleep(0.1)
+    assert await redis.set("user:id:1:lock", "other", nx=True, px=1000)
+    slow.released.set()
+    await load
+
+    assert await redis.get("user:id:1:lock") == b"other"
+
+
+async def test_loader_releases_own_lock(cache, redis):
+    await cache.get_by_id(1, Loader(make_user()))
+
+    assert not await redis.exists("user:id:1:lock")
+
+
+async def test_redis_errors_fall_back_to_loader():
+    server = fakeredis.FakeServer()
+    server.connected = False
+    cache = UserCache(redis=fakeredis.FakeAsyncRedis(server=server), ttl=60, lock_ttl=1)
+    loader = Loader(make_user())
+
+    assert await cache.get_by_id(1, loader) == loader.user
+    await cache.set(loader.user)
+    assert cache.stats()["errors"] >= 2
+
+
+async def test_disabled_cache_calls_loader_every_time():
+    cache = UserCache(redis=None, ttl=60, lock_ttl=1)
+    loader = Loader(make_user())
+
+    await cache.get_by_id(1, loader)
+    await cache.get_by_id(1, loader)
+
+    assert loader.calls == 2
+
+
+async def test_update_invalidates_cached_user(client, users, redis, monkeypatch):
+    monkeypatch.setattr(user_cache, "redis", redis)
+    user = users[1]
+
+    response = await client.get(f"/users/get_user_by_id/{user.id}")
+    assert response.json()["name"] == "Test"
+    assert await redis.exists(f"user:id:{user.id}")
+
+    response = await client.put(
+        f"/users/{user.id}",
+        json={"name": "Changed", "surname": "User"},
+        headers=auth_headers(user),
+    )
+    assert response.status_code == 201
+
+    assert not await redis.exists(f"user:id:{user.id}")
+    response = await client.get(f"/users/get_user_by_email/{user.email.upper()}")
+    assert response.json()["name"] == "Changed"
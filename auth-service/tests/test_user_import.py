@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import insert, select
+from app.api.actions import user as user_actions
+from app.api.actions.outbox import outbox_dispatcher
+from app.core.db import db_manager
+from app.core.repository import COPY_COLUMNS, UserRepo
+from app.models import UserOrm, VerifyOutboxOrm
+from conftest import auth_headers
+
+
+@pytest.fixture(autouse=True)
+def copy_as_insert(monkeypatch):
+    """COPY есть только в asyncpg: в SQLite грузим пачку обычным INSERT"""
+
+    async def copy_users(self, records):
+        rows = [dict(zip(COPY_COLUMNS, record)) for record in records]
+        await self.session.execute(insert(UserOrm), rows)
+
+    monkeypatch.setattr(UserRepo, "copy_users", copy_users)
+
+
+def csv_body(count: int, start: int = 0) -> bytes:
+    lines = ["email,name,surname,password,date_of_birth"]
+    lines += [
+        f"import{i}@example.com,Test,User,test-Password1,2000-01-01"
+        for i in range(start, start + count)
+    ]
+    return "\n".join(lines).encode()
+
+
+async def imported_emails() -> set[str]:
+    async with db_manager.async_session() as session:
+        result = await session.scalars(
+            select(UserOrm.email).where(UserOrm.email.like("import%"))
+        )
+        return set(result)
+
+
+async def test_import_persists_every_batch(client, users, monkeypatch):
+    monkeypatch.setattr(user_actions, "IMPORT_BATCH_SIZE", 3)
+
+    response = await client.post(
+        "/users/import",
+        content=csv_body(8),
+        headers={**auth_headers(users[0]), "Content-Type": "text/csv"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["imported"] == 8
+    assert len(await imported_emails()) == 8
+
+
+async def test_import_reports_existing_emails(client, users, monkeypatch):
+    monkeypatch.setattr(user_actions, "IMPORT_BATCH_SIZE", 2)
+    headers = {**auth_headers(users[0]), "Content-Type": "text/csv"}
+    await client.post("/users/import", content=csv_body(3), headers=headers)
+
+    response = await client.post(
+        "/users/import", content=csv_body(4, start=1), headers=headers
+    )
+
+    result = response.json()
+    assert result["imported"] == 2
+    assert sorted(error["email"] for error in result["errors"]) == [
+        "import1@example.com",
+        "import2@example.com",
+    ]
+    assert len(await imported_emails()) == 5
+
+
+async def outbox_emails() -> list[str]:
+    async with db_manager.async_session() as session:
+        return sorted(await session.scalars(select(VerifyOutboxOrm.email)))
+
+
+async def test_import_queues_verification_for_inactive_users(
+    client, users, monkeypatch
+):
+    monkeypatch.setattr(user_actions, "IMPORT_BATCH_SIZE", 2)
+    notified = []
+
+    async def notify() -> None:
+        notified.append(await outbox_emails())
+
+    monkeypatch.setattr(outbox_dispatcher, "notify", notify)
+
+    await client.post(
+        "/users/import",
+        content=csv_body(3),
+        headers={**auth_headers(users[0]), "Content-Type": "text/csv"},
+    )
+
+    expected = [f"import{i}@example.com" for i in range(3)]
+    assert await outbox_emails() == expected
+    # Диспетчер будится после коммита каждой пачки и видит ее письма
+    assert notified == [expected[:2], expected]
+
+
+async def test_import_with_activate_skips_verification(client, users):
+    await client.post(
+        "/users/import?activate=true",
+        content=csv_body(3),
+        headers={**auth_headers(users[0]), "Content-Type": "text/csv"},
+    )
+
+    assert len(await imported_emails()) == 3
+    assert await outbox_emails() == []